@@ -1,25 +1,37 @@
 import argparse
+import functools
+import itertools
 import logging
 import math
 import pathlib
 import re
 import sys
-from typing import List, TextIO
-
-import rich.console
-import rich.logging
-import rich.markdown
+from typing import Iterable, Iterator, List, Optional, TextIO, Tuple
 
 from ._argparse import (
     READABLE,
     WRITABLE,
-    AddMarkdownFilesInDirOrPathsAction,
     Directory,
     ExistingPath,
     File,
+    LazyVersionAction,
+    fraction,
+    positive_integer,
+    regex,
 )
+from ._diff import unified_diff
+from ._files import DEFAULT_EXCLUDES, MarkdownFiles
+from ._reporting import REPORTERS, Reporter, get_reporter
+from ._utils import LazyRichHandler
 from .exceptions import MarkdownFormatException, ReformatInconsistentException
-from .reformat_markdown import _reformat_markdown_text, reformat_markdown_text
+from .reformat_markdown import (
+    DEFAULT_SAMPLE_FRACTION,
+    VerificationPolicy,
+    _changed_sections,
+    _first_changed_line,
+    _reformat_markdown_text,
+    reformat_markdown_text,
+)
 from .typing import Number
 
 logger = logging.getLogger(__name__)
@@ -31,6 +43,7 @@ SITE_PACKAGES_VERSION_REGEX_FORMAT_STR = (
 )
 
 
+@functools.lru_cache(maxsize=None)
 def get_version() -> str:
     this_dir = pathlib.Path(__file__).parent
 
@@ -58,11 +71,6 @@ def get_version() -> str:
     raise RuntimeError("Could not determine the version of MarkFlow")
 
 
-def print_markdown(markdown_text: str) -> None:
-    console = rich.console.Console()
-    console.print(rich.markdown.Markdown(markdown_text))
-
-
 def parse_args(argv: List[str]) -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description="Make your Markdown sparkle.", add_help=False
@@ -98,10 +106,55 @@ def parse_args(argv: List[str]) -> argparse.Namespace:
     )
     parser.add_argument(
         "paths",
-        action=AddMarkdownFilesInDirOrPathsAction,
         nargs="*",
         type=ExistingPath([READABLE]),
-        help="Path(s) to file(s) to reformat.",
+        help=(
+            "Path(s) to file(s) to reformat. Directories are searched for Markdown "
+            "files, skipping anything their .gitignore files ignore."
+        ),
+    )
+    parser.add_argument(
+        "--exclude",
+        type=regex,
+        default=DEFAULT_EXCLUDES,
+        help=(
+            "A regular expression for files and directories to skip when searching "
+            "directories. It is searched for in paths relative to the directory "
+            "being searched, with a leading '/' and, for directories, a trailing '/'. "
+            "(default: %(default)s)"
+        ),
+    )
+    parser.add_argument(
+        "--extend-exclude",
+        type=regex,
+        help="Like --exclude, but skips these on top of what --exclude skips.",
+    )
+
+    parser.add_argument(
+        "--since",
+        metavar="REF",
+        help=(
+            "Only reformat the Markdown files that git says changed since REF (e.g. a "
+            "branch or commit), along with untracked ones. Paths limit where to look."
+        ),
+    )
+    parser.add_argument(
+        "--staged",
+        action="store_true",
+        default=False,
+        help=(
+            "Only reformat the Markdown files with changes staged in git (since "
+            "--since, if it is passed). Paths limit where to look."
+        ),
+    )
+    parser.add_argument(
+        "--changed-sections-only",
+        action="store_true",
+        default=False,
+        help=(
+            "With --since or --staged, only reformat the top level sections of each "
+            "file that overlap lines that changed."
+        ),
     )
 
     parser.add_argument(
@@ -110,6 +163,93 @@ def parse_args(argv: List[str]) -> argparse.Namespace:
         default=False,
         help="Don't update file, just check if it would be reformatted.",
     )
+    parser.add_argument(
+        "--fail-fast",
+        action="store_true",
+        default=False,
+        help="With --check, stop at the first file that would be reformatted.",
+    )
+    parser.add_argument(
+        "--diff",
+        action="store_true",
+        default=False,
+        help=(
+            "Don't update files, print a unified diff of how they would be reformatted "
+            "instead. Implies --check. Reports are written to STDERR."
+        ),
+    )
+
+    parser.add_argument(
+        "--verify",
+        choices=[policy.value for policy in VerificationPolicy],
+        default=VerificationPolicy.FULL.value,
+        help=(
+            "How to check that reformatted files wouldn't be reformatted again. 'full' "
+            "reformats the whole output a second time. 'structural' checks the output "
+            "is made up of the same sections that were written to it. 'sampled' also "
+            "reformats a fraction of those sections again (see --sample-fraction). "
+            "'off' skips the check. (default: %(default)s)"
+        ),
+    )
+    parser.add_argument(
+        "--sample-fraction",
+        default=DEFAULT_SAMPLE_FRACTION,
+        type=fraction,
+        help=(
+            "The fraction of sections to reformat again when verification is "
+            "sampled. (default: %(default)s)"
+        ),
+    )
+
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        default=False,
+        help=(
+            "Reformat every file, even ones that haven't changed since they were last "
+            "known to be formatted. Otherwise, a cache of formatted files is kept in "
+            "$MARKFLOW_CACHE_DIR or the user cache directory."
+        ),
+    )
+    parser.add_argument(
+        "--content-cache-dir",
+        type=Directory(permissions=[WRITABLE]),
+        help=(
+            "Also cache how files are formatted by their contents in this directory. "
+            "Unlike the default cache, it still works on fresh checkouts, so it can be "
+            "kept between CI runs and shared between branches."
+        ),
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=positive_integer,
+        help=(
+            "The number of files to reformat at once, each in its own process. "
+            "(default: the number of CPUs)"
+        ),
+    )
+
+    parser.add_argument(
+        "--lsp",
+        action="store_true",
+        default=False,
+        help=(
+            "Run as a language server, speaking the Language Server Protocol over "
+            "STDIN and STDOUT, so editors can reformat documents as they are edited."
+        ),
+    )
+
+    parser.add_argument(
+        "--report",
+        choices=list(REPORTERS),
+        help=(
+            "How to report what happened to each file. 'json' prints a single JSON "
+            "document once every file is done, and 'ndjson' prints a line of JSON for "
+            "each file as soon as it is done. (default: 'rich' if writing to a "
+            "terminal, otherwise 'plain')"
+        ),
+    )
 
     parser.add_argument(
         "-v",
@@ -128,8 +268,8 @@ def parse_args(argv: List[str]) -> argparse.Namespace:
     )
     parser.add_argument(
         "--version",
-        action="version",
-        version=f"MarkFlow version {get_version()}",
+        action=LazyVersionAction,
+        get_version=lambda: f"MarkFlow version {get_version()}",
         help="Show the version number then exit.",
     )
 
@@ -200,7 +340,8 @@ def parse_args(argv: List[str]) -> argparse.Namespace:
     logging.basicConfig(
         format="",
         level=logging_levels[verbosity],
-        handlers=[rich.logging.RichHandler()],
+        # STDOUT belongs to the protocol when running as a language server
+        handlers=[logging.StreamHandler(sys.stderr) if args.lsp else LazyRichHandler()],
     )
 
     if args.developer_help:
@@ -210,27 +351,52 @@ def parse_args(argv: List[str]) -> argparse.Namespace:
         parser.print_help()
         sys.exit(-1)
 
-    # We need to ensure there are enough files to write to.
-    if args.output_files and len(args.paths) != len(args.output_files):
-        parser.print_usage()
-        print(
-            f"{parser.prog}: error: argument(s) --output-file: invalid number of "
-            f"files specified: expected {len(args.paths)} passed "
-            f"{len(args.output_files)}"
-        )
-        sys.exit(-1)
+    if args.lsp and (args.paths or args.check or args.diff):
+        parser.error("argument --lsp: not allowed with paths, --check or --diff")
+    args.check = args.check or args.diff
+    if args.fail_fast and not args.check:
+        parser.error("argument --fail-fast: requires --check or --diff")
+
+    # argparse only applies `type` to string defaults
+    if isinstance(args.exclude, str):
+        args.exclude = regex(args.exclude)
+    # The lines to reformat the sections of in each file, if not all of them
+    args.line_ranges = None
+    if args.since is not None or args.staged:
+        from ._git import GitError, changed_markdown_files
+
+        try:
+            changed = changed_markdown_files(
+                args.paths,
+                args.since,
+                args.staged,
+                args.changed_sections_only,
+                args.exclude,
+                args.extend_exclude,
+            )
+        except GitError as error:
+            parser.error(str(error))
+        args.paths = list(changed)
+        if args.changed_sections_only:
+            args.line_ranges = {
+                path: ranges for path, ranges in changed.items() if ranges is not None
+            }
+    elif args.changed_sections_only:
+        parser.error("argument --changed-sections-only: requires --since or --staged")
+    else:
+        args.paths = MarkdownFiles(args.paths, args.exclude, args.extend_exclude)
 
-    # If we aren't writing to other files, ensure we can write to the files that were
-    # passed in as we only guaranteed they were readable by `parse_args`. We sort of
-    # duplicate argparse's parameter construction here to do so.
-    if not args.output_files and not args.output_directory and not args.check:
-        for path in args.paths:
-            try:
-                File([WRITABLE])(path)
-            except argparse.ArgumentTypeError as ate:
-                parser.print_usage()
-                print(f"{parser.prog}: error: argument paths: {str(ate)}")
-                sys.exit(-1)
+    # We need to ensure there are enough files to write to.
+    if args.output_files:
+        path_count = len(list(args.paths))
+        if path_count != len(args.output_files):
+            parser.print_usage()
+            print(
+                f"{parser.prog}: error: argument(s) --output-file: invalid number of "
+                f"files specified: expected {path_count} passed "
+                f"{len(args.output_files)}"
+            )
+            sys.exit(-1)
 
     return args
 
@@ -266,20 +432,66 @@ def _print_renders(text: str, width: Number = 88) -> None:
     print(second_contents)
 
 
-def _reformat_files(args: argparse.Namespace) -> int:
+def _reformat_files(args: argparse.Namespace, reporter: Reporter) -> None:
+    # Only needed for files, so reformatting STDIN doesn't have to import them
+    from ._cache import ContentCache, FileCache, user_cache_dir
+    from ._io import write_file
+    from ._jobs import reformat_files
+
+    path_pairs: Iterable[Tuple[pathlib.Path, pathlib.Path]]
     if args.output_directory:
-        output_paths = [args.output_directory / p.name for p in args.paths]
+        path_pairs = ((p, args.output_directory / p.name) for p in args.paths)
     elif args.output_files:
-        output_paths = args.output_files
+        path_pairs = zip(args.paths, args.output_files)
     else:
-        output_paths = args.paths
+        path_pairs = ((p, p) for p in args.paths)
+
+    # Files are only skipped when they are reformatted in place. Otherwise, the output
+    # file still needs to be written.
+    cache: Optional[FileCache] = None
+    if not args.no_cache and not args.output_directory and not args.output_files:
+        cache = FileCache(
+            args.line_length,
+            VerificationPolicy(args.verify),
+            get_version(),
+            user_cache_dir(),
+        )
+
+    content_cache: Optional[ContentCache] = None
+    if args.content_cache_dir:
+        content_cache = ContentCache(
+            args.line_length,
+            VerificationPolicy(args.verify),
+            get_version(),
+            args.content_cache_dir,
+        )
 
-    files_left_unchanged = 0
-    files_changed = 0
-    for input_path, output_path in zip(args.paths, output_paths):
-        old_contents = input_path.read_text()
+    def uncached_path_pairs() -> Iterator[Tuple[pathlib.Path, pathlib.Path]]:
+        for input_path, output_path in path_pairs:
+            if cache and cache.is_formatted(input_path):
+                reporter.unchanged(str(input_path))
+            else:
+                yield input_path, output_path
+
+    # Paths are found as they are reformatted, so they are shared between what is
+    # being reformatted and what is being reported on
+    pairs_to_reformat, pairs_to_report = itertools.tee(uncached_path_pairs())
+    results = reformat_files(
+        (input_path for input_path, _ in pairs_to_reformat),
+        args.line_length,
+        VerificationPolicy(args.verify),
+        args.sample_fraction,
+        args.jobs,
+        content_cache,
+        args.line_ranges,
+        args.check,
+        args.diff,
+    )
+    for input_path, output_path in pairs_to_report:
+        # Files that were only partly reformatted might still not be formatted
+        whole_file = args.line_ranges is None or input_path not in args.line_ranges
         try:
-            new_contents = reformat_markdown_text(old_contents, args.line_length)
+            result = next(results)
         except RuntimeError as runtime_error:
             if args.write_renders and isinstance(
                 runtime_error, ReformatInconsistentException
@@ -292,47 +504,42 @@ def _reformat_files(args: argparse.Namespace) -> int:
                 new_args.append(arg)
             runtime_error.args = tuple(new_args)
             raise
-        if new_contents != old_contents:
-            files_changed += 1
-            if not args.check:
-                output_path.write_text(new_contents)
-                print_markdown(f"**reformatted {input_path}**")
-            else:
-                print_markdown(f"would reformat {input_path}")
+        if result.changed:
+            if result.contents is not None:
+                # We only know the files we read are readable, so we make sure we can
+                # write to the ones we need to change before we do
+                try:
+                    File([WRITABLE])(str(output_path))
+                except argparse.ArgumentTypeError as ate:
+                    logger.error("Unable to reformat %s: %s", input_path, ate)
+                    reporter.unwritable(str(input_path))
+                    continue
+                write_file(output_path, result.contents)
+                if cache and whole_file:
+                    cache.add(input_path)
+            if result.diff:
+                sys.stdout.write(result.diff)
+            assert result.first_difference is not None
+            reporter.reformatted(
+                str(input_path), result.duration, result.first_difference + 1
+            )
+            if args.fail_fast:
+                break
         else:
-            if output_path != input_path:
-                output_path.write_text(new_contents)
-            files_left_unchanged += 1
+            # Nothing is written when checking
+            if output_path != input_path and result.contents is not None:
+                write_file(output_path, result.contents)
+            if cache and whole_file:
+                cache.add(input_path)
+            reporter.unchanged(str(input_path), result.duration)
 
-    print_markdown("All done!")
-    messages: List[str] = []
-    return_value = 0
-    if args.check:
-        if files_changed:
-            file_word = "file" if files_changed == 1 else "files"
-            messages.append(f"**{files_changed} {file_word} would be reformatted.**")
-            return_value = 1
-        if files_left_unchanged:
-            file_word = "file" if files_left_unchanged == 1 else "files"
-            messages.append(
-                f"{files_left_unchanged} {file_word} would be left unchanged."
-            )
-    else:
-        if files_changed:
-            file_word = "file" if files_changed == 1 else "files"
-            file_verb = "was" if files_changed == 1 else "were"
-            messages.append(f"**{files_changed} {file_word} {file_verb} reformatted.**")
-        if files_left_unchanged:
-            file_word = "file" if files_left_unchanged == 1 else "files"
-            file_verb = "was" if files_left_unchanged == 1 else "were"
-            messages.append(
-                f"{files_left_unchanged} {file_word} {file_verb} left unchanged."
-            )
-    print_markdown(" ".join(messages))
-    return return_value
+    if cache:
+        cache.save()
 
 
-def _reformat_stdin(args: argparse.Namespace, stdin: TextIO) -> int:
+def _reformat_stdin(
+    args: argparse.Namespace, stdin: TextIO, reporter: Reporter
+) -> None:
     if args.output_directory or args.output_files:
         logger.warning(
             "MarkFlow is being run in interactive mode. Results will be written to "
@@ -341,7 +548,26 @@ def _reformat_stdin(args: argparse.Namespace, stdin: TextIO) -> int:
 
     old_contents = stdin.read()
     try:
-        new_contents = reformat_markdown_text(old_contents, args.line_length)
+        if args.check:
+            changed_sections: Iterable[Tuple[int, List[str], List[str]]]
+            changed_sections = _changed_sections(
+                old_contents,
+                args.line_length,
+                VerificationPolicy(args.verify),
+                args.sample_fraction,
+            )
+            if args.diff:
+                changed_sections = list(changed_sections)
+                lines = old_contents.splitlines(keepends=True)
+                sys.stdout.write(unified_diff("STDIN", lines, changed_sections))
+            first_difference = _first_changed_line(changed_sections)
+        else:
+            new_contents = reformat_markdown_text(
+                old_contents,
+                args.line_length,
+                VerificationPolicy(args.verify),
+                args.sample_fraction,
+            )
     except RuntimeError as runtime_error:
         if args.write_renders and isinstance(
             runtime_error, ReformatInconsistentException
@@ -350,15 +576,9 @@ def _reformat_stdin(args: argparse.Namespace, stdin: TextIO) -> int:
         raise
 
     if args.check:
-        if new_contents != old_contents:
-            print_markdown("STDIN would be reformatted.")
-            return 1
-        else:
-            print_markdown("STDIN would be unchanged.")
-            return 0
+        reporter.stdin(first_difference is not None)
     else:
         print(new_contents, end="")
-        return 0
 
 
 def main(argv: List[str]) -> int:
@@ -367,14 +587,39 @@ def main(argv: List[str]) -> int:
     if args.line_length < 1:
         args.line_length = math.inf
 
-    if not args.paths:
-        if sys.stdin.isatty():
-            print_markdown("**No path provided. Nothing to do.**")
-            return 0
+    if args.lsp:
+        from ._lsp import serve
+
+        return serve(
+            sys.stdin.buffer,
+            sys.stdout.buffer,
+            args.line_length,
+            VerificationPolicy(args.verify),
+            args.sample_fraction,
+        )
+
+    # Only errors are reported when quieter than the default
+    quiet = args.quiet > args.verbose
+    # Diffs are written to STDOUT, so they can be piped somewhere
+    reporter = get_reporter(
+        args.report, args.check, quiet, sys.stderr if args.diff else None
+    )
+    try:
+        if not args.paths:
+            if args.since is not None or args.staged:
+                reporter.nothing_to_do("No changed Markdown files.")
+                return 0
+            if sys.stdin.isatty():
+                reporter.nothing_to_do("No path provided.")
+                return 0
+            _reformat_stdin(args, sys.stdin, reporter)
         else:
-            return _reformat_stdin(args, sys.stdin)
-    else:
-        return _reformat_files(args)
+            _reformat_files(args, reporter)
+            reporter.finish()
+    finally:
+        # Anything that was held back is still shown if something goes wrong
+        reporter.flush()
+    return reporter.return_code
 
 
 def __main__() -> None:
@@ -1,9 +1,9 @@
 import argparse
 import dataclasses
-import glob
 import os
 import pathlib
-from typing import Any, Callable, List, Optional, Sequence, Union, cast
+import re
+from typing import Any, Callable, List, Optional, Pattern, Sequence, Union
 
 
 @dataclasses.dataclass(frozen=True)
@@ -94,18 +94,54 @@ class File:
         return path
 
 
-class AddMarkdownFilesInDirOrPathsAction(argparse.Action):
+def fraction(string: str) -> float:
+    try:
+        value = float(string)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid fraction: {repr(string)}")
+    if not 0 <= value <= 1:
+        raise argparse.ArgumentTypeError(
+            f"fraction must be between 0 and 1: {repr(string)}"
+        )
+    return value
+
+
+def positive_integer(string: str) -> int:
+    try:
+        value = int(string)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid integer: {repr(string)}")
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"integer must be at least 1: {repr(string)}")
+    return value
+
+
+def regex(string: str) -> Pattern[str]:
+    try:
+        return re.compile(string)
+    except re.error as error:
+        raise argparse.ArgumentTypeError(
+            f"invalid regular expression {repr(string)}: {error}"
+        )
+
+
+class LazyVersionAction(argparse.Action):
+    """Like argparse's "version" action, but the version is only looked up if asked for
+
+    Args:
+        get_version: Returns the message to show.
+    """
+
     def __init__(
         self,
         option_strings: List[str],
-        dest: str,
-        type: Callable[[str], pathlib.Path],
-        nargs: Optional[str] = None,
-        **kwargs: Any,
+        get_version: Callable[[], str],
+        dest: str = argparse.SUPPRESS,
+        default: str = argparse.SUPPRESS,
+        help: Optional[str] = None,
     ):
-        if nargs != "*":
-            raise ValueError("nargs must be *")
-        super().__init__(option_strings, dest, type=type, nargs=nargs, **kwargs)
+        super().__init__(option_strings, dest, nargs=0, default=default, help=help)
+        self._get_version = get_version
 
     def __call__(
         self,
@@ -114,14 +150,5 @@ class AddMarkdownFilesInDirOrPathsAction(argparse.Action):
         values: Union[str, Sequence[Any], None],
         option_string: Optional[str] = None,
     ) -> None:
-        if values is None:
-            return
-        values = cast(Sequence[pathlib.Path], values)
-        expanded_paths = []
-        for value in values:
-            if value.is_file():
-                expanded_paths.append(value)
-            else:
-                markdown_paths = glob.glob(str(value / "**" / "*.md"), recursive=True)
-                expanded_paths += [pathlib.Path(path) for path in markdown_paths]
-        setattr(namespace, self.dest, expanded_paths)
+        print(self._get_version())
+        parser.exit()
@@ -0,0 +1,201 @@
+"""
+Remembering which files are already formatted
+
+Once a file is known to be formatted, its size and modification time are recorded in a
+cache in the user's cache directory. If neither has changed the next time MarkFlow is
+run, the file is skipped without being read. Each cache is specific to a line length,
+verification policy and version of MarkFlow since changing any of them could change how
+a file is formatted, or whether it can be.
+
+Modification times don't survive a fresh checkout, though. A `ContentCache` is instead
+keyed by a hash of the contents of a file (along with the line length, verification
+policy and version) and
+records how those contents are formatted, so it can be shared between checkouts and
+machines.
+"""
+import hashlib
+import logging
+import math
+import os
+import pathlib
+import pickle
+import re
+import sys
+from typing import Dict, Optional, Tuple
+
+from ._io import Buffer, write_atomically
+from .reformat_markdown import VerificationPolicy
+from .typing import Number
+
+__all__ = ["CACHE_DIR_ENV_VAR", "ContentCache", "FileCache", "user_cache_dir"]
+
+logger = logging.getLogger(__name__)
+
+# Set this to keep caches somewhere other than the user's cache directory
+CACHE_DIR_ENV_VAR = "MARKFLOW_CACHE_DIR"
+
+# A file's modification time and size
+CacheInfo = Tuple[float, int]
+
+
+def user_cache_dir() -> pathlib.Path:
+    """The directory MarkFlow keeps its caches in
+
+    This is `$MARKFLOW_CACHE_DIR` if it is set. Otherwise, it is the platform's usual
+    place for caches.
+    """
+    cache_dir = os.environ.get(CACHE_DIR_ENV_VAR)
+    if cache_dir:
+        return pathlib.Path(cache_dir)
+
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or str(pathlib.Path.home() / "AppData")
+    elif sys.platform == "darwin":
+        base = str(pathlib.Path.home() / "Library" / "Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or str(pathlib.Path.home() / ".cache")
+    return pathlib.Path(base) / "markflow"
+
+
+def _get_cache_info(path: pathlib.Path) -> CacheInfo:
+    stat = path.stat()
+    return stat.st_mtime, stat.st_size
+
+
+def _width_name(width: Number) -> str:
+    return "inf" if width == math.inf else str(width)
+
+
+def _write_atomically(path: pathlib.Path, data: bytes) -> None:
+    # Written to a temporary file first so that runs in parallel never see half of it
+    path.parent.mkdir(parents=True, exist_ok=True)
+    write_atomically(path, data)
+
+
+class FileCache:
+    """The files known to already be formatted for a line length, policy and version
+
+    Attributes:
+        cache_file: Where the cache is read from and saved to.
+    """
+
+    def __init__(
+        self,
+        width: Number,
+        verification: VerificationPolicy,
+        version: str,
+        cache_dir: pathlib.Path,
+    ):
+        version_name = re.sub(r"[^\w.]+", "_", version).strip("_")
+        file_name = f"cache.{_width_name(width)}.{verification.value}.pickle"
+        self.cache_file = cache_dir / version_name / file_name
+        self._cache: Dict[str, CacheInfo] = self._read()
+
+    def _read(self) -> Dict[str, CacheInfo]:
+        try:
+            with self.cache_file.open("rb") as cache_file:
+                cache = pickle.load(cache_file)
+        except FileNotFoundError:
+            return {}
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError) as error:
+            logger.debug("Ignoring unreadable cache %s: %s", self.cache_file, error)
+            return {}
+        if not isinstance(cache, dict):
+            return {}
+        return cache
+
+    def is_formatted(self, path: pathlib.Path) -> bool:
+        """Whether path is unchanged since it was last known to be formatted"""
+        cached_info = self._cache.get(str(path.resolve()))
+        if cached_info is None:
+            return False
+        try:
+            return _get_cache_info(path) == cached_info
+        except OSError:
+            return False
+
+    def add(self, path: pathlib.Path) -> None:
+        """Record that path is formatted as it is now"""
+        self._cache[str(path.resolve())] = _get_cache_info(path)
+
+    def save(self) -> None:
+        """Write the cache to `cache_file`
+
+        Failing to save the cache isn't an error; it just won't help next time.
+        """
+        data = pickle.dumps(self._cache, pickle.HIGHEST_PROTOCOL)
+        try:
+            _write_atomically(self.cache_file, data)
+        except OSError as error:
+            logger.warning("Unable to save cache %s: %s", self.cache_file, error)
+
+
+class ContentCache:
+    """How file contents are formatted for a line length, policy and version
+
+    Each entry is a file named after the hash of the contents it is for. It either marks
+    the contents as already formatted or holds what they are reformatted to. Entries
+    are never changed once written, so a directory can be shared between branches and
+    runs in parallel.
+
+    Attributes:
+        cache_dir: The directory the entries are kept in.
+    """
+
+    # The first byte of an entry
+    _FORMATTED = b"="
+    _REFORMATTED = b"+"
+
+    def __init__(
+        self,
+        width: Number,
+        verification: VerificationPolicy,
+        version: str,
+        cache_dir: pathlib.Path,
+    ):
+        self.cache_dir = cache_dir
+        self._salt = f"{_width_name(width)}\0{verification.value}\0{version}\0".encode()
+
+    def key(self, contents: Buffer) -> str:
+        """The key for the raw contents of a file"""
+        digest = hashlib.sha256(self._salt)
+        digest.update(contents)
+        return digest.hexdigest()
+
+    def _entry(self, key: str) -> pathlib.Path:
+        return self.cache_dir / key[:2] / key[2:]
+
+    def get(self, key: str) -> Optional[Tuple[bool, Optional[str]]]:
+        """Look up how the contents with key are formatted
+
+        Returns:
+            None if the contents aren't in the cache. Otherwise, a tuple of two values.
+            The first is whether the contents would be changed. The second is what they
+            are reformatted to if so, or None.
+        """
+        try:
+            entry = self._entry(key).read_bytes()
+        except OSError:
+            return None
+        if entry == self._FORMATTED:
+            return False, None
+        if entry[:1] == self._REFORMATTED:
+            return True, entry[1:].decode("utf-8", "surrogatepass")
+        return None
+
+    def set(self, key: str, reformatted: Optional[str]) -> None:
+        """Record how the contents with key are formatted
+
+        Args:
+            key: The key of the contents. See `key`.
+            reformatted: What the contents are reformatted to, or None if they are
+                already formatted.
+        """
+        if reformatted is None:
+            entry = self._FORMATTED
+        else:
+            entry = self._REFORMATTED + reformatted.encode("utf-8", "surrogatepass")
+        try:
+            _write_atomically(self._entry(key), entry)
+        except OSError as error:
+            logger.warning("Unable to write to cache %s: %s", self.cache_dir, error)
@@ -0,0 +1,425 @@
+"""
+markflowd: reformatting Markdown over HTTP
+
+Starting MarkFlow for every file means paying for starting Python and importing
+MarkFlow every time. `markflowd` instead stays running and reformats documents sent to
+it, in the style of `blackd`. It listens on localhost (or a Unix socket) and reformats
+documents in a pool of worker processes that have already imported and warmed up
+MarkFlow.
+
+To reformat a document, POST it to `/` in UTF-8 (or the charset in its Content-Type).
+Options are passed as headers:
+
+* X-Line-Length: The maximum line length. Anything less than 1 means infinity.
+* X-Verify: The verification policy, e.g. "structural". See `VerificationPolicy`.
+* X-Sample-Fraction: The fraction of sections to reformat again when sampling.
+
+The response is one of:
+
+* 200: The document was reformatted. The body is the reformatted document.
+* 204: The document was already formatted.
+* 400: The options or document were invalid. The body describes why.
+* 413: The document is larger than the server accepts.
+* 500: The document couldn't be reformatted consistently. The body describes why.
+* 503: Too many documents are already being reformatted. Try again later.
+* 504: Reformatting the document took too long.
+
+`GET /health` responds with a JSON document describing the server.
+
+Connections are closed if the client doesn't send anything for `SOCKET_TIMEOUT`
+seconds while a request is being read, or between requests.
+"""
+import argparse
+import concurrent.futures
+import errno
+import http.server
+import json
+import logging
+import math
+import os
+import socketserver
+import stat
+import sys
+import threading
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from ._argparse import fraction, positive_integer
+from ._utils import LazyRichHandler
+from .exceptions import MarkdownFormatException, ReformatInconsistentException
+from .reformat_markdown import (
+    DEFAULT_SAMPLE_FRACTION,
+    VerificationPolicy,
+    reformat_markdown_text,
+)
+from .typing import Number
+
+__all__ = ["DEFAULT_HOST", "DEFAULT_PORT", "make_server"]
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "localhost"
+DEFAULT_PORT = 45485
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_MAX_BODY_SIZE = 10 * 1024 * 1024
+SOCKET_TIMEOUT = 30.0
+
+LINE_LENGTH_HEADER = "X-Line-Length"
+VERIFY_HEADER = "X-Verify"
+SAMPLE_FRACTION_HEADER = "X-Sample-Fraction"
+
+# Reformatted to get the regular expressions and such compiled in the workers before the
+# first requests for them come in
+_WARM_UP_DOCUMENT = """\
+# Heading
+
+Paragraph with *emphasis*, `code` and a [link](https://example.com).
+
+> * Quoted
+>   1. list
+
+| Table |
+|-------|
+"""
+
+
+def _warm_up() -> None:
+    reformat_markdown_text(_WARM_UP_DOCUMENT)
+
+
+class _BadRequest(Exception):
+    pass
+
+
+def _parse_options(headers: Any) -> Tuple[Number, VerificationPolicy, float]:
+    try:
+        width: Number = int(headers.get(LINE_LENGTH_HEADER, 88))
+    except ValueError:
+        raise _BadRequest(f"invalid {LINE_LENGTH_HEADER}")
+    if width < 1:
+        width = math.inf
+    try:
+        verification = VerificationPolicy(
+            headers.get(VERIFY_HEADER, VerificationPolicy.FULL.value)
+        )
+    except ValueError:
+        raise _BadRequest(f"invalid {VERIFY_HEADER}")
+    try:
+        sample_fraction = fraction(
+            headers.get(SAMPLE_FRACTION_HEADER, str(DEFAULT_SAMPLE_FRACTION))
+        )
+    except argparse.ArgumentTypeError:
+        raise _BadRequest(f"invalid {SAMPLE_FRACTION_HEADER}")
+    return width, verification, sample_fraction
+
+
+class _RequestHandler(http.server.BaseHTTPRequestHandler):
+    server: "_Server"
+    protocol_version = "HTTP/1.1"
+    # Slow clients would otherwise hold on to a thread forever without ever being
+    # counted as reformatting anything
+    timeout = SOCKET_TIMEOUT
+
+    def address_string(self) -> str:
+        # Unix sockets don't have a host
+        if isinstance(self.client_address, tuple):
+            return str(self.client_address[0])
+        return "unix"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.info("%s - " + format, self.address_string(), *args)
+
+    def _respond(
+        self,
+        status: int,
+        body: str = "",
+        content_type: str = "text/plain; charset=utf-8",
+        headers: Optional[Dict[str, str]] = None,
+    ) -> None:
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        if self.path != "/health":
+            self._respond(404, "not found")
+            return
+        health = {
+            "status": "ok",
+            "workers": self.server.workers,
+            "in_flight": self.server.in_flight,
+            "max_concurrent_requests": self.server.max_concurrent_requests,
+        }
+        self._respond(200, json.dumps(health), "application/json")
+
+    def do_POST(self) -> None:
+        if self.path != "/":
+            self._respond(404, "not found")
+            return
+        try:
+            length = int(self.headers["Content-Length"])
+        except (TypeError, ValueError):
+            self._respond(411, "Content-Length is required")
+            return
+        if length > self.server.max_body_size:
+            # The body is never read, so the connection can't be reused
+            self._respond(413, "document too large", headers={"Connection": "close"})
+            return
+        body = self.rfile.read(length)
+
+        try:
+            width, verification, sample_fraction = _parse_options(self.headers)
+            charset = self.headers.get_content_charset() or "utf-8"
+            try:
+                text = body.decode(charset)
+            except (LookupError, UnicodeDecodeError) as error:
+                raise _BadRequest(f"unable to decode body: {error}")
+        except _BadRequest as error:
+            self._respond(400, str(error))
+            return
+
+        if not self.server.start_reformatting():
+            self._respond(503, "too many requests", headers={"Retry-After": "1"})
+            return
+        try:
+            future = self.server.executor.submit(
+                reformat_markdown_text, text, width, verification, sample_fraction
+            )
+        except BaseException:
+            self.server.finish_reformatting()
+            raise
+        # A worker that is reformatting a document can't be stopped, so the document
+        # counts as being reformatted until it's done, even if we stop waiting for it
+        future.add_done_callback(lambda _: self.server.finish_reformatting())
+        self._respond_with_reformatted(future, text)
+
+    def _respond_with_reformatted(
+        self, future: "concurrent.futures.Future[str]", text: str
+    ) -> None:
+        try:
+            reformatted = future.result(timeout=self.server.request_timeout)
+        except concurrent.futures.TimeoutError:
+            # This only stops documents that are still waiting for a worker
+            future.cancel()
+            self._respond(504, "timed out")
+            return
+        except MarkdownFormatException as error:
+            self._respond(400, str(error))
+            return
+        except ReformatInconsistentException as error:
+            self._respond(500, str(error))
+            return
+        except Exception as error:
+            logger.exception("Unable to reformat document")
+            self._respond(500, f"unable to reformat document: {error}")
+            return
+
+        if reformatted == text:
+            self._respond(204)
+        else:
+            self._respond(200, reformatted)
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.BaseServer):
+    """What both kinds of servers share
+
+    The attributes are filled in by `make_server`.
+    """
+
+    daemon_threads = True
+    executor: concurrent.futures.Executor
+    workers: int
+    request_timeout: float
+    max_body_size: int
+    max_concurrent_requests: int
+    in_flight: int
+    _in_flight_lock: threading.Lock
+
+    def start_reformatting(self) -> bool:
+        """Count a document as being reformatted unless there are already too many"""
+        with self._in_flight_lock:
+            if self.in_flight >= self.max_concurrent_requests:
+                return False
+            self.in_flight += 1
+            return True
+
+    def finish_reformatting(self) -> None:
+        """Stop counting a document as being reformatted"""
+        with self._in_flight_lock:
+            self.in_flight -= 1
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.executor.shutdown(wait=False)
+
+
+class _TCPServer(_Server, http.server.HTTPServer):
+    pass
+
+
+class _UnixServer(_Server, socketserver.UnixStreamServer):
+    pass
+
+
+def make_server(
+    address: Union[Tuple[str, int], str],
+    workers: Optional[int] = None,
+    max_concurrent_requests: Optional[int] = None,
+    timeout: float = DEFAULT_TIMEOUT,
+    executor: Optional[concurrent.futures.Executor] = None,
+    max_body_size: int = DEFAULT_MAX_BODY_SIZE,
+) -> _Server:
+    """Create a markflowd server
+
+    Args:
+        address: A (host, port) to listen on over TCP or a path for a Unix socket.
+        workers (optional): How many worker processes to reformat documents in.
+            Defaults to one per CPU.
+        max_concurrent_requests (optional): How many documents can be reformatted at
+            once before new requests are turned away. Defaults to twice the number of
+            workers.
+        timeout (optional): How many seconds to wait for a document to be reformatted.
+        executor (optional): What to reformat documents with instead of a pool of
+            `workers` processes.
+        max_body_size (optional): The largest document in bytes to accept.
+
+    Returns:
+        The server, ready to `serve_forever`. Close it with `server_close`, which also
+        shuts down the executor.
+
+    Raises:
+        OSError: The server couldn't listen on the address, e.g. because something
+            other than a socket is at its path.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if max_concurrent_requests is None:
+        max_concurrent_requests = 2 * workers
+
+    server: _Server
+    if isinstance(address, str):
+        # A socket left behind by a server that didn't shut down cleanly would keep us
+        # from binding, but anything else there isn't ours to remove
+        if os.path.exists(address):
+            if not stat.S_ISSOCK(os.stat(address).st_mode):
+                raise FileExistsError(errno.EEXIST, "Not a socket", address)
+            os.unlink(address)
+        server = _UnixServer(address, _RequestHandler)
+    else:
+        server = _TCPServer(address, _RequestHandler)
+    if executor is None:
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+        # One for each worker, though an idle worker may take more than one. Pool
+        # initializers would do this for every worker, but they need Python 3.7.
+        for _ in range(workers):
+            executor.submit(_warm_up)
+    server.executor = executor
+    server.workers = workers
+    server.request_timeout = timeout
+    server.max_body_size = max_body_size
+    server.max_concurrent_requests = max_concurrent_requests
+    server.in_flight = 0
+    server._in_flight_lock = threading.Lock()
+    return server
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="markflowd",
+        description="Reformat Markdown sent over HTTP.",
+    )
+    parser.add_argument(
+        "--bind-host",
+        default=DEFAULT_HOST,
+        help="The address to listen on. (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--bind-port",
+        default=DEFAULT_PORT,
+        type=int,
+        help="The port to listen on. (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--socket",
+        help="Listen on a Unix socket at this path instead of over TCP.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=positive_integer,
+        help=(
+            "The number of processes to reformat documents in. (default: the number "
+            "of CPUs)"
+        ),
+    )
+    parser.add_argument(
+        "--max-concurrent-requests",
+        type=positive_integer,
+        help=(
+            "The number of documents to reformat at once before turning requests "
+            "away. (default: twice the number of workers)"
+        ),
+    )
+    parser.add_argument(
+        "--timeout",
+        default=DEFAULT_TIMEOUT,
+        type=float,
+        help="Seconds to wait for a document to be reformatted. (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--max-body-size",
+        default=DEFAULT_MAX_BODY_SIZE,
+        type=positive_integer,
+        help="The largest document in bytes to accept. (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action="store_true",
+        default=False,
+        help="Log every request.",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str]) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(
+        format="",
+        level=logging.INFO if args.verbose else logging.WARNING,
+        handlers=[LazyRichHandler()],
+    )
+    address: Union[Tuple[str, int], str] = args.socket or (
+        args.bind_host,
+        args.bind_port,
+    )
+    try:
+        server = make_server(
+            address,
+            args.workers,
+            args.max_concurrent_requests,
+            args.timeout,
+            max_body_size=args.max_body_size,
+        )
+    except OSError as error:
+        logger.error("Unable to listen on %s: %s", args.socket or address, error)
+        return 1
+    logger.warning("markflowd listening on %s", args.socket or server.server_address)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+def __main__() -> None:
+    sys.exit(main(sys.argv[1:]))
+
+
+if __name__ == "__main__":
+    __main__()
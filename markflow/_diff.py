@@ -0,0 +1,130 @@
+"""
+Showing how files would be reformatted as unified diffs
+
+Rather than diffing whole files, only the top level sections that reformatting changes
+are diffed (see `_changed_sections`), so how long it takes depends on how much changes
+rather than how large a file is. The lines between them are known to be unchanged and
+are only looked at to show them as context around changes.
+"""
+import difflib
+from typing import Iterable, Iterator, List, Tuple
+
+__all__ = ["unified_diff"]
+
+# How many unchanged lines to show around changes
+CONTEXT_LINES = 3
+
+_NO_NEWLINE = "\\ No newline at end of file\n"
+
+# Like `difflib.SequenceMatcher.get_opcodes`, along with the new lines for insertions
+# and replacements
+Opcode = Tuple[str, int, int, int, int, List[str]]
+
+
+def _opcodes(
+    line_count: int, changed_sections: Iterable[Tuple[int, List[str], List[str]]]
+) -> Iterator[Opcode]:
+    old_end = new_end = 0
+    for start, old_lines, new_lines in changed_sections:
+        offset = new_end - old_end
+        if start > old_end:
+            yield "equal", old_end, start, new_end, start + offset, []
+        matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            yield (
+                tag,
+                start + i1,
+                start + i2,
+                start + offset + j1,
+                start + offset + j2,
+                new_lines[j1:j2] if tag != "equal" else [],
+            )
+        old_end = start + len(old_lines)
+        new_end = start + offset + len(new_lines)
+    if line_count > old_end:
+        yield "equal", old_end, line_count, new_end, new_end + line_count - old_end, []
+
+
+def _merged(opcodes: Iterable[Opcode]) -> List[Opcode]:
+    # Sections that are next to each other leave unchanged lines next to each other
+    merged: List[Opcode] = []
+    for opcode in opcodes:
+        if merged and opcode[0] == merged[-1][0] == "equal":
+            tag, i1, _, j1, _, _ = merged[-1]
+            merged[-1] = (tag, i1, opcode[2], j1, opcode[4], [])
+        else:
+            merged.append(opcode)
+    return merged
+
+
+def _grouped(opcodes: List[Opcode], context: int) -> Iterator[List[Opcode]]:
+    """Group changes with the unchanged lines around them, like difflib does"""
+    if not opcodes:
+        return
+    if opcodes[0][0] == "equal":
+        tag, i1, i2, j1, j2, lines = opcodes[0]
+        opcodes[0] = tag, max(i1, i2 - context), i2, max(j1, j2 - context), j2, lines
+    if opcodes[-1][0] == "equal":
+        tag, i1, i2, j1, j2, lines = opcodes[-1]
+        opcodes[-1] = tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context), lines
+
+    group: List[Opcode] = []
+    for tag, i1, i2, j1, j2, lines in opcodes:
+        # Unchanged lines far enough from changes split them into separate hunks
+        if tag == "equal" and i2 - i1 > 2 * context:
+            end, new_end = min(i2, i1 + context), min(j2, j1 + context)
+            group.append((tag, i1, end, j1, new_end, []))
+            yield group
+            group = []
+            i1, j1 = max(i1, i2 - context), max(j1, j2 - context)
+        group.append((tag, i1, i2, j1, j2, lines))
+    if group and not (len(group) == 1 and group[0][0] == "equal"):
+        yield group
+
+
+def _format_range(start: int, end: int) -> str:
+    # Ranges are 1-based, except that an empty range starts on the line before it
+    if end - start == 1:
+        return str(start + 1)
+    if start == end:
+        return f"{start},0"
+    return f"{start + 1},{end - start}"
+
+
+def _format_line(prefix: str, line: str) -> str:
+    if line.endswith("\n"):
+        return prefix + line
+    return prefix + line + "\n" + _NO_NEWLINE
+
+
+def unified_diff(
+    path: str,
+    lines: List[str],
+    changed_sections: Iterable[Tuple[int, List[str], List[str]]],
+    context: int = CONTEXT_LINES,
+) -> str:
+    """Show the sections of a file that change as a unified diff
+
+    Args:
+        path: The path of the file to show in the diff's header.
+        lines: The lines of the file, with their line endings.
+        changed_sections: The index of the first line of each part of the file that
+            changes, its lines, and the lines it changes to, in order. See
+            `_changed_sections`.
+        context (optional): How many unchanged lines to show around changes.
+
+    Returns:
+        The diff, or an empty string if nothing changes.
+    """
+    diff: List[str] = []
+    for group in _grouped(_merged(_opcodes(len(lines), changed_sections)), context):
+        old_range = _format_range(group[0][1], group[-1][2])
+        new_range = _format_range(group[0][3], group[-1][4])
+        diff.append(f"@@ -{old_range} +{new_range} @@\n")
+        for tag, i1, i2, _, _, new_lines in group:
+            prefix = " " if tag == "equal" else "-"
+            diff.extend(_format_line(prefix, line) for line in lines[i1:i2])
+            diff.extend(_format_line("+", line) for line in new_lines)
+    if not diff:
+        return ""
+    return f"--- {path}\t(original)\n+++ {path}\t(reformatted)\n" + "".join(diff)
@@ -0,0 +1,240 @@
+"""
+Finding the Markdown files to reformat
+
+Directories are walked with `os.scandir` as files are needed rather than up front.
+Directories matching an exclude pattern or ignored by a `.gitignore` are skipped without
+looking inside of them.
+
+Exclude patterns are regular expressions searched for in the path of each file and
+directory relative to the directory that was passed in, with a leading "/" and with a
+trailing "/" for directories, e.g. "/docs/build/". `.gitignore` files are read from each
+directory as it is walked and apply to everything below them, like they do for git. So
+that walking a directory skips the same files as walking the repository it's in, the
+ones in the directories above it, up to the root of its repository, are read first.
+"""
+import os
+import pathlib
+import re
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Pattern, Tuple
+
+__all__ = ["DEFAULT_EXCLUDES", "MarkdownFiles"]
+
+DEFAULT_EXCLUDES = (
+    r"/(\.direnv|\.eggs|\.git|\.hg|\.mypy_cache|\.nox|\.tox|\.venv|venv|_build"
+    r"|buck-out|build|dist|node_modules)/"
+)
+
+
+class _IgnoreRule(NamedTuple):
+    regex: Pattern[str]
+    negated: bool
+    directories_only: bool
+
+
+# The directory a `.gitignore` is in (relative to the root of the repository, or the
+# directory being walked outside of one, ending in "/" unless it is that directory) and
+# its rules
+_IgnoreFile = Tuple[str, List[_IgnoreRule]]
+
+
+def _translate_glob(glob: str) -> str:
+    regex = ""
+    i = 0
+    while i < len(glob):
+        char = glob[i]
+        if glob.startswith("**/", i) and (i == 0 or glob[i - 1] == "/"):
+            regex += "(?:.*/)?"
+            i += 3
+            continue
+        if glob[i:] == "**" and i > 0 and glob[i - 1] == "/":
+            regex += ".*"
+            break
+        if char == "*":
+            regex += "[^/]*"
+        elif char == "?":
+            regex += "[^/]"
+        elif char == "[":
+            end = glob.find("]", i + 2)
+            if end == -1:
+                regex += re.escape(char)
+            else:
+                contents = glob[i + 1 : end]
+                if contents[0] == "!":
+                    contents = "^" + contents[1:]
+                regex += "[" + contents.replace("\\", "\\\\") + "]"
+                i = end
+        elif char == "\\" and i + 1 < len(glob):
+            i += 1
+            regex += re.escape(glob[i])
+        else:
+            regex += re.escape(char)
+        i += 1
+    return regex
+
+
+def _parse_ignore_rule(line: str) -> Optional[_IgnoreRule]:
+    # Trailing spaces are ignored unless they're escaped
+    line = re.sub(r"(?<!\\) +$", "", line.rstrip("\r\n"))
+    if not line or line.startswith("#"):
+        return None
+
+    negated = line.startswith("!")
+    if negated:
+        line = line[1:]
+    directories_only = line.endswith("/")
+    line = line.rstrip("/")
+    if not line:
+        return None
+
+    # A pattern with a slash anywhere but the end is relative to its `.gitignore`.
+    # Otherwise, it can match at any depth.
+    anchored = "/" in line
+    line = line.lstrip("/")
+    prefix = "" if anchored else "(?:.*/)?"
+    regex = re.compile(prefix + _translate_glob(line) + "$")
+    return _IgnoreRule(regex, negated, directories_only)
+
+
+def _read_ignore_file(directory: str) -> List[_IgnoreRule]:
+    try:
+        with open(os.path.join(directory, ".gitignore"), encoding="utf-8") as file:
+            lines = file.readlines()
+    except (OSError, UnicodeDecodeError):
+        return []
+    rules = [_parse_ignore_rule(line) for line in lines]
+    return [rule for rule in rules if rule is not None]
+
+
+def _find_repository_root(directory: pathlib.Path) -> Optional[pathlib.Path]:
+    for parent in [directory, *directory.parents]:
+        if (parent / ".git").exists() or (parent / ".hg").exists():
+            return parent
+    return None
+
+
+def _parent_ignore_files(root: pathlib.Path) -> Tuple[str, List[_IgnoreFile]]:
+    """Read the `.gitignore` files above a directory in its repository
+
+    Returns:
+        The path of the directory relative to the root of its repository, ending in "/"
+        unless it is the root, along with the `.gitignore` files. Outside of a
+        repository, there are none and the directory is treated as the root.
+    """
+    directory = root.resolve()
+    repository_root = _find_repository_root(directory)
+    if repository_root is None:
+        return "", []
+    ignore_files: List[_IgnoreFile] = []
+    parent = repository_root
+    relative_directory = ""
+    for name in directory.relative_to(repository_root).parts:
+        rules = _read_ignore_file(str(parent))
+        if rules:
+            ignore_files.append((relative_directory, rules))
+        parent = parent / name
+        relative_directory += name + "/"
+    return relative_directory, ignore_files
+
+
+def _is_ignored(ignore_files: List[_IgnoreFile], path: str, is_dir: bool) -> bool:
+    ignored = False
+    # Later rules (including those from deeper `.gitignore`s) take precedence
+    for base, rules in ignore_files:
+        if not path.startswith(base):
+            continue
+        relative_path = path[len(base) :]
+        for rule in rules:
+            if rule.directories_only and not is_dir:
+                continue
+            if rule.regex.match(relative_path):
+                ignored = not rule.negated
+    return ignored
+
+
+class MarkdownFiles:
+    """The Markdown files in the paths passed to MarkFlow
+
+    Iterating over this walks any directories as it goes. Files that were passed in
+    directly are always included.
+
+    Attributes:
+        paths: The files and directories that were passed in.
+        exclude: Files and directories to leave out. See the module documentation.
+        extend_exclude: More files and directories to leave out, on top of exclude.
+        use_gitignore: Whether to leave out what `.gitignore` files ignore.
+    """
+
+    def __init__(
+        self,
+        paths: Iterable[pathlib.Path],
+        exclude: Optional[Pattern[str]] = None,
+        extend_exclude: Optional[Pattern[str]] = None,
+        use_gitignore: bool = True,
+    ):
+        self.paths = list(paths)
+        if exclude is None:
+            exclude = re.compile(DEFAULT_EXCLUDES)
+        self.exclude = exclude
+        self.extend_exclude = extend_exclude
+        self.use_gitignore = use_gitignore
+
+    def __bool__(self) -> bool:
+        return bool(self.paths)
+
+    def __iter__(self) -> Iterator[pathlib.Path]:
+        for path in self.paths:
+            if path.is_dir():
+                yield from self._walk(path)
+            else:
+                yield path
+
+    def _is_excluded(self, path: str) -> bool:
+        if self.exclude.search(path):
+            return True
+        return bool(self.extend_exclude and self.extend_exclude.search(path))
+
+    def _walk(self, root: pathlib.Path) -> Iterator[pathlib.Path]:
+        # Walked depth first without recursion: each directory's files are produced
+        # before its subdirectories are walked, all in order by name.
+        # `.gitignore` rules match paths relative to the root of the repository
+        ignore_prefix = ""
+        parent_ignore_files: List[_IgnoreFile] = []
+        if self.use_gitignore:
+            ignore_prefix, parent_ignore_files = _parent_ignore_files(root)
+        stack: List[Tuple[str, str, List[_IgnoreFile]]] = [
+            (str(root), "", parent_ignore_files)
+        ]
+        while stack:
+            directory, relative_directory, ignore_files = stack.pop()
+            if self.use_gitignore:
+                rules = _read_ignore_file(directory)
+                if rules:
+                    ignore_files = ignore_files + [
+                        (ignore_prefix + relative_directory, rules)
+                    ]
+            try:
+                with os.scandir(directory) as scanner:
+                    entries = sorted(scanner, key=lambda entry: entry.name)
+            except OSError:
+                continue
+
+            subdirectories = []
+            for entry in entries:
+                # Like `glob`, hidden files and directories are skipped
+                if entry.name.startswith("."):
+                    continue
+                relative_path = relative_directory + entry.name
+                is_dir = entry.is_dir(follow_symlinks=False)
+                if self._is_excluded("/" + relative_path + ("/" if is_dir else "")):
+                    continue
+                if ignore_files and _is_ignored(
+                    ignore_files, ignore_prefix + relative_path, is_dir
+                ):
+                    continue
+                if is_dir:
+                    subdirectories.append(
+                        (entry.path, relative_path + "/", ignore_files)
+                    )
+                elif entry.name.endswith(".md") and entry.is_file():
+                    yield pathlib.Path(entry.path)
+            stack.extend(reversed(subdirectories))
@@ -0,0 +1,172 @@
+"""
+Finding the Markdown files (and lines) that changed according to git
+
+`--since REF` reformats the Markdown files that differ between REF and the working tree,
+along with any untracked ones. `--staged` reformats the ones with staged changes (since
+REF, if both are passed, or since HEAD otherwise). Either way, only paths git reports
+are looked at, so files that haven't changed are never opened.
+
+With `--changed-sections-only`, the lines that changed are also found, from the hunks
+of `git diff --unified=0` between REF (or HEAD) and the working tree, so that they are
+numbered the way the files being reformatted are. Deleting lines changes the lines on
+either side of them.
+"""
+import codecs
+import os
+import pathlib
+import subprocess
+from typing import Dict, List, Optional, Pattern, Sequence, Set, Tuple
+
+__all__ = ["GitError", "LineRanges", "changed_markdown_files"]
+
+# The (start, end) indexes of the lines that changed in a file, or `None` if all of them
+# did
+LineRanges = Optional[List[Tuple[int, int]]]
+
+_DIFF_OPTIONS = ["--relative", "--no-color", "--no-ext-diff", "--diff-filter=ACMR"]
+
+
+class GitError(Exception):
+    """Raised when git can't tell us what changed"""
+
+
+def _git(args: Sequence[str]) -> bytes:
+    try:
+        process = subprocess.run(
+            ["git", "-c", "core.quotePath=false", *args],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+    except OSError as error:
+        raise GitError(f"Unable to run git: {error}")
+    if process.returncode:
+        message = process.stderr.decode("utf-8", "replace").strip()
+        raise GitError(f"git {args[0]} failed: {message}")
+    return process.stdout
+
+
+def _paths(output: bytes) -> List[str]:
+    """Decode NUL separated paths from git"""
+    return [os.fsdecode(path) for path in output.split(b"\0") if path]
+
+
+def _unquote(path: bytes) -> bytes:
+    # Paths with unusual characters in them are quoted like C strings
+    if path.startswith(b'"') and path.endswith(b'"'):
+        return codecs.escape_decode(path[1:-1])[0]
+    return path
+
+
+def _parse_hunks(diff: bytes) -> Dict[str, List[Tuple[int, int]]]:
+    """Find the lines that changed in each file from `git diff --unified=0`"""
+    hunks: Dict[str, List[Tuple[int, int]]] = {}
+    ranges: Optional[List[Tuple[int, int]]] = None
+    in_header = False
+    for line in diff.split(b"\n"):
+        if line.startswith(b"diff --git "):
+            in_header = True
+            ranges = None
+        elif in_header and line.startswith(b"+++ "):
+            path = line[4:]
+            # Paths with spaces in them are followed by a tab, like in GNU diff
+            if path.endswith(b"\t"):
+                path = path[:-1]
+            path = _unquote(path)
+            if path != b"/dev/null":
+                # Strip the "b/" prefix
+                ranges = hunks.setdefault(os.fsdecode(path[2:]), [])
+        elif line.startswith(b"@@ "):
+            in_header = False
+            if ranges is None:
+                continue
+            # e.g. "@@ -12,3 +12,4 @@", where the second pair is the new lines
+            new = line.split(b" ")[2][1:]
+            start_text, _, count_text = new.partition(b",")
+            start, count = int(start_text), int(count_text or 1)
+            if count:
+                ranges.append((start - 1, start - 1 + count))
+            else:
+                # Lines were removed after line `start`
+                ranges.append((max(start - 1, 0), start + 1))
+    return hunks
+
+
+def changed_markdown_files(
+    paths: Sequence[pathlib.Path],
+    since: Optional[str] = None,
+    staged: bool = False,
+    line_ranges: bool = False,
+    exclude: Optional[Pattern[str]] = None,
+    extend_exclude: Optional[Pattern[str]] = None,
+) -> Dict[pathlib.Path, LineRanges]:
+    """Ask git which Markdown files (and lines) changed
+
+    Args:
+        paths: The files and directories to look in. Defaults to the current directory.
+        since (optional): The commit to look for changes since. Defaults to HEAD.
+        staged (optional): Whether to only look at files with staged changes.
+        line_ranges (optional): Whether to find which lines changed in each file.
+        exclude (optional): Files to leave out, searched for in their paths relative to
+            the current directory with a leading "/" (like `MarkdownFiles` does).
+        extend_exclude (optional): More files to leave out.
+
+    Returns:
+        The files that changed, relative to the current directory, in order by path.
+        Each one maps to the lines that changed in it if line_ranges is set, and `None`
+        otherwise (or if the whole file is new to git).
+
+    Raises:
+        GitError: If git couldn't be run or doesn't know about the current directory.
+    """
+    ref = since or "HEAD"
+    pathspecs = ["--", *(str(path) for path in paths)]
+    names_command = ["diff", "--name-only", "-z", *_DIFF_OPTIONS]
+    if staged:
+        names_command.append("--cached")
+    if since is not None or not staged:
+        names_command.append(ref)
+
+    def is_markdown(name: str) -> bool:
+        if not name.endswith(".md"):
+            return False
+        relative_path = "/" + name.replace(os.sep, "/")
+        if exclude is not None and exclude.search(relative_path):
+            return False
+        return not (extend_exclude and extend_exclude.search(relative_path))
+
+    names = [
+        name for name in _paths(_git(names_command + pathspecs)) if is_markdown(name)
+    ]
+    untracked: Set[str] = set()
+    if not staged:
+        untracked = {
+            name
+            for name in _paths(
+                _git(["ls-files", "-z", "--others", "--exclude-standard", *pathspecs])
+            )
+            if is_markdown(name)
+        }
+
+    hunks: Optional[Dict[str, List[Tuple[int, int]]]] = None
+    if line_ranges and names:
+        try:
+            diff = _git(["diff", "--unified=0", *_DIFF_OPTIONS, ref, "--", *names])
+        except GitError:
+            if since is not None:
+                raise
+            # There's no HEAD before the first commit, so everything is new
+        else:
+            hunks = _parse_hunks(diff)
+
+    changed: Dict[pathlib.Path, LineRanges] = {}
+    for name in sorted(set(names) | untracked):
+        path = pathlib.Path(name)
+        # Changes that were staged might have since been deleted
+        if not path.is_file():
+            continue
+        if hunks is not None and name not in untracked:
+            # Files that were only renamed have no hunks
+            changed[path] = hunks.get(name, [])
+        else:
+            changed[path] = None
+    return changed
@@ -0,0 +1,189 @@
+"""
+Reading and writing Markdown files as bytes
+
+Files are read as bytes so we know how they were encoded. A byte order mark says which
+encoding a file uses. Otherwise, UTF-8 is tried before falling back to the locale's
+encoding, which is what Python would have used to read it as text. Formatters only ever
+see "\n" line endings, and reformatted text is encoded again the same way the file was,
+with every line ending the way its first line does. That way, whether a file changed is
+decided by the bytes that would be written to it.
+
+Files of at least `MMAP_THRESHOLD` bytes are mapped into memory instead of being read,
+so their contents are hashed and decoded without first being copied. Files are only
+written if their contents would change, and are written to a temporary file next to them
+that is then moved into place, so an interrupted run never leaves a file half written.
+"""
+import codecs
+import contextlib
+import itertools
+import locale
+import mmap
+import os
+import pathlib
+import re
+import stat
+import tempfile
+from typing import Iterator, Optional, Union
+
+__all__ = [
+    "MMAP_THRESHOLD",
+    "Buffer",
+    "EncodedText",
+    "read_bytes",
+    "write_atomically",
+    "write_file",
+]
+
+# Files at least this large are read through `mmap`
+MMAP_THRESHOLD = 1024 * 1024
+
+# The raw contents of a file
+Buffer = Union[bytes, mmap.mmap]
+
+# Longer byte order marks first since the UTF-32 LE one starts with the UTF-16 LE one
+_BOMS = [
+    (codecs.BOM_UTF32_LE, "utf-32-le"),
+    (codecs.BOM_UTF32_BE, "utf-32-be"),
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+]
+_NEWLINE = re.compile(r"\r\n?|\n")
+
+
+class EncodedText:
+    """Text decoded from a file, along with how to encode it the same way again
+
+    Attributes:
+        text: The decoded text, with "\n" line endings.
+        encoding: The name of the codec the text was decoded with.
+        bom: The byte order mark the file started with, if any.
+        newline: The line ending of the first line of the file, or "\n" if it has only
+            one line.
+    """
+
+    def __init__(self, data: Buffer):
+        self.bom = b""
+        self.encoding = "utf-8"
+        for bom, encoding in _BOMS:
+            if data[: len(bom)] == bom:
+                self.bom, self.encoding = bom, encoding
+                break
+
+        with memoryview(data) as view:
+            content = view[len(self.bom) :]
+            try:
+                self._raw = str(content, self.encoding)
+            except UnicodeDecodeError:
+                if self.bom:
+                    raise
+                self.encoding = locale.getpreferredencoding(False)
+                self._raw = str(content, self.encoding)
+            finally:
+                content.release()
+
+        match = _NEWLINE.search(self._raw)
+        self.newline = match.group() if match else "\n"
+        if "\r" in self._raw:
+            # Like Python's universal newlines
+            self.text = self._raw.replace("\r\n", "\n").replace("\r", "\n")
+        else:
+            self.text = self._raw
+
+    def _with_newlines(self, text: str) -> str:
+        return text if self.newline == "\n" else text.replace("\n", self.newline)
+
+    def differs(self, text: str) -> bool:
+        """Whether encoding text would give something different to what was decoded"""
+        return self._with_newlines(text) != self._raw
+
+    def first_difference(self, text: str) -> Optional[int]:
+        """The index of the first line encoding text would change, if any"""
+        for index, (old_line, new_line) in enumerate(
+            itertools.zip_longest(
+                self._raw.splitlines(keepends=True),
+                self._with_newlines(text).splitlines(keepends=True),
+            )
+        ):
+            if old_line != new_line:
+                return index
+        return None
+
+    def encode(self, text: Optional[str] = None) -> bytes:
+        """Encode text (which defaults to what was decoded) the way it was decoded"""
+        if text is None:
+            raw = self._raw
+        else:
+            raw = self._with_newlines(text)
+        return self.bom + raw.encode(self.encoding)
+
+
+@contextlib.contextmanager
+def read_bytes(path: pathlib.Path) -> Iterator[Buffer]:
+    """Read the contents of a file, mapping it into memory if it is large
+
+    The contents can only be used until the context is exited.
+    """
+    with path.open("rb") as file:
+        if os.fstat(file.fileno()).st_size < MMAP_THRESHOLD:
+            yield file.read()
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield data
+
+
+def _umask() -> int:
+    # The only way to find the umask is to change it
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+def write_atomically(
+    path: pathlib.Path, data: bytes, mode: Optional[int] = None
+) -> None:
+    """Replace a file with data so that nothing ever sees it partly written
+
+    Args:
+        path: The file to write.
+        data: What to write to it.
+        mode (optional): The permissions to give the file. Defaults to the ones the
+            temporary file it is written to is created with (0o600).
+    """
+    with tempfile.NamedTemporaryFile(dir=str(path.parent), delete=False) as temp_file:
+        temp_file.write(data)
+    try:
+        if mode is not None:
+            os.chmod(temp_file.name, mode)
+        os.replace(temp_file.name, str(path))
+    except OSError:
+        os.unlink(temp_file.name)
+        raise
+
+
+def write_file(path: pathlib.Path, data: bytes) -> bool:
+    """Write data to a file unless it already contains it
+
+    The file keeps its permissions. If the file is a symlink, the file it points to is
+    written. If its directory isn't writable, the file is written in place instead.
+
+    Returns:
+        Whether the file was written.
+    """
+    path = pathlib.Path(os.path.realpath(str(path)))
+    try:
+        file_stat = path.stat()
+    except FileNotFoundError:
+        mode = 0o666 & ~_umask()
+    else:
+        if file_stat.st_size == len(data):
+            with read_bytes(path) as existing, memoryview(existing) as view:
+                if view == data:
+                    return False
+        mode = stat.S_IMODE(file_stat.st_mode)
+
+    try:
+        write_atomically(path, data, mode)
+    except PermissionError:
+        path.write_bytes(data)
+    return True
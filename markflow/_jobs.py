@@ -0,0 +1,270 @@
+"""
+Reformatting files in parallel
+
+Files are spread across a pool of worker processes. The largest files are handed out
+first so that one of them isn't left running on its own once everything else is done,
+but results are always produced in the order the files were passed in. That way, what
+gets reported (and which error gets raised if any file can't be reformatted) is the same
+no matter how many jobs are used.
+"""
+import concurrent.futures
+import functools
+import logging
+import os
+import pathlib
+import time
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+from ._cache import ContentCache
+from ._diff import unified_diff
+from ._io import EncodedText, read_bytes
+from ._utils import LazyRichHandler
+from .reformat_markdown import (
+    VerificationPolicy,
+    _changed_sections,
+    _first_changed_line,
+    _reformat_markdown_sections,
+    reformat_markdown_text,
+)
+from .typing import Number
+
+__all__ = ["FileResult", "default_jobs", "reformat_file", "reformat_files"]
+
+
+def default_jobs() -> int:
+    """The number of jobs to use if none is specified, one per CPU"""
+    return os.cpu_count() or 1
+
+
+class FileResult(NamedTuple):
+    """What happened to a file when it was reformatted (or checked)
+
+    Attributes:
+        changed: Whether the file would be changed.
+        contents: The reformatted contents of the file, encoded the way the file was
+            (see `EncodedText`), or None if the file was only checked.
+        first_difference: The index of the first line of the file that would be
+            changed, if any.
+        duration: How many seconds it took.
+        diff: A unified diff of how the file would be changed, if it was asked for.
+    """
+
+    changed: bool
+    contents: Optional[bytes]
+    first_difference: Optional[int]
+    duration: float
+    diff: Optional[str] = None
+
+
+def reformat_file(
+    path: pathlib.Path,
+    width: Number,
+    verification: VerificationPolicy,
+    sample_fraction: float,
+    content_cache: Optional[ContentCache] = None,
+    line_ranges: Optional[List[Tuple[int, int]]] = None,
+    check: bool = False,
+    diff: bool = False,
+) -> FileResult:
+    """Reformat the contents of a file
+
+    Args:
+        path: The file to reformat.
+        width: The maximum line length. See `reformat_markdown_text`.
+        verification: How to check the reformatted text. See `VerificationPolicy`.
+        sample_fraction: The fraction of sections to reformat again with
+            `VerificationPolicy.SAMPLED`.
+        content_cache (optional): Where to look up how the contents of the file are
+            formatted before reformatting them, and to record it after.
+        line_ranges (optional): The (start, end) indexes of the lines to reformat the
+            top level sections of. Defaults to the whole file. The content cache isn't
+            used when only part of the file is reformatted.
+        check (optional): Whether to only find whether (and where) the file would be
+            changed. Reformatting stops at the first section that would be changed, and
+            the reformatted contents aren't returned.
+        diff (optional): Whether to show how the file would be changed with a unified
+            diff of the sections that would be changed, rather than returning the
+            reformatted contents.
+
+    Returns:
+        What happened to the file.
+    """
+    start_time = time.perf_counter()
+    key: Optional[str] = None
+    with read_bytes(path) as data:
+        if content_cache is not None and line_ranges is None:
+            key = content_cache.key(data)
+        old_contents = EncodedText(data)
+
+    def result(
+        new_contents: Optional[str],
+        first_difference: Optional[int] = None,
+        diff_text: Optional[str] = None,
+    ) -> FileResult:
+        # Without the new contents, only what was found to change in them is known
+        contents = None
+        if new_contents is not None:
+            if old_contents.differs(new_contents):
+                first_difference = old_contents.first_difference(new_contents)
+            if diff and new_contents != old_contents.text:
+                old_lines = old_contents.text.splitlines(keepends=True)
+                new_lines = new_contents.splitlines(keepends=True)
+                diff_text = unified_diff(
+                    str(path), old_lines, [(0, old_lines, new_lines)]
+                )
+            if not check and not diff:
+                contents = old_contents.encode(new_contents)
+        duration = time.perf_counter() - start_time
+        changed = first_difference is not None
+        return FileResult(changed, contents, first_difference, duration, diff_text)
+
+    if line_ranges is not None:
+        new_contents = _reformat_markdown_sections(
+            old_contents.text, line_ranges, width, verification, sample_fraction
+        )
+        return result(new_contents)
+
+    cached = None
+    if content_cache is not None and key is not None:
+        cached = content_cache.get(key)
+    if cached is not None:
+        return result(old_contents.text if cached[1] is None else cached[1])
+
+    if check or diff:
+        changed_sections: Iterable[Tuple[int, List[str], List[str]]]
+        changed_sections = _changed_sections(
+            old_contents.text, width, verification, sample_fraction
+        )
+        diff_text = None
+        if diff:
+            changed_sections = list(changed_sections)
+            diff_text = unified_diff(
+                str(path), old_contents.text.splitlines(keepends=True), changed_sections
+            )
+        first_difference = _first_changed_line(changed_sections)
+        if first_difference is not None:
+            # We don't know what the whole file would be reformatted to, so the content
+            # cache can't be updated
+            return result(None, first_difference, diff_text)
+        new_contents = old_contents.text
+    else:
+        new_contents = reformat_markdown_text(
+            old_contents.text, width, verification, sample_fraction
+        )
+    if content_cache is not None and key is not None:
+        content_cache.set(
+            key, None if new_contents == old_contents.text else new_contents
+        )
+    return result(new_contents)
+
+
+def _size(path: pathlib.Path) -> int:
+    # Any problem with the file is left to be raised when it is reformatted
+    try:
+        return path.stat().st_size
+    except OSError:
+        return 0
+
+
+def _reformat_in_worker(
+    level: int,
+    reformat: Callable[..., FileResult],
+    path: pathlib.Path,
+    line_ranges: Optional[List[Tuple[int, int]]],
+) -> FileResult:
+    # Workers that aren't forked from the main process start without any logging set
+    # up. (Importing this module is what loads the rest of MarkFlow into them.) This is
+    # done here rather than in a pool initializer since those need Python 3.7.
+    if not logging.getLogger().handlers:
+        logging.basicConfig(format="", level=level, handlers=[LazyRichHandler()])
+    return reformat(path, line_ranges=line_ranges)
+
+
+def reformat_files(
+    paths: Iterable[pathlib.Path],
+    width: Number,
+    verification: VerificationPolicy,
+    sample_fraction: float,
+    jobs: Optional[int] = None,
+    content_cache: Optional[ContentCache] = None,
+    line_ranges: Optional[Mapping[pathlib.Path, List[Tuple[int, int]]]] = None,
+    check: bool = False,
+    diff: bool = False,
+) -> Iterator[FileResult]:
+    """Reformat files using a pool of processes
+
+    Args:
+        paths: The files to reformat.
+        width: The maximum line length. See `reformat_markdown_text`.
+        verification: How to check the reformatted text. See `VerificationPolicy`.
+        sample_fraction: The fraction of sections to reformat again with
+            `VerificationPolicy.SAMPLED`.
+        jobs (optional): The number of files to reformat at once. Defaults to
+            `default_jobs()`. With one job (or file), files are reformatted in this
+            process as paths are iterated over. Otherwise, paths are all found first.
+        content_cache (optional): See `reformat_file`.
+        line_ranges (optional): The line ranges to pass to `reformat_file` for each
+            file. Files that aren't in it are reformatted in full.
+        check (optional): See `reformat_file`.
+        diff (optional): See `reformat_file`.
+
+    Returns:
+        An iterator of what `reformat_file` returns for each file, in the same order as
+        paths. If a file can't be reformatted, the error is raised once all of the files
+        before it have been produced.
+    """
+    reformat = functools.partial(
+        reformat_file,
+        width=width,
+        verification=verification,
+        sample_fraction=sample_fraction,
+        content_cache=content_cache,
+        check=check,
+        diff=diff,
+    )
+
+    def ranges(path: pathlib.Path) -> Optional[List[Tuple[int, int]]]:
+        return None if line_ranges is None else line_ranges.get(path)
+
+    if jobs is None:
+        jobs = default_jobs()
+    if jobs <= 1:
+        for path in paths:
+            yield reformat(path, line_ranges=ranges(path))
+        return
+    # Every file needs to be found to know which ones are the largest
+    path_list = list(paths)
+    if len(path_list) <= 1:
+        for path in path_list:
+            yield reformat(path, line_ranges=ranges(path))
+        return
+
+    sizes = [_size(path) for path in path_list]
+    largest_first = sorted(range(len(path_list)), key=lambda i: sizes[i], reverse=True)
+    level = logging.getLogger().getEffectiveLevel()
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=min(jobs, len(path_list))
+    ) as executor:
+        futures: Dict[int, "concurrent.futures.Future[FileResult]"] = {
+            i: executor.submit(
+                _reformat_in_worker, level, reformat, path_list[i], ranges(path_list[i])
+            )
+            for i in largest_first
+        }
+        try:
+            for i in range(len(path_list)):
+                yield futures[i].result()
+        finally:
+            # Don't wait on files we'll never report if we stopped early
+            for future in futures.values():
+                future.cancel()
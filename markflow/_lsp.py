@@ -0,0 +1,622 @@
+"""
+Reformatting Markdown in editors over the Language Server Protocol
+
+`markflow --lsp` speaks LSP over STDIN and STDOUT. Editors send it the changes made to
+open documents rather than whole documents (incremental sync), and it keeps each
+document parsed into its top level sections as the changes come in. Only the sections
+around a change are parsed again: parsing resumes from the first section that could
+have been changed by it and stops as soon as it finds a section starting where one
+started before the change.
+
+Formatting requests reformat each top level section on its own, the same way
+`reformat_markdown_stream` does, so sections that haven't changed since the last
+request are reused instead of being reformatted again. Both `textDocument/formatting`
+and `textDocument/rangeFormatting` respond with an edit for each section that changed
+that only replaces the lines that differ.
+"""
+import copy
+import json
+import logging
+import re
+from bisect import bisect_right
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .exceptions import MarkdownFormatException, ReformatInconsistentException
+from .parser import (
+    IncrementalParser,
+    MarkdownSectionEnum,
+    SectionSpan,
+    parse_section,
+)
+from .reformat_markdown import (
+    DEFAULT_SAMPLE_FRACTION,
+    VerificationPolicy,
+    _reformat_top_level_section,
+    _section_sample_fraction,
+)
+from .typing import Number
+
+__all__ = ["Document", "LanguageServer", "serve"]
+
+logger = logging.getLogger(__name__)
+
+# How positions count characters within a line
+UTF8 = "utf-8"
+UTF16 = "utf-16"
+UTF32 = "utf-32"
+
+# LSP's text document sync kinds
+_INCREMENTAL_SYNC = 2
+
+# JSON-RPC and LSP error codes
+_INVALID_REQUEST = -32600
+_METHOD_NOT_FOUND = -32601
+_INVALID_PARAMS = -32602
+_SERVER_NOT_INITIALIZED = -32002
+_REQUEST_FAILED = -32803
+
+# Lines with their line endings. LSP only ends lines with these, unlike
+# `str.splitlines`.
+_LINE = re.compile(r"[^\r\n]*(?:\r\n|\r|\n)|[^\r\n]+")
+
+# The line length, the type of the section before, and the type and lines of a section
+_ReformattedKey = Tuple[
+    Number, MarkdownSectionEnum, MarkdownSectionEnum, Tuple[str, ...]
+]
+
+Position = Dict[str, int]
+Range = Dict[str, Position]
+TextEdit = Dict[str, Any]
+
+
+def _split_lines(text: str) -> List[str]:
+    return _LINE.findall(text)
+
+
+def _strip_line_ending(line: str) -> str:
+    return line.rstrip("\r\n")
+
+
+def _code_units(text: str, encoding: str) -> int:
+    """The length of text in code units of a position encoding"""
+    if encoding == UTF32:
+        return len(text)
+    if encoding == UTF8:
+        return len(text.encode("utf-8", "surrogatepass"))
+    return len(text.encode("utf-16-le", "surrogatepass")) // 2
+
+
+def _index(text: str, character: int, encoding: str) -> int:
+    """The index into text of a position's character offset
+
+    Offsets past the end of text are treated as the end of text.
+    """
+    if encoding == UTF32:
+        return min(character, len(text))
+    units = 0
+    for index, char in enumerate(text):
+        if units >= character:
+            return index
+        units += _code_units(char, encoding)
+    return len(text)
+
+
+def _append_closed_at(closed_at: List[int], line_count: int) -> None:
+    """Add when a section was known to be complete
+
+    How many lines the parser needs to know a section is complete depends on the
+    sections before it, so these are only ever too high, which just means parsing
+    resumes earlier than it needs to. They are kept sorted so they can be bisected.
+    """
+    closed_at.append(max(line_count, closed_at[-1]) if closed_at else line_count)
+
+
+class Document:
+    """An open document along with the top level sections it is parsed into
+
+    Args:
+        text: The text of the document.
+
+    Attributes:
+        lines: The lines of the document, each with its line ending (if it has one).
+        spans: The (section type, start, end) of each top level section, as
+            `parse_markdown_spans` would find them.
+    """
+
+    def __init__(self, text: str):
+        self._load(text)
+        # Reformatted sections by what they were reformatted from, reused until a
+        # formatting request no longer has a use for them
+        self._reformatted: Dict[_ReformattedKey, List[str]] = {}
+
+    def _load(self, text: str) -> None:
+        self.lines = _split_lines(text)
+        self._content = [_strip_line_ending(line) for line in self.lines]
+        self.spans: List[SectionSpan] = []
+        # How many lines the parser had been fed when it knew each section was complete
+        self._closed_at: List[int] = []
+        for span, closed_at in self._parse_from(0):
+            self.spans.append(span)
+            _append_closed_at(self._closed_at, closed_at)
+
+    @property
+    def text(self) -> str:
+        return "".join(self.lines)
+
+    @property
+    def newline(self) -> str:
+        """The line ending of the first line that has one"""
+        for line in self.lines:
+            content_length = len(_strip_line_ending(line))
+            if content_length < len(line):
+                return line[content_length:]
+        return "\n"
+
+    def copy(self) -> "Document":
+        """A copy of the document that can be changed without changing it"""
+        document = copy.copy(self)
+        document.lines = list(self.lines)
+        document._content = list(self._content)
+        return document
+
+    def _line(self, index: int) -> str:
+        # The document ends in an empty line after its last line ending
+        return self.lines[index] if index < len(self.lines) else ""
+
+    def _content_line(self, index: int) -> str:
+        return self._content[index] if index < len(self._content) else ""
+
+    def _index(self, position: Position, encoding: str) -> Tuple[int, int]:
+        """The line index and index into that line's content of a position
+
+        Positions past the end of a line or the document are treated as the end of it.
+        """
+        line_index = position["line"]
+        if line_index >= len(self.lines):
+            end = self.position(len(self.lines), encoding)
+            return end["line"], len(self._content_line(end["line"]))
+        content = self._content[line_index]
+        return line_index, _index(content, position["character"], encoding)
+
+    def position(self, line_index: int, encoding: str = UTF16) -> Position:
+        """The position of the start of a line
+
+        Lines past the last one are treated as the end of the document.
+        """
+        if line_index < len(self.lines):
+            return {"line": line_index, "character": 0}
+        if self.lines and self.lines[-1] == self._content[-1]:
+            # The last line doesn't end in a line ending
+            return {
+                "line": len(self.lines) - 1,
+                "character": _code_units(self.lines[-1], encoding),
+            }
+        return {"line": len(self.lines), "character": 0}
+
+    def change(
+        self, text: str, range_: Optional[Range] = None, encoding: str = UTF16
+    ) -> None:
+        """Replace text in the document
+
+        Args:
+            text: The text to put in place of range_.
+            range_ (optional): The range to replace. Defaults to the whole document.
+            encoding (optional): How range_ counts characters within a line.
+        """
+        if range_ is None:
+            self._load(text)
+            return
+
+        start_line, start = self._index(range_["start"], encoding)
+        end_line, end = max(self._index(range_["end"], encoding), (start_line, start))
+        end_line_text = self._line(end_line)
+        new_lines = _split_lines(
+            self._content_line(start_line)[:start] + text + end_line_text[end:]
+        )
+        old_end = min(end_line + 1, len(self.lines))
+        self.lines[start_line:old_end] = new_lines
+        self._content[start_line:old_end] = [
+            _strip_line_ending(line) for line in new_lines
+        ]
+        self._reparse(start_line, old_end, start_line + len(new_lines))
+
+    def _reparse(self, start: int, old_end: int, new_end: int) -> None:
+        """Parse sections again after lines[start:old_end] became lines[start:new_end]
+
+        A section the parser knew was complete before it was fed the first changed line
+        can't have changed, so parsing resumes from the first section that wasn't.
+        Parsing from the start of any section finds the same sections from there on as
+        parsing the whole document does, so it stops once a section starts after the
+        change where a section started before it. Every section from there on is the
+        same as before, just moved.
+        """
+        old_spans = self.spans
+        old_closed_at = self._closed_at
+        old_starts = [span_start for _, span_start, _ in old_spans]
+        index = bisect_right(old_closed_at, start)
+        if index < len(old_spans):
+            resume = old_starts[index]
+        else:
+            resume = old_spans[-1][2] if old_spans else 0
+
+        shift = new_end - old_end
+        spans = old_spans[:index]
+        closed_at = old_closed_at[:index]
+        for span, span_closed_at in self._parse_from(resume):
+            span_start = span[1]
+            if span_start >= new_end:
+                old_index = bisect_right(old_starts, span_start - shift) - 1
+                if old_index >= 0 and old_starts[old_index] == span_start - shift:
+                    spans.extend(
+                        (old_type, old_start + shift, old_stop + shift)
+                        for old_type, old_start, old_stop in old_spans[old_index:]
+                    )
+                    for old_span_closed_at in old_closed_at[old_index:]:
+                        _append_closed_at(closed_at, old_span_closed_at + shift)
+                    break
+            spans.append(span)
+            _append_closed_at(closed_at, span_closed_at)
+        self.spans = spans
+        self._closed_at = closed_at
+
+    def _parse_from(self, start: int) -> Iterator[Tuple[SectionSpan, int]]:
+        """Parse the document from lines[start], which must start a section
+
+        Returns:
+            An iterator of each section along with how many lines of the document the
+            parser had been fed when it knew the section was complete.
+        """
+        parser = IncrementalParser(start)
+        content = self._content
+        for index in range(start, len(content)):
+            for section_type, span_start, span_end in parser.feed(content[index]):
+                yield (section_type, start + span_start, start + span_end), index + 1
+        # Only the end of the document completes these
+        for section_type, span_start, span_end in parser.close():
+            yield (section_type, start + span_start, start + span_end), len(content) + 1
+
+    def reformat(
+        self,
+        width: Number = 88,
+        verification: VerificationPolicy = VerificationPolicy.FULL,
+        sample_fraction: float = DEFAULT_SAMPLE_FRACTION,
+        first_line: int = 0,
+        last_line: Optional[int] = None,
+    ) -> List[Tuple[int, int, List[str]]]:
+        """Reformat the document a top level section at a time
+
+        Only the sections on lines first_line to last_line are reformatted, along with
+        any whitespace at the end of the document, which is stripped from it.
+
+        Args:
+            width (optional): The maximum line length. See `reformat_markdown_text`.
+            verification (optional): How to check each reformatted section wouldn't be
+                reformatted any further. See `reformat_markdown_stream`.
+            sample_fraction (optional): The fraction of sections to reformat again with
+                `VerificationPolicy.SAMPLED`.
+            first_line (optional): The first line to reformat the sections of.
+            last_line (optional): The last line to reformat the sections of. Defaults
+                to the last line of the document.
+
+        Returns:
+            A (start, end, reformatted lines) tuple for each top level section
+            reformatted, where `lines[start:end]` is the section. When the whole
+            document is reformatted, the reformatted lines, each followed by a line
+            ending, make up the same text `reformat_markdown_text` returns.
+        """
+        sample_fraction = _section_sample_fraction(verification, sample_fraction)
+        reformatted: Dict[_ReformattedKey, List[str]] = {}
+
+        def reformat_section(index: int) -> List[str]:
+            section_type, start, end = self.spans[index]
+            last_section_type = (
+                self.spans[index - 1][0] if index else MarkdownSectionEnum.INVALID
+            )
+            section_lines = self._content[start:end]
+            # The next section's lines, for verifying sections that are parsed
+            # differently on their own
+            following = (
+                self._content[end : self.spans[index + 1][2]]
+                if index + 1 < len(self.spans)
+                else []
+            )
+            key = (width, last_section_type, section_type, tuple(section_lines))
+            new_lines = self._reformatted.get(key)
+            if new_lines is None:
+                new_lines = _reformat_top_level_section(
+                    parse_section(section_type, start, section_lines),
+                    width,
+                    last_section_type,
+                    verification,
+                    sample_fraction,
+                    following,
+                )
+            reformatted[key] = new_lines
+            return new_lines
+
+        # Trailing whitespace is stripped from the reformatted document, so we need to
+        # know which section is the last one that isn't just whitespace
+        trailing: Dict[int, List[str]] = {}
+        for index in range(len(self.spans) - 1, -1, -1):
+            text = "\n".join(reformat_section(index)).rstrip()
+            if text:
+                trailing[index] = text.split("\n")
+                break
+            trailing[index] = []
+        else:
+            # A document of nothing but whitespace is reformatted to an empty line
+            if not self.spans:
+                return [(0, 0, [""])]
+            trailing[0] = [""]
+
+        reformatted_sections: List[Tuple[int, int, List[str]]] = []
+        for index, (_, start, end) in enumerate(self.spans):
+            if last_line is not None and start > last_line:
+                break
+            if end <= first_line:
+                continue
+            new_lines = trailing.get(index)
+            if new_lines is None:
+                new_lines = reformat_section(index)
+            reformatted_sections.append((start, end, new_lines))
+
+        # Sections that weren't reformatted this time are only kept until they'd
+        # outnumber the ones in the document
+        if first_line == 0 and last_line is None:
+            self._reformatted = reformatted
+        else:
+            self._reformatted.update(reformatted)
+            if len(self._reformatted) > 2 * len(self.spans):
+                self._reformatted = reformatted
+        return reformatted_sections
+
+
+class _ResponseError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+class LanguageServer:
+    """Answers LSP messages about the documents open in an editor
+
+    Args:
+        width (optional): The maximum line length. See `reformat_markdown_text`.
+        verification (optional): How to check each reformatted section wouldn't be
+            reformatted any further. See `reformat_markdown_stream`.
+        sample_fraction (optional): The fraction of sections to reformat again with
+            `VerificationPolicy.SAMPLED`.
+
+    Attributes:
+        documents: The open documents by their URI.
+        position_encoding: How positions count characters within a line, as agreed
+            with the editor when initializing.
+        shutting_down: Whether the editor has asked the server to shut down.
+    """
+
+    def __init__(
+        self,
+        width: Number = 88,
+        verification: VerificationPolicy = VerificationPolicy.FULL,
+        sample_fraction: float = DEFAULT_SAMPLE_FRACTION,
+    ):
+        self.width = width
+        self.verification = verification
+        self.sample_fraction = sample_fraction
+        self.documents: Dict[str, Document] = {}
+        self.position_encoding = UTF16
+        self.initialized = False
+        self.shutting_down = False
+        self._requests: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+            "initialize": self._initialize,
+            "shutdown": self._shutdown,
+            "textDocument/formatting": self._formatting,
+            "textDocument/rangeFormatting": self._range_formatting,
+        }
+        self._notifications: Dict[str, Callable[[Dict[str, Any]], None]] = {
+            "textDocument/didOpen": self._did_open,
+            "textDocument/didChange": self._did_change,
+            "textDocument/didClose": self._did_close,
+        }
+
+    def handle(self, message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Handle a message from the editor
+
+        Args:
+            message: A JSON-RPC request or notification.
+
+        Returns:
+            The response to a request, or `None` for a notification.
+        """
+        method = message.get("method")
+        params = message.get("params") or {}
+        if "id" not in message:
+            notification = self._notifications.get(str(method))
+            if notification is not None and self.initialized:
+                try:
+                    notification(params)
+                except (KeyError, TypeError, ValueError):
+                    logger.exception("Invalid %s notification", method)
+                except Exception:
+                    logger.exception("Failed to handle %s notification", method)
+            return None
+
+        response: Dict[str, Any] = {"jsonrpc": "2.0", "id": message["id"]}
+        try:
+            request = self._requests.get(str(method))
+            if request is None:
+                raise _ResponseError(_METHOD_NOT_FOUND, f"Unknown method {method}")
+            if not self.initialized and method != "initialize":
+                raise _ResponseError(_SERVER_NOT_INITIALIZED, "Not initialized")
+            if self.shutting_down:
+                raise _ResponseError(_INVALID_REQUEST, "Shutting down")
+            try:
+                response["result"] = request(params)
+            except (KeyError, TypeError, ValueError) as error:
+                raise _ResponseError(_INVALID_PARAMS, f"Invalid params: {error}")
+            except (MarkdownFormatException, ReformatInconsistentException) as error:
+                raise _ResponseError(_REQUEST_FAILED, str(error))
+            except Exception as error:
+                logger.exception("Failed to handle %s request", method)
+                raise _ResponseError(_REQUEST_FAILED, f"Unexpected error: {error!r}")
+        except _ResponseError as error:
+            response["error"] = {"code": error.code, "message": str(error)}
+        return response
+
+    def _initialize(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        encodings = (
+            params.get("capabilities", {})
+            .get("general", {})
+            .get("positionEncodings", [UTF16])
+        )
+        # UTF-32 offsets are Python's string indexes, so they need no counting
+        for encoding in (UTF32, UTF16, UTF8):
+            if encoding in encodings:
+                self.position_encoding = encoding
+                break
+        self.initialized = True
+        return {
+            "capabilities": {
+                "positionEncoding": self.position_encoding,
+                "textDocumentSync": {"openClose": True, "change": _INCREMENTAL_SYNC},
+                "documentFormattingProvider": True,
+                "documentRangeFormattingProvider": True,
+            },
+            "serverInfo": {"name": "markflow"},
+        }
+
+    def _shutdown(self, params: Dict[str, Any]) -> None:
+        self.shutting_down = True
+
+    def _did_open(self, params: Dict[str, Any]) -> None:
+        text_document = params["textDocument"]
+        self.documents[text_document["uri"]] = Document(text_document["text"])
+
+    def _did_change(self, params: Dict[str, Any]) -> None:
+        uri = params["textDocument"]["uri"]
+        # The changes are made to a copy so the document is left as it was if any of
+        # them fail
+        document = self.documents[uri].copy()
+        for change in params["contentChanges"]:
+            document.change(change["text"], change.get("range"), self.position_encoding)
+        self.documents[uri] = document
+
+    def _did_close(self, params: Dict[str, Any]) -> None:
+        self.documents.pop(params["textDocument"]["uri"], None)
+
+    def _formatting(self, params: Dict[str, Any]) -> List[TextEdit]:
+        return self._edits(self.documents[params["textDocument"]["uri"]])
+
+    def _range_formatting(self, params: Dict[str, Any]) -> List[TextEdit]:
+        document = self.documents[params["textDocument"]["uri"]]
+        start = params["range"]["start"]
+        end = params["range"]["end"]
+        last_line = end["line"]
+        if end["character"] == 0 and last_line > start["line"]:
+            # The range ends at the start of this line, so none of it is included
+            last_line -= 1
+        return self._edits(document, start["line"], last_line)
+
+    def _edits(
+        self, document: Document, first_line: int = 0, last_line: Optional[int] = None
+    ) -> List[TextEdit]:
+        """Edits that reformat the sections on lines first_line to last_line"""
+        newline = document.newline
+        edits: List[TextEdit] = []
+        for start, end, new_lines in document.reformat(
+            self.width, self.verification, self.sample_fraction, first_line, last_line
+        ):
+            old = document.lines[start:end]
+            new = [line + newline for line in new_lines]
+            if old == new:
+                continue
+            # Only the lines that changed are replaced
+            prefix = 0
+            while prefix < min(len(old), len(new)) and old[prefix] == new[prefix]:
+                prefix += 1
+            suffix = 0
+            while (
+                suffix < min(len(old), len(new)) - prefix
+                and old[-1 - suffix] == new[-1 - suffix]
+            ):
+                suffix += 1
+            edits.append(
+                {
+                    "range": {
+                        "start": document.position(
+                            start + prefix, self.position_encoding
+                        ),
+                        "end": document.position(end - suffix, self.position_encoding),
+                    },
+                    "newText": "".join(new[prefix : len(new) - suffix]),
+                }
+            )
+        return edits
+
+
+def _read_message(stream: BinaryIO) -> Optional[Dict[str, Any]]:
+    """Read a message, or return `None` once there are no more"""
+    content_length = None
+    while True:
+        header = stream.readline()
+        if not header:
+            return None
+        header = header.strip()
+        if not header:
+            if content_length is None:
+                continue
+            break
+        name, _, value = header.decode("ascii").partition(":")
+        if name.strip().lower() == "content-length":
+            content_length = int(value)
+    message: Dict[str, Any] = json.loads(stream.read(content_length).decode("utf-8"))
+    return message
+
+
+def _write_message(stream: BinaryIO, message: Dict[str, Any]) -> None:
+    body = json.dumps(message).encode("utf-8")
+    stream.write(f"Content-Length: {len(body)}\r\n\r\n".encode("ascii") + body)
+    stream.flush()
+
+
+def serve(
+    stdin: BinaryIO,
+    stdout: BinaryIO,
+    width: Number = 88,
+    verification: VerificationPolicy = VerificationPolicy.FULL,
+    sample_fraction: float = DEFAULT_SAMPLE_FRACTION,
+) -> int:
+    """Answer LSP messages until the editor says to exit
+
+    Args:
+        stdin: Where messages are read from.
+        stdout: Where responses are written to.
+        width (optional): The maximum line length. See `reformat_markdown_text`.
+        verification (optional): How to check each reformatted section wouldn't be
+            reformatted any further. See `reformat_markdown_stream`.
+        sample_fraction (optional): The fraction of sections to reformat again with
+            `VerificationPolicy.SAMPLED`.
+
+    Returns:
+        The code to exit with. Per the protocol, this is 0 if the editor asked the
+        server to shut down before exiting and 1 otherwise.
+    """
+    server = LanguageServer(width, verification, sample_fraction)
+    while True:
+        try:
+            message = _read_message(stdin)
+        except ValueError:
+            logger.exception("Invalid message")
+            continue
+        if message is None:
+            break
+        try:
+            if message.get("method") == "exit":
+                break
+            response = server.handle(message)
+        except Exception:
+            logger.exception("Failed to handle message")
+            continue
+        if response is not None:
+            _write_message(stdout, response)
+    return 0 if server.shutting_down else 1
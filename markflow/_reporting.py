@@ -0,0 +1,384 @@
+"""
+Reporting what happened to each file
+
+Reporters are told what happened to each file as it happens and keep count. Human
+readable reporters print a line for each file that is (or would be) reformatted followed
+by a summary, batching lines up rather than writing each one as it comes in. When quiet,
+they don't print anything but errors, and do nothing for each file besides counting it.
+The JSON reporter prints a single document describing every file once everything is
+done, while the NDJSON one prints a line of JSON for each file as soon as it is done.
+
+Messages are made up of parts to print plainly or with emphasis (like bold Markdown
+text).
+"""
+import abc
+import json
+import sys
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, TextIO, Tuple
+
+if TYPE_CHECKING:
+    import rich.console
+
+__all__ = [
+    "REPORTERS",
+    "JSONReporter",
+    "NDJSONReporter",
+    "PlainReporter",
+    "Reporter",
+    "RichReporter",
+    "get_reporter",
+]
+
+# Text along with whether it should be emphasized
+Message = List[Tuple[str, bool]]
+
+REFORMATTED = "reformatted"
+UNCHANGED = "unchanged"
+UNWRITABLE = "unwritable"
+
+
+def _file_word(count: int) -> str:
+    return "file" if count == 1 else "files"
+
+
+class Reporter(abc.ABC):
+    """Something that reports on what happened to files
+
+    Args:
+        check: Whether files are only being checked rather than reformatted.
+        quiet: Whether to only report errors.
+        stream (optional): Where to report to. Defaults to `sys.stdout`.
+
+    Attributes:
+        reformatted_count: The number of files that were (or would be) reformatted.
+        unchanged_count: The number of files that were (or would be) left unchanged.
+        unwritable_count: The number of files that needed to be reformatted but couldn't
+            be written to.
+    """
+
+    def __init__(self, check: bool, quiet: bool, stream: Optional[TextIO] = None):
+        self.check = check
+        self.quiet = quiet
+        self.stream = sys.stdout if stream is None else stream
+        self.reformatted_count = 0
+        self.unchanged_count = 0
+        self.unwritable_count = 0
+
+    def reformatted(
+        self, path: str, duration: Optional[float] = None, line: Optional[int] = None
+    ) -> None:
+        """Report that a file was (or would be) reformatted
+
+        Args:
+            path: The file.
+            duration (optional): How many seconds it took.
+            line (optional): The number of the first line that was (or would be)
+                changed, starting from 1.
+        """
+        self.reformatted_count += 1
+
+    def unchanged(self, path: str, duration: Optional[float] = None) -> None:
+        """Report that a file was (or would be) left unchanged"""
+        self.unchanged_count += 1
+
+    def unwritable(self, path: str) -> None:
+        """Report that a file needed to be reformatted but couldn't be written to"""
+        self.unwritable_count += 1
+
+    def stdin(self, changed: bool) -> None:
+        """Report whether text passed in through STDIN would be reformatted
+
+        Nothing else is reported when reformatting STDIN, so there's no need to call
+        `finish`.
+        """
+        if changed:
+            self.reformatted_count += 1
+        else:
+            self.unchanged_count += 1
+
+    def message(self, message: Message) -> None:
+        """Report something that isn't about a particular file"""
+
+    def nothing_to_do(self, reason: str) -> None:
+        """Report that there are no files to reformat, in place of `finish`"""
+        self.message([(f"{reason} Nothing to do.", True)])
+
+    def flush(self) -> None:
+        """Write out anything that has been held back"""
+
+    def finish(self) -> None:
+        """Report on everything once all of the files are done"""
+        self.flush()
+
+    @property
+    def return_code(self) -> int:
+        """What MarkFlow should exit with given what was reported"""
+        if self.unwritable_count:
+            return -1
+        if self.check and self.reformatted_count:
+            return 1
+        return 0
+
+
+class _HumanReporter(Reporter):
+    # How many lines, or how many seconds' worth of lines, to hold back at most
+    BATCH_SIZE = 100
+    BATCH_SECONDS = 0.1
+
+    def __init__(self, check: bool, quiet: bool, stream: Optional[TextIO] = None):
+        super().__init__(check, quiet, stream)
+        self._batch: List[Message] = []
+        self._last_flush = time.monotonic()
+
+    @abc.abstractmethod
+    def _write(self, messages: List[Message]) -> None:
+        """Write messages to the stream, one per line"""
+
+    def reformatted(
+        self, path: str, duration: Optional[float] = None, line: Optional[int] = None
+    ) -> None:
+        self.reformatted_count += 1
+        if self.quiet:
+            return
+        if self.check:
+            self._add([(f"would reformat {path}", False)])
+        else:
+            self._add([(f"reformatted {path}", True)])
+
+    def stdin(self, changed: bool) -> None:
+        super().stdin(changed)
+        if self.quiet:
+            return
+        if changed:
+            self._add([("STDIN would be reformatted.", False)])
+        else:
+            self._add([("STDIN would be unchanged.", False)])
+
+    def message(self, message: Message) -> None:
+        if not self.quiet:
+            self._add(message)
+
+    def _add(self, message: Message) -> None:
+        self._batch.append(message)
+        if (
+            len(self._batch) >= self.BATCH_SIZE
+            or time.monotonic() - self._last_flush >= self.BATCH_SECONDS
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        if self._batch:
+            self._write(self._batch)
+            self._batch = []
+        self._last_flush = time.monotonic()
+
+    def finish(self) -> None:
+        if not self.quiet:
+            self._batch.append([("All done!", False)])
+            self._batch.append(self._summary())
+        self.flush()
+
+    def _summary(self) -> Message:
+        summary: Message = []
+        reformatted = self.reformatted_count
+        unchanged = self.unchanged_count
+        unwritable = self.unwritable_count
+        if self.check:
+            if reformatted:
+                file_word = _file_word(reformatted)
+                summary.append(
+                    (f"{reformatted} {file_word} would be reformatted.", True)
+                )
+            if unchanged:
+                file_word = _file_word(unchanged)
+                summary.append(
+                    (f"{unchanged} {file_word} would be left unchanged.", False)
+                )
+        else:
+            if reformatted:
+                file_word = _file_word(reformatted)
+                file_verb = "was" if reformatted == 1 else "were"
+                summary.append(
+                    (f"{reformatted} {file_word} {file_verb} reformatted.", True)
+                )
+            if unchanged:
+                file_word = _file_word(unchanged)
+                file_verb = "was" if unchanged == 1 else "were"
+                summary.append(
+                    (f"{unchanged} {file_word} {file_verb} left unchanged.", False)
+                )
+            if unwritable:
+                file_word = _file_word(unwritable)
+                summary.append((f"{unwritable} {file_word} couldn't be written.", True))
+        # Each part is its own sentence
+        return [
+            (text if i == 0 else " " + text, emphasized)
+            for i, (text, emphasized) in enumerate(summary)
+        ]
+
+
+class PlainReporter(_HumanReporter):
+    """Reports in plain text, dropping any emphasis"""
+
+    def _write(self, messages: List[Message]) -> None:
+        self.stream.write(
+            "".join(
+                "".join(text for text, _ in message) + "\n" for message in messages
+            )
+        )
+        self.stream.flush()
+
+
+class RichReporter(_HumanReporter):
+    """Reports with rich, showing emphasized text in bold
+
+    Only one rich console is created, the first time anything is written.
+    """
+
+    def __init__(self, check: bool, quiet: bool, stream: Optional[TextIO] = None):
+        super().__init__(check, quiet, stream)
+        self._console: Optional["rich.console.Console"] = None
+
+    def _write(self, messages: List[Message]) -> None:
+        import rich.console
+        import rich.text
+
+        if self._console is None:
+            self._console = rich.console.Console(file=self.stream)
+        text = rich.text.Text()
+        for i, message in enumerate(messages):
+            if i:
+                text.append("\n")
+            for part, emphasized in message:
+                text.append(part, style="bold" if emphasized else None)
+        self._console.print(text)
+
+
+class JSONReporter(Reporter):
+    """Reports on every file in a single JSON document once everything is done
+
+    The document looks like:
+
+        {
+          "check": true,
+          "files": [
+            {"path": "README.md", "status": "reformatted", "duration": 0.01, "line": 3}
+          ],
+          "reformatted": 1,
+          "unchanged": 0,
+          "unwritable": 0
+        }
+
+    where a file's status is one of "reformatted", "unchanged" or "unwritable". The
+    number of seconds a file took and the first line that was (or would be) changed are
+    included when they are known. Text passed in through STDIN has a path of "-".
+    """
+
+    def __init__(self, check: bool, quiet: bool, stream: Optional[TextIO] = None):
+        super().__init__(check, quiet, stream)
+        self._files: List[Dict[str, Any]] = []
+
+    def _add_file(
+        self,
+        path: str,
+        status: str,
+        duration: Optional[float] = None,
+        line: Optional[int] = None,
+    ) -> None:
+        file: Dict[str, Any] = {"path": path, "status": status}
+        if duration is not None:
+            file["duration"] = duration
+        if line is not None:
+            file["line"] = line
+        self._files.append(file)
+
+    def reformatted(
+        self, path: str, duration: Optional[float] = None, line: Optional[int] = None
+    ) -> None:
+        super().reformatted(path)
+        self._add_file(path, REFORMATTED, duration, line)
+
+    def unchanged(self, path: str, duration: Optional[float] = None) -> None:
+        super().unchanged(path)
+        self._add_file(path, UNCHANGED, duration)
+
+    def unwritable(self, path: str) -> None:
+        super().unwritable(path)
+        self._add_file(path, UNWRITABLE)
+
+    def stdin(self, changed: bool) -> None:
+        if changed:
+            self.reformatted("-")
+        else:
+            self.unchanged("-")
+        self.finish()
+
+    def nothing_to_do(self, reason: str) -> None:
+        # What's reading the report still needs one, even without any files in it
+        self.finish()
+
+    def finish(self) -> None:
+        document: Dict[str, Any] = {
+            "check": self.check,
+            "files": self._files,
+            REFORMATTED: self.reformatted_count,
+            UNCHANGED: self.unchanged_count,
+            UNWRITABLE: self.unwritable_count,
+        }
+        self.stream.write(json.dumps(document) + "\n")
+        self.stream.flush()
+
+
+class NDJSONReporter(JSONReporter):
+    """Reports on each file with a line of JSON as soon as it is done
+
+    Each file is described like it is in `JSONReporter`'s "files" and the last line
+    is the rest of its document, e.g.:
+
+        {"path": "README.md", "status": "reformatted", "duration": 0.01, "line": 3}
+        {"check": true, "reformatted": 1, "unchanged": 0, "unwritable": 0}
+    """
+
+    def _add_file(
+        self,
+        path: str,
+        status: str,
+        duration: Optional[float] = None,
+        line: Optional[int] = None,
+    ) -> None:
+        super()._add_file(path, status, duration, line)
+        self.stream.write(json.dumps(self._files.pop()) + "\n")
+        self.stream.flush()
+
+    def finish(self) -> None:
+        document = {
+            "check": self.check,
+            REFORMATTED: self.reformatted_count,
+            UNCHANGED: self.unchanged_count,
+            UNWRITABLE: self.unwritable_count,
+        }
+        self.stream.write(json.dumps(document) + "\n")
+        self.stream.flush()
+
+
+REPORTERS = {
+    "plain": PlainReporter,
+    "rich": RichReporter,
+    "json": JSONReporter,
+    "ndjson": NDJSONReporter,
+}
+
+
+def get_reporter(
+    name: Optional[str], check: bool, quiet: bool, stream: Optional[TextIO] = None
+) -> Reporter:
+    """Create a reporter by its name in `REPORTERS`
+
+    If no name is given, rich is used if stream is a terminal. Otherwise, plain text is.
+    """
+    if stream is None:
+        stream = sys.stdout
+    if name is None:
+        name = "rich" if stream.isatty() else "plain"
+    return REPORTERS[name](check, quiet, stream)
@@ -1,11 +1,12 @@
 import contextlib
 import logging
-from typing import Iterator
+from typing import Iterator, Optional
 
 __all__ = [
     "get_indent",
     "truncate_str",
     "redirect_info_logs_to_debug",
+    "LazyRichHandler",
 ]
 
 ELLIPSIS = "..."
@@ -32,3 +33,23 @@ def redirect_info_logs_to_debug() -> Iterator[None]:
     logging.INFO = logging.DEBUG
     yield
     logging.INFO = old_info
+
+
+class LazyRichHandler(logging.Handler):
+    """Logs with rich's handler, but only imports rich once something is logged
+
+    Importing rich takes a noticeable amount of time, and most runs never log anything.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._handler: Optional[logging.Handler] = None
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if self._handler is None:
+            import rich.logging
+
+            self._handler = rich.logging.RichHandler()
+            if self.formatter:
+                self._handler.setFormatter(self.formatter)
+        self._handler.handle(record)
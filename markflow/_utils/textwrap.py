@@ -1,5 +1,6 @@
+import math
 import re
-from typing import List, Tuple
+from typing import List, Match, Optional, Tuple
 
 from markflow.typing import Number
 
@@ -7,271 +8,271 @@ INLINE_CODE_MARKER_REGEX = re.compile(r"(((?!<\\)`)+)")
 FOOTNOTE_REGEX = re.compile(r"[^\s\]\)]*\[[^\[]+\]\[[^\]]+\][^\s\[\(]*")
 HTML_NEWLINE_REGEX = re.compile(r"<br ?/?>")
 URL_REGEX = re.compile(r"[^\s\]\)]*\[[^\[]+\]\([^\)]+\)[^\s\[\(]*")
+# Words separated by single spaces. Words are either plain text without links or inline
+# code without spaces, neither of which `wrap` can split up or join together.
+PLAIN_WORD = r"(?:[^\s`\[]+|`[^\s`]+`)"
+PLAIN_LINE_REGEX = re.compile(PLAIN_WORD + "(?: " + PLAIN_WORD + ")*")
 
 
-def join(split_text: List[str], leading_spaces: List[bool], width: Number) -> str:
-    new_split_text = [""]
-    for word, leading_space in zip(split_text, leading_spaces):
-        if leading_space and new_split_text[-1]:
-            potential_new_string = f"{new_split_text[-1]} {word}"
-        else:
-            potential_new_string = f"{new_split_text[-1]}{word}"
-        if len(potential_new_string) <= width or not new_split_text[-1] or width <= 0:
-            new_split_text[-1] = potential_new_string
-        else:
-            new_split_text.append(word)
+# A word along with whether there is a space between it and the word before it
+Token = Tuple[str, bool]
 
-        # If we hit an HTML new line, the next text should begin on a new line.
-        if HTML_NEWLINE_REGEX.match(word):
-            new_split_text.append("")
 
-    if not new_split_text[-1]:
-        new_split_text = new_split_text[:-1]
-    return "\n".join(new_split_text)
+def _is_html_newline(word: str) -> bool:
+    return word.startswith("<br") and HTML_NEWLINE_REGEX.match(word) is not None
 
 
-def code_split(
-    text: str, leading_space: bool
-) -> Tuple[List[str], List[bool], List[bool]]:
-    split_text: List[str] = []
-    leading_spaces: List[bool] = []
-    evaluates: List[bool] = []
+def _join_unbounded(tokens: List[Token]) -> str:
+    # Every word fits, so lines only end at HTML new lines
+    lines: List[str] = []
+    words: List[str] = []
+    has_text = False
+    for word, leading_space in tokens:
+        if leading_space and has_text:
+            words.append(" ")
+        words.append(word)
+        has_text = has_text or bool(word)
+        if _is_html_newline(word):
+            lines.append("".join(words))
+            words = []
+            has_text = False
 
-    # Markdown inline code only ends when the exact same number of tildas are seen
-    # again. More or less indicates it is still part of the code.
-    open_marker_len = 0
-    last_end = 0
-    # We jump from tilda mark to tilda mark. The length of the tildas indicate if we are
-    # beginning, ending, or still in code.
-    for code_marker in INLINE_CODE_MARKER_REGEX.finditer(text):
-        if open_marker_len == 0:
-            plaintext = text[last_end : code_marker.start()]
-            if (
-                plaintext.startswith(".")
-                and not plaintext.startswith("..")
-                and split_text
-            ):
-                split_text[-1] += "."
-                plaintext = plaintext[1:]
-            if plaintext.strip():
-                if not leading_spaces:
-                    leading_spaces.append(leading_space)
-                else:
-                    leading_spaces.append(plaintext.startswith(" "))
-                split_text.append(plaintext.strip())
-                evaluates.append(True)
-            open_marker_len = len(code_marker.group())
+    if has_text:
+        lines.append("".join(words))
+    return "\n".join(lines)
 
-            # Prepare our lists for code
-            if not leading_spaces:
-                leading_spaces.append(leading_space)
-            else:
-                leading_spaces.append(plaintext.endswith(" "))
-            evaluates.append(False)
-            split_text.append("`" * open_marker_len)
-        elif len(code_marker.group()) == open_marker_len:
-            # We've found the close of our inline code
-            code = text[last_end : code_marker.start()]
-            split_text[-1] += code + "`" * open_marker_len
-            open_marker_len = 0
+
+def join(tokens: List[Token], width: Number) -> str:
+    """Greedily fill lines with words
+
+    Only the widths of lines are kept track of as words are added to them. Each line is
+    joined together once it is full.
+
+    Args:
+        tokens: The words to fill lines with (see `tokenize`).
+        width: The maximum line length. Words longer than it get a line to themselves.
+            Lines are unbounded if it is infinite or less than 1.
+
+    Returns:
+        The lines joined by new lines.
+    """
+    if width <= 0 or width == math.inf:
+        return _join_unbounded(tokens)
+
+    lines: List[str] = []
+    words: List[str] = []
+    line_width = 0
+    for word, leading_space in tokens:
+        space = leading_space and line_width > 0
+        if line_width and line_width + space + len(word) > width:
+            lines.append("".join(words))
+            words = [word]
+            line_width = len(word)
         else:
-            # We've found more inline code
-            split_text[-1] += text[last_end : code_marker.end()]
+            if space:
+                words.append(" ")
+            words.append(word)
+            line_width += space + len(word)
 
-        last_end = code_marker.end()
+        # If we hit an HTML new line, the next text should begin on a new line.
+        if _is_html_newline(word):
+            lines.append("".join(words))
+            words = []
+            line_width = 0
 
-    # If our last field only has a singular inline code marker, it means that it isn't
-    # inline text and just a standalone tilda or set of tildas, so we can evaluate it.
-    if split_text and len(INLINE_CODE_MARKER_REGEX.findall(split_text[-1])) == 1:
-        evaluates[-1] = True
-        if text[last_end:].strip():
-            split_text[-1] += text[last_end:].rstrip()
-    else:
-        remaining_text = text[last_end:]
-        if (
-            remaining_text
-            and remaining_text.startswith(".")
-            and not remaining_text.startswith("..")
-        ):
-            split_text[-1] += "."
-            remaining_text = remaining_text[1:]
-        if remaining_text.strip():
-            split_text.append(remaining_text.strip())
-            if last_end == 0:
-                leading_spaces.append(leading_space)
-            else:
-                leading_spaces.append(remaining_text.startswith(" "))
-            evaluates.append(True)
+    if line_width:
+        lines.append("".join(words))
+    return "\n".join(lines)
 
-    return split_text, leading_spaces, evaluates
 
+def _starts_with_period(text: str) -> bool:
+    # A period right after inline code or a link ends the sentence it is in, so it is
+    # kept with them. An ellipsis isn't.
+    return text.startswith(".") and not text.startswith("..")
 
-def link_split(
-    text: str, leading_space: bool
-) -> Tuple[List[str], List[bool], List[bool]]:
-    """Splits text based on links
 
-    This function iterates over text split by tildas. Markdown inline code begins with
-    a number of tildas and only ends when that exact number is reached. If there are
-    more tildas, e.g. `` ```` ``, they are treated as part of the inline code.
+def _with_period(token: Token) -> Token:
+    return token[0] + ".", token[1]
 
-    Per our rules, inline code should all be on one line, so each inline code section is
-    marked for non-evaluation.
 
-    Args:
-        text: The text to evaluate
-        leading_space: Should this code section have a leading new space when reflowed?
+def _add_words(tokens: List[Token], text: str, leading_space: bool) -> None:
+    for word in text.split(" "):
+        if not word:
+            continue
+        tokens.append((word.strip(), leading_space))
+        leading_space = True
 
-    Returns:
-        Split text, What sections have leading spaces, What sections should continue to
-        be evaluated
-    """
-    matches = [m for m in FOOTNOTE_REGEX.finditer(text)]
-    matches += [m for m in URL_REGEX.finditer(text)]
-    matches.sort(key=lambda m: m.start())
 
-    split_text: List[str] = []
-    leading_spaces: List[bool] = []
-    evaluates: List[bool] = []
+def _add_html_newlines(tokens: List[Token], text: str, leading_space: bool) -> None:
+    """Tokenize text split up by HTML new lines, which are never joined to other text"""
+    last_end = 0
+    for match in HTML_NEWLINE_REGEX.finditer(text):
+        non_newline_text = text[last_end : match.start()]
+        if last_end:
+            leading_space = text[last_end] == " "
+        if non_newline_text.strip():
+            _add_words(tokens, non_newline_text.strip(), leading_space)
+            leading_space = non_newline_text.endswith(" ")
+        tokens.append((match.group(), leading_space))
+        last_end = match.end()
+
+    remaining_text = text[last_end:]
+    if remaining_text.strip():
+        if last_end:
+            leading_space = remaining_text.startswith(" ")
+        _add_words(tokens, remaining_text.strip(), leading_space)
+
+
+def _add_links(tokens: List[Token], text: str, leading_space: bool) -> None:
+    """Tokenize text with links and footnotes in it
+
+    Links may be split where their destination starts, but the destination itself is
+    never split.
+    """
+    matches: List[Match[str]] = []
+    # Neither kind of link can be in text without brackets, so don't bother looking
+    if "[" in text:
+        matches = [m for m in FOOTNOTE_REGEX.finditer(text)]
+        matches += [m for m in URL_REGEX.finditer(text)]
+        matches.sort(key=lambda m: m.start())
+
+    # The index of the token of the last link's destination
+    destination_index: Optional[int] = None
     last_end = 0
-    # Each iteration of this for loop operates on non-link text followed by
-    # link text.
     for match in matches:
         non_link_text = text[last_end : match.start()]
         if non_link_text.strip():
-            if (
-                split_text
-                and non_link_text.startswith(".")
-                and not non_link_text.startswith("..")
-            ):
-                split_text[-1] += "."
-                non_link_text = non_link_text[1:]
-            split_text.append(non_link_text.strip())
-            if not leading_spaces:
-                leading_spaces.append(leading_space)
-            else:
-                leading_spaces.append(non_link_text.startswith(" "))
-
-            leading_spaces.append(text[match.start() - 1] == " ")
-            evaluates.append(True)
+            if destination_index is not None:
+                if _starts_with_period(non_link_text):
+                    tokens[destination_index] = _with_period(tokens[destination_index])
+                    non_link_text = non_link_text[1:]
+                leading_space = non_link_text.startswith(" ")
+            _add_html_newlines(tokens, non_link_text.strip(), leading_space)
+            link_leading_space = text[match.start() - 1] == " "
         else:
-            if not leading_spaces:
-                leading_spaces.append(leading_space)
-            else:
-                leading_spaces.append(False)
+            link_leading_space = leading_space if destination_index is None else False
 
-        leading_spaces.append(False)
         if "](" in match.group():
             split_link = match.group().split("](")
-            split_text.append(split_link[0].strip() + "](")
-            split_text.append(split_link[1].strip())
+            _add_html_newlines(tokens, split_link[0].strip() + "](", link_leading_space)
         else:
             split_link = match.group().split("][")
-            split_text.append(split_link[0].strip() + "][")
-            split_text.append(split_link[1].strip())
-
+            _add_html_newlines(tokens, split_link[0].strip() + "][", link_leading_space)
         # Don't modify our hyperlink
-        evaluates += [True, False]
+        tokens.append((split_link[1].strip(), False))
+        destination_index = len(tokens) - 1
         last_end = match.end()
 
     remaining_text = text[last_end:]
-    if (
-        remaining_text
-        and remaining_text.startswith(".")
-        and not remaining_text.startswith("..")
-    ):
-        split_text[-1] += "."
+    if destination_index is not None and _starts_with_period(remaining_text):
+        tokens[destination_index] = _with_period(tokens[destination_index])
         remaining_text = remaining_text[1:]
     if remaining_text.strip():
-        split_text.append(remaining_text.strip())
-        if last_end == 0:
-            leading_spaces.append(leading_space)
-        else:
-            leading_spaces.append(remaining_text.startswith(" "))
-        evaluates.append(True)
+        if last_end:
+            leading_space = remaining_text.startswith(" ")
+        _add_html_newlines(tokens, remaining_text.strip(), leading_space)
 
-    return split_text, leading_spaces, evaluates
 
+def tokenize(text: str) -> List[Token]:
+    """Split text into the words it is wrapped by in a single pass
 
-def newline_split(
-    text: str, leading_space: bool
-) -> Tuple[List[str], List[bool], List[bool]]:
-    split_text: List[str] = []
-    leading_spaces: List[bool] = []
-    evaluates: List[bool] = []
-    last_end = 0
-    # Each iteration of this for loop operates operates on plaintext followed by an HML
-    # newline.
-    for match in HTML_NEWLINE_REGEX.finditer(text):
-        non_newline_text = text[last_end : match.start()]
-        if not leading_spaces:
-            leading_spaces.append(leading_space)
-        else:
-            leading_spaces.append(text[last_end] == " ")
-
-        if non_newline_text.strip():
-            split_text.append(non_newline_text.strip())
-            evaluates.append(True)
-            leading_spaces.append(non_newline_text.endswith(" "))
+    Markdown inline code begins with a number of backticks and only ends when that
+    exact number is seen again. If there are more or fewer backticks, e.g.
+    `` ```` ``, they are treated as part of the inline code. Per our rules, inline code
+    should all be on one line, so each inline code span is a single word. The text
+    between them is split into words as it is found, along with any links or HTML new
+    lines in it.
 
-        split_text.append(match.group())
-        evaluates.append(False)
-        last_end = match.end()
+    Args:
+        text: The text to split. It should already be on one line.
 
-    if text[last_end:].strip():
-        split_text.append(text[last_end:].strip())
-        if last_end == 0:
-            leading_spaces.append(leading_space)
+    Returns:
+        The words of text, each along with whether it should be separated from the word
+        before it by a space when reflowed.
+    """
+    tokens: List[Token] = []
+    # The inline code being read (or last read), which the text after it may add to
+    code = ""
+    code_leading_space = False
+    open_marker_len = 0
+    last_end = 0
+    # We jump from backtick run to backtick run. The length of the runs indicate if we
+    # are beginning, ending, or still in code.
+    for code_marker in INLINE_CODE_MARKER_REGEX.finditer(text):
+        if open_marker_len == 0:
+            plaintext = text[last_end : code_marker.start()]
+            started = bool(code)
+            if code:
+                if _starts_with_period(plaintext):
+                    code += "."
+                    plaintext = plaintext[1:]
+                tokens.append((code, code_leading_space))
+            if plaintext.strip():
+                _add_links(
+                    tokens, plaintext.strip(), started and plaintext.startswith(" ")
+                )
+                started = True
+            open_marker_len = len(code_marker.group())
+            code = "`" * open_marker_len
+            code_leading_space = started and plaintext.endswith(" ")
+        elif len(code_marker.group()) == open_marker_len:
+            # We've found the close of our inline code
+            code += text[last_end : code_marker.end()]
+            open_marker_len = 0
         else:
-            leading_spaces.append(text[last_end:].startswith(" "))
-        evaluates.append(True)
-
-    return split_text, leading_spaces, evaluates
+            # We've found more inline code
+            code += text[last_end : code_marker.end()]
 
+        last_end = code_marker.end()
 
-def space_split(
-    text: str, leading_space: bool
-) -> Tuple[List[str], List[bool], List[bool]]:
-    split_text: List[str] = []
-    leading_spaces: List[bool] = []
-    evaluates: List[bool] = []
-    for word in text.split(" "):
-        if not word:
-            continue
-        split_text.append(word.strip())
-        if not leading_spaces:
-            leading_spaces.append(leading_space)
-        else:
-            leading_spaces.append(True)
-        evaluates.append(True)
+    remaining_text = text[last_end:]
+    if not code:
+        if remaining_text.strip():
+            _add_links(tokens, remaining_text.strip(), False)
+    elif code == "`" * open_marker_len:
+        # A lone run of backticks that is never closed isn't inline code, so it is
+        # tokenized along with the text after it.
+        if remaining_text.strip():
+            code += remaining_text.rstrip()
+        _add_links(tokens, code, code_leading_space)
+    else:
+        if _starts_with_period(remaining_text):
+            code += "."
+            remaining_text = remaining_text[1:]
+        tokens.append((code, code_leading_space))
+        if remaining_text.strip():
+            _add_links(tokens, remaining_text.strip(), remaining_text.startswith(" "))
 
-    return split_text, leading_spaces, evaluates
+    return tokens
 
 
 def wrap(text: str, width: Number) -> str:
     # TODO: Should wrap be modifying the input. Maybe assert there's no newlines?
     lines = text.splitlines()
     text = " ".join([line.strip() for line in lines])
+    return join(tokenize(text), width)
+
 
-    split_text: List[str] = [text]
-    leading_spaces: List[bool] = [False]
-    evaluates: List[bool] = [True]
-    for func in [code_split, link_split, newline_split, space_split]:
-        new_split_text = []
-        new_leading_spaces = []
-        new_evaluates = []
-        for text, leading_space, evaluate in zip(split_text, leading_spaces, evaluates):
-            if evaluate:
-                nst, nls, evl = func(text, leading_space)
-                new_split_text += nst
-                new_leading_spaces += nls
-                new_evaluates += evl
-            else:
-                new_split_text.append(text)
-                new_leading_spaces.append(leading_space)
-                new_evaluates.append(evaluate)
-        split_text = new_split_text
-        leading_spaces = new_leading_spaces
-        evaluates = new_evaluates
-
-    return join(split_text, leading_spaces, width)
+def is_wrapped(lines: List[str], width: Number) -> bool:
+    """Check whether `wrap` would leave lines exactly as they are without wrapping them
+
+    Only lines of plain words are checked, since they are split into words the same
+    way no matter how they are wrapped. Anything else, like links, HTML new lines or
+    inline code with spaces in it, is never considered wrapped and is left for `wrap` to
+    decide.
+    """
+    if not lines:
+        return False
+    for line in lines:
+        if not PLAIN_LINE_REGEX.fullmatch(line) or HTML_NEWLINE_REGEX.search(line):
+            return False
+        # Only a single word can overflow a line
+        if len(line) > width > 0 and " " in line:
+            return False
+    if width <= 0:
+        return len(lines) == 1
+    # Each line has to be full, i.e. the next word wouldn't have fit on it
+    for line, next_line in zip(lines, lines[1:]):
+        if len(line) + 1 + len(next_line.split(" ", 1)[0]) <= width:
+            return False
+    return True
@@ -3,28 +3,200 @@ MarkFlow Line Detection Library
 
 This library is used a common space to evaluate position independent information about
 lines. They are stored here so as to avoid any circular imports.
+
+Each line is lexed once into a set of flags and a few measurements. Documents are lexed
+into a `LineTable` up front so detectors can look up what a line could be instead of
+reevaluating it every time they need to know.
 """
 
 import re
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+# Everything we want to know about a line is captured by one pass of this expression.
+# The lookaheads are all evaluated from just after the indentation so that a line can
+# be, say, both a bullet list start and a thematic break.
+LINE_REGEX = re.compile(
+    r"(?P<indent>\s*)"
+    # Three or more of the same thematic break character, ignoring all whitespace
+    r"(?=(?P<thematic_break>([*_-])(?:\s*\3){2,}\s*\Z))?"
+    # All equals or all dashes, ignoring trailing whitespace
+    r"(?=(?P<setext_underline>(?:=+|-+)\s*\Z))?"
+    # Bullet and ordered list markers need a space after them
+    r"(?=(?P<list_marker>[*+-]|[0-9]+\.) )?"
+    # Fences are the full run of their character and may close a block if they are the
+    # only thing on the line
+    r"(?P<fence>`{3,}|~{3,})?"
+    r"(?P<bare_fence>(?<=[`~])\s*\Z)?"
+)
 
-from .._utils import get_indent
-
-FENCED_CODE_BLOCK_FENCE_CHARACTERS = ["`", "~"]
-BULLET_LIST_START_REGEX = re.compile(
-    r"^\s*"  # Leading spaces are OK and often expected
-    r"["
-    r"*"  # Asterisk list marker
-    r"+"  # Plus list marker
-    r"-"  # Dash list marker
-    r"] "  # Lists need a space after their identifier
+BLANK = 1 << 0
+INDENTED_CODE_BLOCK_START = 1 << 1
+ATX_HEADING = 1 << 2
+EXPLICIT_BLOCK_QUOTE = 1 << 3
+FENCED_CODE_BLOCK_START = 1 << 4
+CLOSING_FENCE = 1 << 5
+BULLET_LIST_START = 1 << 6
+ORDERED_LIST_START = 1 << 7
+TABLE_START = 1 << 8
+THEMATIC_BREAK = 1 << 9
+SETEXT_UNDERLINE = 1 << 10
+PARAGRAPH_START = 1 << 11
+HARD_BREAK = 1 << 12
+
+# Lines with any of these flags cannot start a paragraph
+NON_PARAGRAPH_START = (
+    INDENTED_CODE_BLOCK_START
+    | ATX_HEADING
+    | BLANK
+    | BULLET_LIST_START
+    | EXPLICIT_BLOCK_QUOTE
+    | FENCED_CODE_BLOCK_START
+    | ORDERED_LIST_START
+    | TABLE_START
+    | THEMATIC_BREAK
 )
-ORDERED_LIST_START_REGEX = re.compile(
-    r"^\s*"  # Leading spaces are OK and often expected
-    r"("
-    r"[0-9]+\."  # Numeric list marker
-    r") "  # Lists need a space after their identifier
+
+# Lines with any of these flags end a paragraph before them
+PARAGRAPH_INTERRUPTION = (
+    ATX_HEADING
+    | BLANK
+    | BULLET_LIST_START
+    | EXPLICIT_BLOCK_QUOTE
+    | FENCED_CODE_BLOCK_START
+    | ORDERED_LIST_START
+    | SETEXT_UNDERLINE
+    | TABLE_START
+    | THEMATIC_BREAK
 )
-THEMATIC_BREAK_CHARACTERS = ["*", "_", "-"]
+
+# (flags, indent, fence length)
+LexedLine = Tuple[int, int, int]
+
+
+def lex_line(line: str) -> LexedLine:
+    """Evaluates everything the detectors need to know about a line
+
+    Args:
+        line: The line to evaluate
+
+    Returns:
+        A tuple of the line's flags, its indentation, and the length of the fence it
+        starts with (0 if it does not start with one).
+    """
+    match = LINE_REGEX.match(line)
+    # Our expression can always match the empty string
+    assert match is not None
+    indent = match.end("indent")
+    if indent == len(line):
+        return BLANK, indent, 0
+
+    first_char = line[indent]
+    flags = 0
+    fence_length = 0
+
+    if indent >= 4:
+        flags |= INDENTED_CODE_BLOCK_START
+    elif first_char == "#":
+        flags |= ATX_HEADING
+    elif first_char == ">":
+        flags |= EXPLICIT_BLOCK_QUOTE
+
+    if first_char == "|":
+        flags |= TABLE_START
+
+    fence = match.group("fence")
+    if fence:
+        flags |= FENCED_CODE_BLOCK_START
+        fence_length = len(fence)
+        if match.group("bare_fence") is not None:
+            flags |= CLOSING_FENCE
+
+    if indent < 4:
+        list_marker = match.group("list_marker")
+        if list_marker:
+            if list_marker[-1] == ".":
+                flags |= ORDERED_LIST_START
+            else:
+                flags |= BULLET_LIST_START
+        if match.group("thematic_break"):
+            flags |= THEMATIC_BREAK
+        if match.group("setext_underline"):
+            flags |= SETEXT_UNDERLINE
+
+    if not flags & NON_PARAGRAPH_START:
+        flags |= PARAGRAPH_START
+
+    # Two trailing spaces force a line break
+    if line.endswith("  "):
+        flags |= HARD_BREAK
+
+    return flags, indent, fence_length
+
+
+def line_flags(line: str) -> int:
+    return lex_line(line)[0]
+
+
+class LineTable:
+    """The lines of a document and what each of them could be
+
+    This behaves like a `list` of the lines for reading purposes so detectors can still
+    look at the text of the lines they are given. If the lines have already been lexed
+    (see `lex_line`), the results can be passed in as `lexed_lines` instead of lexing
+    them again.
+
+    Attributes:
+        lines: The lines of the document.
+        flags: The flags for each line.
+        indents: The indentation of each line.
+        first_chars: The first non-whitespace character of each line (or a space for
+            blank lines) as one string.
+        fence_lengths: The length of the fence each line starts with (0 if it doesn't).
+        paragraph_ends: For each line, the index a paragraph continued onto it would
+            end at. That is either the index of the next line that would interrupt the
+            paragraph or the index after the next line with a hard break, whichever
+            comes first. There is an extra element for the end of the document.
+        paragraph_scans: Where the paragraph or setext heading starting at a line ends
+            and whether it is a setext heading, filled in as they are found.
+    """
+
+    def __init__(self, lines: List[str], lexed_lines: Optional[List[LexedLine]] = None):
+        self.lines = lines
+        if lexed_lines is None:
+            lexed_lines = [lex_line(line) for line in lines]
+        flags: List[int] = []
+        indents: List[int] = []
+        fence_lengths: List[int] = []
+        first_chars: List[str] = []
+        for line, (line_flags_, indent, fence_length) in zip(lines, lexed_lines):
+            flags.append(line_flags_)
+            indents.append(indent)
+            fence_lengths.append(fence_length)
+            first_chars.append(line[indent] if indent < len(line) else " ")
+        self.flags = array("I", flags)
+        self.indents = array("I", indents)
+        self.fence_lengths = array("I", fence_lengths)
+        self.first_chars = "".join(first_chars)
+
+        # Built backwards so each line is only looked at once
+        paragraph_ends = [len(lines)] * (len(lines) + 1)
+        for index in range(len(lines) - 1, -1, -1):
+            line_flags_ = flags[index]
+            if line_flags_ & PARAGRAPH_INTERRUPTION:
+                paragraph_ends[index] = index
+            elif line_flags_ & HARD_BREAK:
+                paragraph_ends[index] = index + 1
+            else:
+                paragraph_ends[index] = paragraph_ends[index + 1]
+        self.paragraph_ends = array("I", paragraph_ends)
+        self.paragraph_scans: Dict[int, Tuple[int, bool]] = {}
+
+    def __getitem__(self, index: int) -> str:
+        return self.lines[index]
+
+    def __len__(self) -> int:
+        return len(self.lines)
 
 
 def is_atx_heading_line(line: str) -> bool:
@@ -45,7 +217,7 @@ def is_atx_heading_line(line: str) -> bool:
     Returns:
         True if the line is an ATX heading. False otherwise.
     """
-    return not is_indented_code_block_start_line(line) and line.lstrip().startswith("#")
+    return bool(line_flags(line) & ATX_HEADING)
 
 
 def is_blank_line_line(line: str) -> bool:
@@ -62,7 +234,7 @@ def is_blank_line_line(line: str) -> bool:
     Returns:
         True if the line is an ATX heading. False otherwise.
     """
-    return not line.strip()
+    return bool(line_flags(line) & BLANK)
 
 
 def is_explicit_block_quote_line(line: str) -> bool:
@@ -82,7 +254,7 @@ def is_explicit_block_quote_line(line: str) -> bool:
     Returns:
         True if the line is an block quote line. False otherwise.
     """
-    return not is_indented_code_block_start_line(line) and line.lstrip().startswith(">")
+    return bool(line_flags(line) & EXPLICIT_BLOCK_QUOTE)
 
 
 def is_fenced_code_block_start_line(line: str) -> bool:
@@ -100,10 +272,7 @@ def is_fenced_code_block_start_line(line: str) -> bool:
     Returns:
         True if the line is could open a fenced code block. False otherwise.
     """
-    for fence in FENCED_CODE_BLOCK_FENCE_CHARACTERS:
-        if line.strip().startswith(fence * 3):
-            return True
-    return False
+    return bool(line_flags(line) & FENCED_CODE_BLOCK_START)
 
 
 def is_indented_code_block_start_line(line: str) -> bool:
@@ -120,7 +289,7 @@ def is_indented_code_block_start_line(line: str) -> bool:
     Returns:
         True if the line is could start an indented code block. False otherwise.
     """
-    return bool(line.strip()) and get_indent(line) >= 4
+    return bool(line_flags(line) & INDENTED_CODE_BLOCK_START)
 
 
 def is_ordered_list_start_line(line: str) -> bool:
@@ -137,9 +306,7 @@ def is_ordered_list_start_line(line: str) -> bool:
     Returns:
         True if the line is could start an ordered list. False otherwise.
     """
-    return not is_indented_code_block_start_line(line) and bool(
-        ORDERED_LIST_START_REGEX.search(line)
-    )
+    return bool(line_flags(line) & ORDERED_LIST_START)
 
 
 def is_bullet_list_start_line(line: str) -> bool:
@@ -158,9 +325,7 @@ def is_bullet_list_start_line(line: str) -> bool:
     Returns:
         True if the line is could start a bullet list. False otherwise.
     """
-    return not is_indented_code_block_start_line(line) and bool(
-        BULLET_LIST_START_REGEX.search(line)
-    )
+    return bool(line_flags(line) & BULLET_LIST_START)
 
 
 def is_paragraph_start_line(line: str) -> bool:
@@ -179,20 +344,7 @@ def is_paragraph_start_line(line: str) -> bool:
     Returns:
         True if the line is could start a list. False otherwise.
     """
-    for line_checker in [
-        is_indented_code_block_start_line,
-        is_atx_heading_line,
-        is_blank_line_line,
-        is_bullet_list_start_line,
-        is_explicit_block_quote_line,
-        is_fenced_code_block_start_line,
-        is_ordered_list_start_line,
-        is_table_start_line,
-        is_thematic_break_line,
-    ]:
-        if line_checker(line):
-            return False
-    return True
+    return bool(line_flags(line) & PARAGRAPH_START)
 
 
 def is_setext_underline(line: str) -> bool:
@@ -210,14 +362,7 @@ def is_setext_underline(line: str) -> bool:
     Returns:
         True if the line is could underline an setext heading. False otherwise.
     """
-    return (
-        not is_indented_code_block_start_line(line)
-        and bool(line.strip())
-        and (
-            all([c == "=" for c in line.strip()])
-            or all([c == "-" for c in line.strip()])
-        )
-    )
+    return bool(line_flags(line) & SETEXT_UNDERLINE)
 
 
 def is_table_start_line(line: str) -> bool:
@@ -236,20 +381,8 @@ def is_table_start_line(line: str) -> bool:
     """
     # ToDo: Not really, but we'll have to adapt a standard from somewhere other than
     #  CommonMark
-    return line.lstrip().startswith("|")
+    return bool(line_flags(line) & TABLE_START)
 
 
 def is_thematic_break_line(line: str) -> bool:
-    if is_indented_code_block_start_line(line):
-        return False
-
-    spaceless_line = "".join(line.split())
-    if len(spaceless_line) < 3:
-        # Thematic breaks must be at least three characters long
-        return False
-    else:
-        for symbol in THEMATIC_BREAK_CHARACTERS:
-            if all(char == symbol for char in spaceless_line.strip()):
-                return True
-        else:
-            return False
+    return bool(line_flags(line) & THEMATIC_BREAK)
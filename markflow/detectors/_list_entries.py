@@ -0,0 +1,100 @@
+"""
+Splitting lists into their entries
+
+Both list types are split the same way, so this lives separately from their detectors.
+"""
+import re
+from typing import List
+
+from .._utils import get_indent
+
+MARKER_REGEX = re.compile(
+    r"^\s*"  # Leading spaces are allowed and often expected
+    r"("
+    r"\*|"  # Asterisk list marker
+    r"-|"  # Dash list marker
+    r"\+|"  # Plus list marker
+    r"[0-9]+\."  # Numeric list marker
+    r")"
+    r"($| )"  # End of line or space
+)
+CODE_BLOCK_FENCES = "`~"
+
+
+def _list_marker_end_pos(line: str) -> int:
+    """Return the number of characters before the end of a list marker
+
+    Note: This does not include the trailing space in the count.
+
+    Args:
+        line: The lines to evaluate.
+
+    Returns:
+        True if the first line would continue the paragraph. False otherwise.
+    """
+
+    match = MARKER_REGEX.match(line)
+    if match is None:
+        raise RuntimeError(
+            "Attempted to find the end of a list marker on a line that doesn't have "
+            "one. Please open a bug report or email jholland@duosecurity.com."
+        )
+    return match.end(1)
+
+
+def _split_list(lines: List[str]) -> List[List[str]]:
+    in_code_block = False
+    code_block_end = ""
+
+    list_entries: List[List[str]] = []
+    max_indent = _list_marker_end_pos(lines[0])
+    for line in lines:
+        if any(line.lstrip().startswith(f * 3) for f in CODE_BLOCK_FENCES):
+            code_block_symbol = line.lstrip()[0]
+            code_block_marker_length = len(line.lstrip()) - len(
+                line.lstrip(code_block_symbol)
+            )
+            code_block_marker = code_block_marker_length * code_block_symbol
+            if in_code_block:
+                if code_block_end == code_block_marker:
+                    in_code_block = False
+            else:
+                in_code_block = True
+                code_block_end = code_block_marker
+
+        if MARKER_REGEX.match(line) and not in_code_block:
+            line_indent = get_indent(line)
+            list_indent = _list_marker_end_pos(line)
+            if line_indent <= max_indent:
+                max_indent = list_indent
+                list_entries.append([line])
+            else:
+                list_entries[-1].append(line)
+        else:
+            list_entries[-1].append(line)
+    return list_entries
+
+
+def _dedent_entries(list_entries: List[List[str]]) -> List[List[str]]:
+    # ToDo: Should we handle missing spaces? I don't think so. Think:
+    #  *read*
+    dedented_entries: List[List[str]] = []
+    for entry in list_entries:
+        indent = _list_marker_end_pos(entry[0]) + 1
+        dedented_entries.append([entry[0][indent:]])
+        for line in entry[1:]:
+            dedented_entry = line[:indent].lstrip() + line[indent:]
+            dedented_entries[-1].append(dedented_entry)
+    return dedented_entries
+
+
+def list_entries(lines: List[str]) -> List[List[str]]:
+    """Split a list into its entries with the list markers removed
+
+    Args:
+        lines: The lines of the list.
+
+    Returns:
+        The content of each entry, one line per line of the list.
+    """
+    return _dedent_entries(_split_list(lines))
@@ -19,7 +19,27 @@ Examples:
 
 from typing import List, Tuple
 
-from ._lines import is_atx_heading_line
+from ._lines import ATX_HEADING, LineTable
+
+
+def scan_atx_heading(lines: LineTable, start: int, line_offset: int = 0) -> int:
+    """Find the end of the ATX heading starting at `start` if one exists
+
+    Args:
+        lines: The lines to evaluate.
+        start: The index of the line to begin evaluating from.
+        line_offset (optional): The offset into the overall document of the first
+            element of lines. This is used for reporting errors in the original
+            document.
+
+    Returns:
+        The index of the line after the ATX heading if one starts at `start`, otherwise
+        `start`.
+    """
+    if lines.flags[start] & ATX_HEADING:
+        return start + 1
+    else:
+        return start
 
 
 def split_atx_heading(
@@ -41,7 +61,5 @@ def split_atx_heading(
         otherwise it is an empty list. The second value is the remaining text. (If lines
         does not start with an ATX heading, it is the same as lines.)
     """
-    if is_atx_heading_line(lines[0]):
-        return [lines[0]], lines[1:]
-    else:
-        return [], lines
+    end = scan_atx_heading(LineTable(lines), 0, line_offset)
+    return lines[:end], lines[end:]
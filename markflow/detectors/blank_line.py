@@ -12,7 +12,27 @@ Example:
 
 from typing import List, Tuple
 
-from ._lines import is_blank_line_line
+from ._lines import BLANK, LineTable
+
+
+def scan_blank_line(lines: LineTable, start: int, line_offset: int = 0) -> int:
+    """Find the end of the blank line starting at `start` if one exists
+
+    Args:
+        lines: The lines to evaluate.
+        start: The index of the line to begin evaluating from.
+        line_offset (optional): The offset into the overall document of the first
+            element of lines. This is used for reporting errors in the original
+            document.
+
+    Returns:
+        The index of the line after the blank line if one starts at `start`, otherwise
+        `start`.
+    """
+    if lines.flags[start] & BLANK:
+        return start + 1
+    else:
+        return start
 
 
 def split_blank_line(
@@ -31,7 +51,5 @@ def split_blank_line(
         remaining text. (If lines does not start with a blank line, it is the same as
         lines.)
     """
-    if is_blank_line_line(lines[0]):
-        return [lines[0]], lines[1:]
-    else:
-        return [], lines
+    end = scan_blank_line(LineTable(lines), 0, line_offset)
+    return lines[:end], lines[end:]
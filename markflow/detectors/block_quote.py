@@ -1,25 +1,26 @@
 import re
 from typing import List, Tuple
 
-from .._utils import redirect_info_logs_to_debug
+from .._utils import get_indent
 from ._lines import (
-    is_explicit_block_quote_line,
-    is_setext_underline,
-    is_thematic_break_line,
+    EXPLICIT_BLOCK_QUOTE,
+    PARAGRAPH_INTERRUPTION,
+    SETEXT_UNDERLINE,
+    THEMATIC_BREAK,
+    LineTable,
+    line_flags,
 )
-from .atx_heading import split_atx_heading
-from .blank_line import split_blank_line
-from .bullet_list import split_bullet_list
-from .fenced_code_block import split_fenced_code_block
-from .ordered_list import split_ordered_list
-from .table import split_table
-from .thematic_break import split_thematic_break
 
-LEADING_QUOTE_MARKER = re.compile(r"^ {0,3}>")
+# Any whitespace counts towards the indentation of a block quote line (see `lex_line`),
+# so it is removed along with the marker. Otherwise, the content would still look like
+# a block quote.
+LEADING_QUOTE_MARKER = re.compile(r"^\s{0,3}>")
 
 
-def _is_paragraph_continuation_text(lines: List[str], line_offset: int = 0) -> bool:
-    """Indicates whether the first line of lines would continue a paragraph
+def _is_paragraph_continuation_text(
+    lines: LineTable, index: int, line_offset: int = 0
+) -> bool:
+    """Indicates whether the line at index would continue a paragraph
 
     This ensures that any valid interrupting section of a paragraph could not result in
     a valid block instead.
@@ -55,49 +56,70 @@ def _is_paragraph_continuation_text(lines: List[str], line_offset: int = 0) -> b
 
     Args:
         lines: The lines to evaluate.
-        line_offset (optional): The offset into the overall document we are at. This is
-            used for reporting errors in the original document.
+        index: The index of the line to evaluate.
+        line_offset (optional): The offset into the overall document of the first
+            element of lines. This is used for reporting errors in the original
+            document.
 
     Returns:
-        True if the first line would continue the paragraph. False otherwise.
+        True if the line would continue the paragraph. False otherwise.
     """
-    from .setext_heading import split_setext_heading
-
-    for splitter in [
-        split_atx_heading,
-        split_blank_line,
-        split_bullet_list,
-        split_fenced_code_block,
-        split_ordered_list,
-        split_setext_heading,
-        split_table,
-        split_thematic_break,
-    ]:
-        with redirect_info_logs_to_debug():
-            if splitter(lines, line_offset)[0]:
-                return False
-    if is_setext_underline(lines[0]):
+    from .setext_heading import scan_setext_heading
+
+    if lines.flags[index] & PARAGRAPH_INTERRUPTION & ~EXPLICIT_BLOCK_QUOTE:
         return False
-    return True
+    return scan_setext_heading(lines, index, line_offset) == index
 
 
-def _block_quote_ends_with_paragraph(block_quote_lines: List[str]) -> bool:
-    # Avoid circular imports
-    from ..parser import MarkdownSectionEnum, parse_markdown
+def scan_block_quote(lines: LineTable, start: int, line_offset: int = 0) -> int:
+    """Find the end of the block quote starting at `start` if one exists
 
-    parsing_lines = []
-    for line in block_quote_lines:
-        parsing_lines.append(LEADING_QUOTE_MARKER.sub("", line))
+    See `split_block_quote` for how paragraph continuation lines are treated.
 
-    with redirect_info_logs_to_debug():
-        ending_section_type, ending_section_content = parse_markdown(parsing_lines)[-1]
+    Args:
+        lines: The lines to evaluate.
+        start: The index of the line to begin evaluating from.
+        line_offset (optional): The offset into the overall document of the first
+            element of lines. This is used for reporting errors in the original
+            document.
 
-    if ending_section_type == MarkdownSectionEnum.BLOCK_QUOTE:
-        return _block_quote_ends_with_paragraph(ending_section_content)
-    elif ending_section_type == MarkdownSectionEnum.PARAGRAPH:
-        return True
-    else:
-        return False
+    Returns:
+        The index of the line after the block quote if one starts at `start`, otherwise
+        `start`.
+    """
+    flags = lines.flags
+    if not flags[start] & EXPLICIT_BLOCK_QUOTE:
+        return start
+
+    # Avoid circular imports
+    from ..parser import IncrementalParser
+
+    index = start
+    line_count = len(lines)
+
+    # The content of the block quote is followed as we go so that we know whether it
+    # ends in a paragraph without having to parse it all again
+    content = IncrementalParser(line_offset + start)
+    while index < line_count and flags[index] & EXPLICIT_BLOCK_QUOTE:
+        content.feed(LEADING_QUOTE_MARKER.sub("", lines[index]))
+        index += 1
+
+    # Explicitly quoted lines are always continuation text, so once we're accepting
+    # continuation text, there's no need to look for more of them separately.
+    if content.ends_with_paragraph():
+        first_line = True
+        while index < line_count and _is_paragraph_continuation_text(
+            lines, index, line_offset
+        ):
+            if first_line:
+                first_line = False
+                if flags[index] & SETEXT_UNDERLINE and not (
+                    flags[index] & THEMATIC_BREAK
+                ):
+                    break
+            index += 1
+
+    return index
 
 
 def split_block_quote(
@@ -124,34 +146,47 @@ def split_block_quote(
         found, otherwise it is an empty list. The second value is the remaining text.
         (If lines does not start with a thematic break, it is the same as lines.)
     """
-    block_quote: List[str] = []
-    remaining_lines = lines
+    end = scan_block_quote(LineTable(lines), 0, line_offset)
+    return lines[:end], lines[end:]
 
-    while remaining_lines:
-        if not is_explicit_block_quote_line(remaining_lines[0]):
-            break
 
-        while remaining_lines and is_explicit_block_quote_line(remaining_lines[0]):
-            block_quote += [remaining_lines[0]]
-            remaining_lines = remaining_lines[1:]
-
-        check_for_continuation = _block_quote_ends_with_paragraph(block_quote)
-
-        if check_for_continuation:
-            first_line = True
-            while remaining_lines and _is_paragraph_continuation_text(
-                remaining_lines, line_offset
-            ):
-                if first_line:
-                    first_line = False
-                    if is_setext_underline(
-                        remaining_lines[0]
-                    ) and not is_thematic_break_line(remaining_lines[0]):
-                        break
-                block_quote += [remaining_lines[0]]
-                remaining_lines = remaining_lines[1:]
-                line_offset += 1
+def block_quote_content(lines: List[str]) -> Tuple[List[str], bool]:
+    """Remove the block quote markers from the lines of a block quote
+
+    Paragraph continuation lines are quoted to the depth of the explicitly quoted line
+    before them so that they stay at the same level of nesting. If the first quoted line
+    with any content has a space between its marker and its content, one space is
+    removed from every line.
+
+    Args:
+        lines: The lines of the block quote.
+
+    Returns:
+        A tuple of two values. The first is the content of the block quote, one line
+        per line of the block quote. The second is whether a space was removed after
+        the markers.
+    """
+    depth = 0
+    stripped_lines: List[str] = []
+    for line in lines:
+        if line_flags(line) & EXPLICIT_BLOCK_QUOTE:
+            spaceless_string = "".join(line.split())
+            depth = len(spaceless_string) - len(spaceless_string.lstrip(">"))
         else:
+            line = (">" * depth) + line
+        stripped_lines.append(LEADING_QUOTE_MARKER.sub("", line))
+
+    for line in stripped_lines:
+        if not line.strip():
+            continue
+        has_space = get_indent(line) == 1
+        if has_space or get_indent(line) == 0:
             break
+    else:
+        has_space = False
 
-    return block_quote, remaining_lines
+    if has_space:
+        stripped_lines = [
+            line[1:] if line and line[0] == " " else line for line in stripped_lines
+        ]
+    return stripped_lines, has_space
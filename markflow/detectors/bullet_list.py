@@ -1,37 +1,23 @@
 from typing import List, Tuple
 
-from ._lines import (
-    is_blank_line_line,
-    is_bullet_list_start_line,
-    is_table_start_line,
-    is_thematic_break_line,
-)
+from ._lines import BLANK, BULLET_LIST_START, TABLE_START, THEMATIC_BREAK, LineTable
 
+LIST_ENDING = BLANK | TABLE_START | THEMATIC_BREAK
 
-def split_bullet_list(
-    lines: List[str], line_offset: int = 0
-) -> Tuple[List[str], List[str]]:
-    bullet_list: List[str] = []
-    remaining_lines = lines
-    indexed_line_generator = enumerate(lines)
 
-    index, line = next(indexed_line_generator)
-    if not is_bullet_list_start_line(line):
-        return bullet_list, remaining_lines
+def scan_bullet_list(lines: LineTable, start: int, line_offset: int = 0) -> int:
+    if not lines.flags[start] & BULLET_LIST_START:
+        return start
+
+    flags = lines.flags
+    for index in range(start + 1, len(lines)):
+        if flags[index] & LIST_ENDING:
+            return index
+    return len(lines)
 
-    bullet_list.append(line)
-    for index, line in indexed_line_generator:
-        if (
-            is_blank_line_line(line)
-            or is_table_start_line(line)
-            or is_thematic_break_line(line)
-        ):
-            break
-        else:
-            bullet_list.append(line)
-    else:
-        # We consumed the last line, so increment our index to chop it off
-        index += 1
 
-    remaining_lines = remaining_lines[index:]
-    return bullet_list, remaining_lines
+def split_bullet_list(
+    lines: List[str], line_offset: int = 0
+) -> Tuple[List[str], List[str]]:
+    end = scan_bullet_list(LineTable(lines), 0, line_offset)
+    return lines[:end], lines[end:]
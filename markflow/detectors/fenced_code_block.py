@@ -21,7 +21,7 @@ Examples:
 import logging
 from typing import List, Tuple
 
-from .._utils import get_indent
+from ._lines import CLOSING_FENCE, FENCED_CODE_BLOCK_START, LineTable
 
 logger = logging.getLogger(__name__)
 
@@ -94,6 +94,45 @@ def fenced_code_block_ended(line: str, index: int, lines: List[str]) -> bool:
     return False
 
 
+def scan_fenced_code_block(lines: LineTable, start: int, line_offset: int = 0) -> int:
+    """Find the end of the fenced code block starting at `start` if one exists
+
+    Args:
+        lines: The lines to evaluate.
+        start: The index of the line to begin evaluating from.
+        line_offset (optional): The offset into the overall document of the first
+            element of lines. This is used for reporting errors in the original
+            document.
+
+    Returns:
+        The index of the line after the fenced code block if one starts at `start`,
+        otherwise `start`.
+    """
+    # TODO: Fenced code blocks can't be indented
+    flags = lines.flags
+    if not flags[start] & FENCED_CODE_BLOCK_START:
+        return start
+    fence = lines.first_chars[start]
+    fence_length = lines.fence_lengths[start]
+    fence_indent = lines.indents[start]
+
+    for index in range(start + 1, len(lines)):
+        if (
+            flags[index] & CLOSING_FENCE
+            and lines.first_chars[index] == fence
+            and lines.fence_lengths[index] == fence_length
+        ):
+            if lines.indents[index] > 3 + fence_indent:
+                logger.warning(
+                    "Detected that the fence on line %d is over indented per the "
+                    "standard. If this is intentional, please file a bug report."
+                    % (index + line_offset + 1)
+                )
+            return index + 1
+
+    return len(lines)
+
+
 def split_fenced_code_block(
     lines: List[str], line_offset: int = 0
 ) -> Tuple[List[str], List[str]]:
@@ -109,33 +148,5 @@ def split_fenced_code_block(
         found, otherwise it is an empty list. The second value is the remaining text.
         (If lines does not start with a fenced code block, it is the same as lines.)
     """
-    # TODO: Fenced code blocks can't be indented
-    fenced_code_block: List[str] = []
-    remaining_lines = lines
-    indexed_line_generator = enumerate(lines)
-
-    index, line = next(indexed_line_generator)
-    for fence in FENCES:
-        if line.strip().startswith(fence * 3):
-            count = len(line.lstrip()) - len(line.lstrip().lstrip(fence))
-            fence_indent = get_indent(line)
-            full_fence = fence * count
-            break
-    else:
-        return fenced_code_block, remaining_lines
-
-    fenced_code_block.append(line)
-
-    for index, line in indexed_line_generator:
-        fenced_code_block.append(line)
-        if line.strip() == full_fence:
-            if get_indent(line) > 3 + fence_indent:
-                logger.warning(
-                    "Detected that the fence on line %d is over indented per the "
-                    "standard. If this is intentional, please file a bug report."
-                    % (index + line_offset + 1)
-                )
-            break
-
-    remaining_lines = remaining_lines[index + 1 :]
-    return fenced_code_block, remaining_lines
+    end = scan_fenced_code_block(LineTable(lines), 0, line_offset)
+    return lines[:end], lines[end:]
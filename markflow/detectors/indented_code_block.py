@@ -12,7 +12,38 @@ Example:
 
 from typing import List, Tuple
 
-from .._utils import get_indent
+from ._lines import BLANK, INDENTED_CODE_BLOCK_START, LineTable
+
+
+def scan_indented_code_block(lines: LineTable, start: int, line_offset: int = 0) -> int:
+    """Find the end of the indented code block starting at `start` if one exists
+
+    Args:
+        lines: The lines to evaluate.
+        start: The index of the line to begin evaluating from.
+        line_offset (optional): The offset into the overall document of the first
+            element of lines. This is used for reporting errors in the original
+            document.
+
+    Returns:
+        The index of the line after the indented code block if one starts at `start`,
+        otherwise `start`.
+    """
+    flags = lines.flags
+    if not flags[start] & INDENTED_CODE_BLOCK_START:
+        return start
+
+    # Find the next line that isn't indented at least 4, excluding trailing blank lines
+    close_index = start + 1
+    for index in range(start + 1, len(lines)):
+        if flags[index] & BLANK:
+            continue
+        elif flags[index] & INDENTED_CODE_BLOCK_START:
+            close_index = index
+        else:
+            break
+
+    return close_index
 
 
 def split_indented_code_block(
@@ -30,25 +61,5 @@ def split_indented_code_block(
         found, otherwise it is an empty list. The second value is the remaining text.
         (If lines does not start with an indented code block, it is the same as lines.)
     """
-    indented_code_block = []
-    remaining_lines = lines
-    indexed_line_generator = enumerate(lines)
-
-    # By default, everything to the end of the document is a block quote
-    index, line = next(indexed_line_generator)
-    close_index = index + 1
-    if line.strip() and get_indent(line) >= 4:
-        # Find the next line that isn't indented at least 4, excluding trailing blank
-        # lines
-        for index, line in indexed_line_generator:
-            if not line.strip():
-                continue
-            elif get_indent(line) >= 4:
-                close_index = index
-            else:
-                break
-
-        indented_code_block = lines[:close_index]
-        remaining_lines = lines[close_index:]
-
-    return indented_code_block, remaining_lines
+    end = scan_indented_code_block(LineTable(lines), 0, line_offset)
+    return lines[:end], lines[end:]
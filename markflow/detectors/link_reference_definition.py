@@ -27,7 +27,7 @@ import logging
 import re
 from typing import List, Tuple
 
-from .._utils import get_indent
+from ._lines import LineTable
 
 logger = logging.getLogger(__name__)
 
@@ -39,35 +39,57 @@ LINK_REFERENCE_DEFINITION_FIRST_ELEMENT_REGEX = re.compile(
 QUOTATION_CHARACTERS = "'\""
 
 
-def split_link_reference_definition(
-    lines: List[str], line_offset: int = 0
-) -> Tuple[List[str], List[str]]:
-    """Split leading link reference definition from lines if one exists
+def scan_link_reference_definition(
+    lines: LineTable, start: int, line_offset: int = 0
+) -> int:
+    """Find the end of the link reference definition starting at `start` if one exists
 
     Args:
         lines: The lines to evaluate.
-        line_offset (optional): The offset into the overall document we are at. This is
-            used for reporting errors in the original document.
+        start: The index of the line to begin evaluating from.
+        line_offset (optional): The offset into the overall document of the first
+            element of lines. This is used for reporting errors in the original
+            document.
 
     Returns:
-        A tuple of two values. The first is the indented code block lines if they were
-        found, otherwise it is an empty list. The second value is the remaining text.
-        (If lines does not start with a link reference definition, it is the same as
-        lines.)
+        The index of the line after the link reference definition if one starts at
+        `start`, otherwise `start`.
+    """
+    return scan_link_reference_definition_to_end(lines, start, line_offset)[0]
+
+
+def scan_link_reference_definition_to_end(
+    lines: LineTable, start: int, line_offset: int = 0
+) -> Tuple[int, bool]:
+    """Find the end of the link reference definition starting at `start` if one exists
+
+    This also reports whether we ran out of lines while looking, in which case more
+    lines could change the answer. That lets incremental parsers know when a result is
+    final.
+
+    Args:
+        lines: The lines to evaluate.
+        start: The index of the line to begin evaluating from.
+        line_offset (optional): The offset into the overall document of the first
+            element of lines. This is used for reporting errors in the original
+            document.
+
+    Returns:
+        A tuple of two values. The first is the index of the line after the link
+        reference definition if one starts at `start`, otherwise `start`. The second is
+        whether we reached the end of lines before we could tell.
     """
-    link_reference_definition: List[str] = []
-    remaining_lines = lines
-    indexed_line_generator = enumerate(lines)
+    indexed_line_generator = ((i, lines[i]) for i in range(start, len(lines)))
 
     index, line = next(indexed_line_generator)
 
-    if get_indent(line) >= 4:
-        return link_reference_definition, remaining_lines
+    if lines.indents[start] >= 4:
+        return start, False
 
     rest_of_line = line.lstrip()
     match = LINK_REFERENCE_DEFINITION_FIRST_ELEMENT_REGEX.match(rest_of_line)
     if not match:
-        return link_reference_definition, remaining_lines
+        return start, False
 
     rest_of_line = rest_of_line[match.end() :]
     url_and_title = rest_of_line.split(maxsplit=1)
@@ -79,6 +101,7 @@ def split_link_reference_definition(
     # character on whatever line it ends on and the first occurence of that character,
     # unescaped.
     is_complete = False
+    ran_out = False
     if len(url_and_title) == 2:
         # The label, URL, and possible title (or part of it) are on this line
         title_text = url_and_title[1]
@@ -89,6 +112,7 @@ def split_link_reference_definition(
             title_text = line
         except StopIteration:
             title_text = ""
+            ran_out = True
         is_complete = True
     else:
         # Just the label was on the first line
@@ -96,6 +120,7 @@ def split_link_reference_definition(
             index, line = next(indexed_line_generator)
         except StopIteration:
             line = ""
+            ran_out = True
         if line.startswith("[") or not line.strip():
             # According to this standard, this is just paragraph text, but this tool
             # should be usable during development.
@@ -103,11 +128,9 @@ def split_link_reference_definition(
             logger.warning(
                 "The text on line %d seems to be a link reference definition, but it "
                 "does not contain a link. We will be treating it as if it were.",
-                index,  # We are just pass where the issue exists
+                index + line_offset,  # We are just pass where the issue exists
             )
-            link_reference_definition = [lines[0]]
-            remaining_lines = lines[1:]
-            return link_reference_definition, remaining_lines
+            return start + 1, ran_out
         elif len(line.split(maxsplit=1)) == 1:
             # Only the URL is on the second line
             index, line = next(indexed_line_generator)
@@ -133,9 +156,29 @@ def split_link_reference_definition(
                     is_complete = True
                     index += 1
                 break
+        else:
+            ran_out = True
 
     if is_complete:
-        link_reference_definition = lines[:index]
-        remaining_lines = lines[index:]
+        return index, ran_out
+    return start, ran_out
+
+
+def split_link_reference_definition(
+    lines: List[str], line_offset: int = 0
+) -> Tuple[List[str], List[str]]:
+    """Split leading link reference definition from lines if one exists
+
+    Args:
+        lines: The lines to evaluate.
+        line_offset (optional): The offset into the overall document we are at. This is
+            used for reporting errors in the original document.
 
-    return link_reference_definition, remaining_lines
+    Returns:
+        A tuple of two values. The first is the indented code block lines if they were
+        found, otherwise it is an empty list. The second value is the remaining text.
+        (If lines does not start with a link reference definition, it is the same as
+        lines.)
+    """
+    end = scan_link_reference_definition(LineTable(lines), 0, line_offset)
+    return lines[:end], lines[end:]
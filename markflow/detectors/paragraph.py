@@ -1,49 +1,6 @@
 from typing import Generator, List, Tuple
 
-from ._lines import is_paragraph_start_line, is_setext_underline
-from .atx_heading import split_atx_heading
-from .blank_line import split_blank_line
-from .block_quote import split_block_quote
-from .bullet_list import split_bullet_list
-from .fenced_code_block import split_fenced_code_block
-from .ordered_list import split_ordered_list
-from .table import split_table
-from .thematic_break import split_thematic_break
-
-
-def _is_paragraph_continuation_text(lines: List[str], line_offset: int = 0) -> bool:
-    """Indicates whether the first line of lines would continue a paragraph
-
-    This ensures that any valid interrupting section of a paragraph could not result in
-    a valid block instead.
-
-    We have a separate definition from the one used in block quote detection to avoid
-    circular imports. That one also gets to skip block quote checking.
-
-    Args:
-        lines: The lines to evaluate.
-        line_offset (optional): The offset into the overall document we are at. This is
-            used for reporting errors in the original document.
-
-    Returns:
-        True if the first line would continue the paragraph. False otherwise.
-    """
-    for splitter in [
-        split_atx_heading,
-        split_blank_line,
-        split_block_quote,
-        split_bullet_list,
-        split_fenced_code_block,
-        split_ordered_list,
-        split_table,
-        split_thematic_break,
-    ]:
-        # ToDo: Disable logging?
-        if splitter(lines, line_offset)[0]:
-            return False
-    if is_setext_underline(lines[0]):
-        return False
-    return True
+from ._lines import HARD_BREAK, PARAGRAPH_START, SETEXT_UNDERLINE, LineTable
 
 
 def list_tail_generator(lines: List[str]) -> Generator[List[str], None, None]:
@@ -70,6 +27,38 @@ def list_tail_generator(lines: List[str]) -> Generator[List[str], None, None]:
         yield lines[i:]
 
 
+def scan_paragraph_ignoring_setext(
+    lines: LineTable, start: int, line_offset: int = 0
+) -> int:
+    """Find the end of the paragraph starting at `start` if one exists
+
+    Unlike scan_paragraph, this does not take into account setext underlining. This is
+    so that both detectors can share a common function.
+
+    Args:
+        lines: The lines to evaluate.
+        start: The index of the line to begin evaluating from.
+        line_offset (optional): The offset into the overall document of the first
+            element of lines. This is used for reporting errors in the original
+            document.
+
+    Returns:
+        The index of the line after the paragraph if one starts at `start`, otherwise
+        `start`.
+    """
+    flags = lines.flags[start]
+    if not flags & PARAGRAPH_START:
+        return start
+
+    # ToDo: This should be handled in `wrap` as a double space is always a newline in
+    #  any section type. Also add indents while you're there.
+    if flags & HARD_BREAK:
+        return start + 1
+
+    # Any line that could interrupt us or has a hard break has been found ahead of time
+    return lines.paragraph_ends[start + 1]
+
+
 def split_paragraph_ignoring_setext(
     lines: List[str], line_offset: int = 0
 ) -> Tuple[List[str], List[str]]:
@@ -88,33 +77,62 @@ def split_paragraph_ignoring_setext(
         found, otherwise it is an empty list. The second value is the remaining text.
         (If lines does not start with a thematic break, it is the same as lines.)
     """
-    paragraph_lines = []
-    remaining_lines = lines
-
-    if is_paragraph_start_line(lines[0]):
-        # ToDo: This should be handled in `wrap` as a double space is always a newline
-        #  in any section type. Also add indents while you're there.
-        if lines[0].endswith("  "):
-            return [lines[0]], lines[1:]
-        paragraph_lines.append(lines[0])
-        tail_lines_generator = list_tail_generator(lines[1:])
-        for tail in tail_lines_generator:
-            if _is_paragraph_continuation_text(
-                tail, line_offset + len(paragraph_lines)
-            ):
-                paragraph_lines.append(tail[0])
-                # ToDo: This should be handled in `wrap` as a double space is always a
-                #  newline in any section type.
-                if tail[0].endswith("  "):
-                    remaining_lines = next(tail_lines_generator)
-                    break
-            else:
-                remaining_lines = tail
-                break
-        else:
-            remaining_lines = []
-
-    return paragraph_lines, remaining_lines
+    end = scan_paragraph_ignoring_setext(LineTable(lines), 0, line_offset)
+    return lines[:end], lines[end:]
+
+
+def scan_paragraph_or_setext_heading(
+    lines: LineTable, start: int, line_offset: int = 0
+) -> Tuple[int, bool]:
+    """Find the end of the paragraph or setext heading starting at `start` if one exists
+
+    Paragraphs and setext headings are only told apart by whether their text is followed
+    by an underline. The parser tries both on the same line, so the result is memoized
+    on `lines` to only classify each run of paragraph text once.
+
+    Args:
+        lines: The lines to evaluate.
+        start: The index of the line to begin evaluating from.
+        line_offset (optional): The offset into the overall document of the first
+            element of lines. This is used for reporting errors in the original
+            document.
+
+    Returns:
+        A tuple of two values. The first is the index of the line after the paragraph
+        or setext heading if one starts at `start`, otherwise `start`. The second is
+        whether it is a setext heading.
+    """
+    try:
+        return lines.paragraph_scans[start]
+    except KeyError:
+        pass
+
+    end = scan_paragraph_ignoring_setext(lines, start, line_offset)
+    is_setext_heading = start < end < len(lines) and bool(
+        lines.flags[end] & SETEXT_UNDERLINE
+    )
+    if is_setext_heading:
+        end += 1
+    lines.paragraph_scans[start] = (end, is_setext_heading)
+    return end, is_setext_heading
+
+
+def scan_paragraph(lines: LineTable, start: int, line_offset: int = 0) -> int:
+    """Find the end of the paragraph starting at `start` if one exists
+
+    Args:
+        lines: The lines to evaluate.
+        start: The index of the line to begin evaluating from.
+        line_offset (optional): The offset into the overall document of the first
+            element of lines. This is used for reporting errors in the original
+            document.
+
+    Returns:
+        The index of the line after the paragraph if one starts at `start`, otherwise
+        `start`.
+    """
+    end, is_setext_heading = scan_paragraph_or_setext_heading(lines, start, line_offset)
+    return start if is_setext_heading else end
 
 
 def split_paragraph(
@@ -132,10 +150,5 @@ def split_paragraph(
         found, otherwise it is an empty list. The second value is the remaining text.
         (If lines does not start with a thematic break, it is the same as lines.)
     """
-    potential_paragraph, remaining_lines = split_paragraph_ignoring_setext(
-        lines, line_offset
-    )
-    if not remaining_lines or not is_setext_underline(remaining_lines[0]):
-        return potential_paragraph, remaining_lines
-    else:
-        return [], lines
+    end = scan_paragraph(LineTable(lines), 0, line_offset)
+    return lines[:end], lines[end:]
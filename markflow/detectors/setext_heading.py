@@ -19,8 +19,26 @@ Examples:
 
 from typing import List, Tuple
 
-from ._lines import is_setext_underline
-from .paragraph import split_paragraph_ignoring_setext
+from ._lines import LineTable
+from .paragraph import scan_paragraph_or_setext_heading
+
+
+def scan_setext_heading(lines: LineTable, start: int, line_offset: int = 0) -> int:
+    """Find the end of the setext heading starting at `start` if one exists
+
+    Args:
+        lines: The lines to evaluate.
+        start: The index of the line to begin evaluating from.
+        line_offset (optional): The offset into the overall document of the first
+            element of lines. This is used for reporting errors in the original
+            document.
+
+    Returns:
+        The index of the line after the setext heading if one starts at `start`,
+        otherwise `start`.
+    """
+    end, is_setext_heading = scan_paragraph_or_setext_heading(lines, start, line_offset)
+    return end if is_setext_heading else start
 
 
 def split_setext_heading(
@@ -38,7 +56,5 @@ def split_setext_heading(
         otherwise it is an empty list. The second value is the remaining text. (If lines
         does not start with a thematic break, it is the same as lines.)
     """
-    paragraph, remaining_lines = split_paragraph_ignoring_setext(lines, line_offset)
-    if paragraph and remaining_lines and is_setext_underline(remaining_lines[0]):
-        return paragraph + [remaining_lines[0]], remaining_lines[1:]
-    return [], lines
+    end = scan_setext_heading(LineTable(lines), 0, line_offset)
+    return lines[:end], lines[end:]
@@ -1,5 +1,7 @@
 from typing import List, Tuple
 
+from ._lines import TABLE_START, LineTable
+
 
 def table_started(line: str, index: int, lines: List[str]) -> bool:
     """DEPRECATED"""
@@ -11,19 +13,17 @@ def table_ended(line: str, index: int, lines: List[str]) -> bool:
     return not table_started(line, index, lines)
 
 
+def scan_table(lines: LineTable, start: int, line_offset: int = 0) -> int:
+    flags = lines.flags
+    if not flags[start] & TABLE_START:
+        return start
+
+    for index in range(start + 1, len(lines)):
+        if not flags[index] & TABLE_START:
+            return index
+    return len(lines)
+
+
 def split_table(lines: List[str], line_offset: int = 0) -> Tuple[List[str], List[str]]:
-    table = []
-    remaining_lines = lines
-
-    index = 0
-    if table_started(lines[index], index, lines):
-        table.append(lines[index])
-        for index, line in enumerate(lines[1:], start=index + 1):
-            if table_ended(line, index, lines):
-                break
-            table.append(line)
-        else:
-            index += 1
-    remaining_lines = lines[index:]
-
-    return table, remaining_lines
+    end = scan_table(LineTable(lines), 0, line_offset)
+    return lines[:end], lines[end:]
@@ -17,11 +17,31 @@ Examples:
 
 from typing import List, Tuple
 
-from ._lines import is_thematic_break_line
+from ._lines import THEMATIC_BREAK, LineTable
 
 SEPARATOR_SYMBOLS = ["*", "_", "-"]
 
 
+def scan_thematic_break(lines: LineTable, start: int, line_offset: int = 0) -> int:
+    """Find the end of the thematic break starting at `start` if one exists
+
+    Args:
+        lines: The lines to evaluate.
+        start: The index of the line to begin evaluating from.
+        line_offset (optional): The offset into the overall document of the first
+            element of lines. This is used for reporting errors in the original
+            document.
+
+    Returns:
+        The index of the line after the thematic break if one starts at `start`,
+        otherwise `start`.
+    """
+    if lines.flags[start] & THEMATIC_BREAK:
+        return start + 1
+    else:
+        return start
+
+
 def split_thematic_break(
     lines: List[str], line_offset: int = 0
 ) -> Tuple[List[str], List[str]]:
@@ -37,7 +57,5 @@ def split_thematic_break(
         found, otherwise it is an empty list. The second value is the remaining text.
         (If lines does not start with a thematic break, it is the same as lines.)
     """
-    if is_thematic_break_line(lines[0]):
-        return [lines[0]], lines[1:]
-    else:
-        return [], lines
+    end = scan_thematic_break(LineTable(lines), 0, line_offset)
+    return lines[:end], lines[end:]
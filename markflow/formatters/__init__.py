@@ -7,6 +7,7 @@ from .fenced_code_block import *
 from .indented_code_block import *
 from .link_reference_definition import *
 from .lists import *
+from .output import *
 from .paragraph import *
 from .setext_heading import *
 from .table import *
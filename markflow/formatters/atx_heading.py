@@ -54,6 +54,9 @@ class MarkdownATXHeading(MarkdownSection):
             )
         self.lines.append(line)
 
+    def is_canonical(self, width: Number = 88) -> bool:
+        return self.lines[0] == "#" * self.depth + " " + self.content
+
     def reformatted(self, width: Number = 88) -> str:
         # TODO: This prints out twice. We probably need a first pass step that calls out
         #  errors we will be fixing to suppress extra statements from reprocessing the
@@ -1,21 +1,66 @@
 import abc
-from typing import List, Optional
+from typing import TYPE_CHECKING, Iterator, List, Optional, Tuple
 
 from ..typing import Number
+from .output import MarkdownOutput
+
+if TYPE_CHECKING:
+    from ..parser import MarkdownSectionNode
 
 __all__ = ["MarkdownSection"]
 
+# The sections inside of a container and the width to reformat them to
+Container = Tuple[List["MarkdownSectionNode"], Number]
+
 
 class MarkdownSection:
-    def __init__(self, line_index: int, lines: Optional[List[str]] = None):
+    def __init__(
+        self,
+        line_index: int,
+        lines: Optional[List[str]] = None,
+        contents: Optional[List[List["MarkdownSectionNode"]]] = None,
+    ):
         self.line_index = line_index
         if lines is None:
             lines = []
         self.lines: List[str] = lines
+        # The already parsed sections of any containers this section has (see
+        # `MarkdownSectionNode.contents`)
+        self.contents = contents
 
     @abc.abstractmethod
     def reformatted(self, width: Number = 88) -> str:
         """Reformat the section based on publicized rules"""
 
+    def is_canonical(self, width: Number = 88) -> bool:
+        """Check whether the section is already formatted without reformatting it
+
+        This is meant to be much cheaper than `reformatted`, so it only has to be right
+        when it says a section is formatted. If it is, `reformatted` would return the
+        section's lines unchanged. Sections don't know whether they are by default.
+        """
+        return False
+
+    def write(self, output: MarkdownOutput, width: Number = 88) -> Iterator[Container]:
+        """Write the reformatted section to output
+
+        Sections that contain other sections push the prefix for each of their
+        containers onto output and yield the container's sections for the caller to
+        write before they are resumed. Everything else is written all at once.
+
+        Args:
+            output: Where to write the reformatted section.
+            width: The maximum line length.
+
+        Returns:
+            An iterator of the sections of each container along with the width to
+            reformat them to.
+        """
+        if self.is_canonical(width):
+            output.write_lines(self.lines)
+        else:
+            output.write(self.reformatted(width))
+        return iter(())
+
     def __repr__(self) -> str:
         raise NotImplementedError("MarkdownSections must implement `__repr__`.")
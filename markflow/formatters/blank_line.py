@@ -30,6 +30,9 @@ class MarkdownBlankLine(MarkdownSection):
             )
         self.lines.append(line)
 
+    def is_canonical(self, width: Number = 88) -> bool:
+        return self.lines == [""]
+
     def reformatted(self, width: Number = 88) -> str:
         # The new line will be added on join
         return ""
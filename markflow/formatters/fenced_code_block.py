@@ -68,6 +68,15 @@ class MarkdownFencedCodeBlock(MarkdownSection):
     def append(self, line: str) -> None:
         self.lines.append(line)
 
+    def is_canonical(self, width: Number = 88) -> bool:
+        fence = self.fence_char * self.fence_count
+        return (
+            len(self.lines) > 1
+            and self.lines[0] == fence + self.language
+            and self.lines[-1] == fence
+            and all(line == line.rstrip() for line in self.lines[1:-1])
+        )
+
     def reformatted(self, width: Number = 88) -> str:
         fence = self.fence_char * self.fence_count
         new_lines = [fence + self.language] + self.lines[1:-1] + [fence]
@@ -37,6 +37,9 @@ class MarkdownIndentedCodeBlock(MarkdownSection):
     def append(self, line: str) -> None:
         self.lines.append(line)
 
+    def is_canonical(self, width: Number = 88) -> bool:
+        return all(line == line.rstrip() for line in self.lines)
+
     def reformatted(self, width: Number = 88) -> str:
         return "\n".join([line.rstrip() for line in self.lines])
 
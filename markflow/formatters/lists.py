@@ -1,106 +1,38 @@
 # 1. Split the list into entries
 # 2. Dedent those entries
 # 3. Determine indentation level
-# 4. Pass each entry to the formatter
-# 5. Combine the resulting output
-import re
+# 4. Write each entry's sections to the output under the entry's marker
 import string
-from typing import List
+from typing import Iterator, List
 
-from .._utils import get_indent, redirect_info_logs_to_debug, truncate_str
+from .._utils import truncate_str
+from ..detectors._list_entries import list_entries
+from ..parser import MarkdownSectionNode, parse_markdown_tree
 from ..typing import Number
-from .base import MarkdownSection
-
-MARKER_REGEX = re.compile(
-    r"^\s*"  # Leading spaces are allowed and often expected
-    r"("
-    r"\*|"  # Asterisk list marker
-    r"-|"  # Dash list marker
-    r"\+|"  # Plus list marker
-    r"[0-9]+\."  # Numeric list marker
-    r")"
-    r"($| )"  # End of line or space
-)
-CODE_BLOCK_FENCES = "`~"
-REPR_CONTENT_LEN = 20
-
-
-def _reformat_markdown(lines: List[str], width: Number) -> str:
-    # Prevents issues from circular imports. Since this module would already be loaded
-    # whenever we call this function, we know it's cached.
-    from ..reformat_markdown import _reformat_markdown_text
-
-    with redirect_info_logs_to_debug():
-        text = _reformat_markdown_text("\n".join(lines) + "\n", width)
+from .base import Container, MarkdownSection
+from .output import MarkdownOutput
 
-    return text
+REPR_CONTENT_LEN = 20
 
 
-def _list_marker_end_pos(line: str) -> int:
-    """Return the number of characters before the end of a list marker
+def _entry_contents(section: MarkdownSection) -> List[List[MarkdownSectionNode]]:
+    if section.contents is not None:
+        return section.contents
 
-    Note: This does not include the trailing space in the count.
+    contents: List[List[MarkdownSectionNode]] = []
+    line_index = section.line_index
+    for entry in list_entries(section.lines):
+        contents.append(parse_markdown_tree(entry, line_index))
+        line_index += len(entry)
+    return contents
 
-    Args:
-        line: The lines to evaluate.
 
-    Returns:
-        True if the first line would continue the paragraph. False otherwise.
-    """
+def _reformat_section(section: MarkdownSection, width: Number) -> str:
+    # Prevents issues from circular imports. Since this module would already be loaded
+    # whenever we call this function, we know it's cached.
+    from ..reformat_markdown import _reformat_section
 
-    match = MARKER_REGEX.match(line)
-    if match is None:
-        raise RuntimeError(
-            "Attempted to find the end of a list marker on a line that doesn't have "
-            "one. Please open a bug report or email jholland@duosecurity.com."
-        )
-    return match.end(1)
-
-
-def _split_list(lines: List[str]) -> List[List[str]]:
-    in_code_block = False
-    code_block_end = ""
-
-    list_entries: List[List[str]] = []
-    max_indent = _list_marker_end_pos(lines[0])
-    for line in lines:
-        if any(line.lstrip().startswith(f * 3) for f in CODE_BLOCK_FENCES):
-            code_block_symbol = line.lstrip()[0]
-            code_block_marker_length = len(line.lstrip()) - len(
-                line.lstrip(code_block_symbol)
-            )
-            code_block_marker = code_block_marker_length * code_block_symbol
-            if in_code_block:
-                if code_block_end == code_block_marker:
-                    in_code_block = False
-            else:
-                in_code_block = True
-                code_block_end = code_block_marker
-
-        if MARKER_REGEX.match(line) and not in_code_block:
-            line_indent = get_indent(line)
-            list_indent = _list_marker_end_pos(line)
-            if line_indent <= max_indent:
-                max_indent = list_indent
-                list_entries.append([line])
-            else:
-                list_entries[-1].append(line)
-        else:
-            list_entries[-1].append(line)
-    return list_entries
-
-
-def _dedent_entries(list_entries: List[List[str]]) -> List[List[str]]:
-    # ToDo: Should we handle missing spaces? I don't think so. Think:
-    #  *read*
-    dedented_entries: List[List[str]] = []
-    for entry in list_entries:
-        indent = _list_marker_end_pos(entry[0]) + 1
-        dedented_entries.append([entry[0][indent:]])
-        for line in entry[1:]:
-            dedented_entry = line[:indent].lstrip() + line[indent:]
-            dedented_entries[-1].append(dedented_entry)
-    return dedented_entries
+    return _reformat_section(section, width)
 
 
 class MarkdownBulletList(MarkdownSection):
@@ -115,26 +47,16 @@ class MarkdownBulletList(MarkdownSection):
     def append(self, line: str) -> None:
         self.lines.append(line)
 
-    def reformatted(self, width: Number = 88) -> str:
-        list_entries = _split_list(self.lines)
+    def write(self, output: MarkdownOutput, width: Number = 88) -> Iterator[Container]:
         # '* '
         toplevel_indent = 2
-        dedented_entries = _dedent_entries(list_entries)
-
-        reformatted_entries: List[str] = []
-        for entry in dedented_entries:
-            with redirect_info_logs_to_debug():
-                reformatted_entry = _reformat_markdown(
-                    entry, width - toplevel_indent
-                ).rstrip("\n")
-            reformatted_entry = (
-                self.marker
-                + " "
-                + ("\n" + toplevel_indent * " ").join(reformatted_entry.split("\n"))
-            )
-            reformatted_entries.append(reformatted_entry)
-
-        return "\n".join(reformatted_entries)
+        for entry in _entry_contents(self):
+            output.push_list_entry(self.marker + " ", toplevel_indent)
+            yield entry, width - toplevel_indent
+            output.pop()
+
+    def reformatted(self, width: Number = 88) -> str:
+        return _reformat_section(self, width)
 
     def __repr__(self) -> str:
         first_line = self.first_line
@@ -161,26 +83,17 @@ class MarkdownOrderedList(MarkdownSection):
     def first_line(self) -> str:
         return self.lines[0]
 
-    def reformatted(self, width: Number = 88) -> str:
-        list_entries = _split_list(self.lines)
+    def write(self, output: MarkdownOutput, width: Number = 88) -> Iterator[Container]:
+        entries = _entry_contents(self)
         # '99. '
-        toplevel_indent = len(str(self.first_number + len(list_entries) - 1)) + 2
-        dedented_entries = _dedent_entries(list_entries)
-
-        reformatted_entries: List[str] = []
-        for entry_number, entry in enumerate(dedented_entries, start=self.first_number):
-            with redirect_info_logs_to_debug():
-                reformatted_entry = _reformat_markdown(
-                    entry, width - toplevel_indent
-                ).rstrip("\n")
-            reformatted_entry = (
-                str(entry_number)
-                + ". "
-                + ("\n" + toplevel_indent * " ").join(reformatted_entry.split("\n"))
-            )
-            reformatted_entries.append(reformatted_entry)
-
-        return "\n".join(reformatted_entries)
+        toplevel_indent = len(str(self.first_number + len(entries) - 1)) + 2
+        for entry_number, entry in enumerate(entries, start=self.first_number):
+            output.push_list_entry(str(entry_number) + ". ", toplevel_indent)
+            yield entry, width - toplevel_indent
+            output.pop()
+
+    def reformatted(self, width: Number = 88) -> str:
+        return _reformat_section(self, width)
 
     def __repr__(self) -> str:
         first_line = self.first_line
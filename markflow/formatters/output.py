@@ -0,0 +1,128 @@
+"""
+Collecting reformatted lines
+
+Block quotes and lists don't reformat their content themselves. Instead, they push a
+prefix onto the output for the lines of each of their containers and have the sections
+inside of them written into the same output. Every line goes through the prefixes of the
+containers it is in as it is written, so nested text is never reassembled by each of
+the sections containing it.
+"""
+import abc
+from typing import List
+
+__all__ = ["MarkdownOutput"]
+
+
+class _Prefix:
+    @abc.abstractmethod
+    def apply(self, lines: List[str]) -> List[str]:
+        """Prefix lines written inside of the container"""
+
+    def close(self) -> List[str]:
+        """Return any lines still held back once the container has been written"""
+        return []
+
+
+class _BlockQuotePrefix(_Prefix):
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+
+    def apply(self, lines: List[str]) -> List[str]:
+        prefix = self.prefix
+        return [(prefix + line).strip() for line in lines]
+
+
+class _ListEntryPrefix(_Prefix):
+    """Prefixes the first line of an entry with its marker and indents the rest
+
+    Empty lines at the end of an entry are dropped, so they are held back until we know
+    more content follows them.
+    """
+
+    def __init__(self, marker: str, indent: int):
+        self.marker = marker
+        self.indent = " " * indent
+        self.started = False
+        self.held_blank_lines = 0
+
+    def apply(self, lines: List[str]) -> List[str]:
+        prefixed_lines: List[str] = []
+        for line in lines:
+            if not line:
+                self.held_blank_lines += 1
+                continue
+            for _ in range(self.held_blank_lines):
+                prefixed_lines.append(self._prefixed(""))
+            self.held_blank_lines = 0
+            prefixed_lines.append(self._prefixed(line))
+        return prefixed_lines
+
+    def close(self) -> List[str]:
+        # Even an empty entry gets its marker
+        if not self.started:
+            return [self._prefixed("")]
+        return []
+
+    def _prefixed(self, line: str) -> str:
+        if self.started:
+            return self.indent + line
+        self.started = True
+        return self.marker + line
+
+
+class MarkdownOutput:
+    """The lines of a reformatted document
+
+    Attributes:
+        lines: The lines written so far with the prefixes of the containers they are in.
+    """
+
+    def __init__(self) -> None:
+        self.lines: List[str] = []
+        self._prefixes: List[_Prefix] = []
+
+    def write(self, text: str) -> None:
+        """Add the text of a reformatted section
+
+        Args:
+            text: The reformatted section. It is split into lines on new lines.
+        """
+        self._add(text.split("\n"))
+
+    def write_lines(self, lines: List[str]) -> None:
+        """Add the lines of a section that is already formatted
+
+        Args:
+            lines: The lines of the section, without line breaks.
+        """
+        self._add(list(lines))
+
+    def push_block_quote(self, prefix: str) -> None:
+        """Quote the lines written until the matching `pop`
+
+        Args:
+            prefix: The block quote marker (including any space after it) to put before
+                each line. Whitespace is stripped from the ends of the quoted lines.
+        """
+        self._prefixes.append(_BlockQuotePrefix(prefix))
+
+    def push_list_entry(self, marker: str, indent: int) -> None:
+        """Make the lines written until the matching `pop` a list entry
+
+        Args:
+            marker: The list marker (including the space after it) to put before the
+                first line of the entry.
+            indent: How far to indent the rest of the lines of the entry.
+        """
+        self._prefixes.append(_ListEntryPrefix(marker, indent))
+
+    def pop(self) -> None:
+        """End the container most recently pushed"""
+        self._add(self._prefixes.pop().close())
+
+    def _add(self, lines: List[str]) -> None:
+        for prefix in reversed(self._prefixes):
+            if not lines:
+                return
+            lines = prefix.apply(lines)
+        self.lines.extend(lines)
@@ -1,5 +1,5 @@
 from .._utils import truncate_str
-from .._utils.textwrap import wrap
+from .._utils.textwrap import is_wrapped, wrap
 from ..typing import Number
 from .base import MarkdownSection
 
@@ -17,6 +17,9 @@ class MarkdownParagraph(MarkdownSection):
     def append(self, line: str) -> None:
         self.lines.append(line)
 
+    def is_canonical(self, width: Number = 88) -> bool:
+        return is_wrapped(self.lines, width)
+
     def reformatted(self, width: Number = 88) -> str:
         text = wrap(self.content, width)
         if self.lines[-1].endswith("  "):
@@ -25,7 +25,7 @@ https://spec.commonmark.org/0.29/#setext-headings
 """
 
 from .._utils import truncate_str
-from .._utils.textwrap import wrap
+from .._utils.textwrap import is_wrapped, wrap
 from ..typing import Number
 from .base import MarkdownSection
 
@@ -54,6 +54,12 @@ class MarkdownSetextHeading(MarkdownSection):
     def append(self, line: str) -> None:
         self.lines.append(line)
 
+    def is_canonical(self, width: Number = 88) -> bool:
+        heading_lines = self.lines[:-1]
+        return is_wrapped(heading_lines, width) and self.lines[-1] == self.char * max(
+            len(line) for line in heading_lines
+        )
+
     def reformatted(self, width: Number = 88) -> str:
         heading_str = wrap(self.content, width)
         heading_len = max(len(line) for line in heading_str.splitlines())
@@ -35,10 +35,75 @@ def right_align(text: str, width: int) -> str:
     return f"{' ' * padding}{text}"
 
 
+def _alignment(divider: str) -> Alignment:
+    divider = divider.strip()
+    if divider.startswith(":") and divider.endswith(":"):
+        return Alignment.CENTER
+    elif divider.startswith(":"):
+        return Alignment.LEFT
+    elif divider.endswith(":"):
+        return Alignment.RIGHT
+    return Alignment.NONE
+
+
+def _divider(width: int, alignment: Alignment) -> str:
+    divider = "-" * width
+    if alignment == Alignment.CENTER:
+        return f":{divider}:"
+    elif alignment == Alignment.LEFT:
+        return f":{divider}-"
+    elif alignment == Alignment.RIGHT:
+        return f"-{divider}:"
+    return f"-{divider}-"
+
+
+def _cell(text: str, width: int, alignment: Alignment, header: bool) -> str:
+    # Headers are centered unless they are aligned otherwise
+    if alignment == Alignment.CENTER or (alignment == Alignment.NONE and header):
+        return f" {center_align(text, width)} "
+    elif alignment == Alignment.RIGHT:
+        return f" {right_align(text, width)} "
+    return f" {left_align(text, width)} "
+
+
 class MarkdownTable(MarkdownSection):
     def append(self, line: str) -> None:
         self.lines.append(line)
 
+    def is_canonical(self, width: Number = 88) -> bool:
+        # Escaped dividers would have to be split the same way `reformatted` does
+        if any("\\" in line for line in self.lines):
+            return False
+
+        dividers = self.lines[1].split("|")
+        if len(dividers) < 3 or dividers[0] or dividers[-1]:
+            return False
+        column_widths = []
+        column_alignments = []
+        for divider in dividers[1:-1]:
+            alignment = _alignment(divider)
+            if len(divider) < 2 or divider != _divider(len(divider) - 2, alignment):
+                return False
+            column_widths.append(len(divider) - 2)
+            column_alignments.append(alignment)
+
+        # Every column is padded to its widest cell
+        widest = [0 for _ in column_widths]
+        for i, line in enumerate(self.lines):
+            if i == 1:
+                continue
+            cells = line.split("|")
+            if len(cells) != len(dividers) or cells[0] or cells[-1]:
+                return False
+            for j, (cell, column_width, alignment) in enumerate(
+                zip(cells[1:-1], column_widths, column_alignments)
+            ):
+                text = cell.strip()
+                if cell != _cell(text, column_width, alignment, header=i == 0):
+                    return False
+                widest[j] = max(widest[j], len(text))
+        return widest == column_widths
+
     def reformatted(self, width: Number = 88) -> str:
         column_widths = []
         for i, line in enumerate(self.lines):
@@ -49,17 +114,9 @@ class MarkdownTable(MarkdownSection):
             cols = [col.strip() for col in cols]
             column_widths.append(tuple(len(col) for col in cols))
 
-        column_alignments = []
-        for divider in self.lines[1].strip()[1:-1].split("|"):
-            divider = divider.strip()
-            if divider.startswith(":") and divider.endswith(":"):
-                column_alignments.append(Alignment.CENTER)
-            elif divider.startswith(":"):
-                column_alignments.append(Alignment.LEFT)
-            elif divider.endswith(":"):
-                column_alignments.append(Alignment.RIGHT)
-            else:
-                column_alignments.append(Alignment.NONE)
+        column_alignments = [
+            _alignment(divider) for divider in self.lines[1].strip()[1:-1].split("|")
+        ]
 
         header_column_count = len(column_widths[0])
         for i, column_width in enumerate(column_widths[1:], start=2):
@@ -78,50 +135,29 @@ class MarkdownTable(MarkdownSection):
         new_lines = []
         # First line is headers. We'll center them.
         headers = COLUMN_DIVIDER_REGEX.split(self.lines[0])[1:-1]
-        header_strings = []
-        for header, width, alignment in zip(
-            headers, new_column_widths, column_alignments
-        ):
-            header = header.strip()
-            if alignment == Alignment.CENTER:
-                header_strings.append(f" {center_align(header, width)} ")
-            elif alignment == Alignment.LEFT:
-                header_strings.append(f" {left_align(header, width)} ")
-            elif alignment == Alignment.RIGHT:
-                header_strings.append(f" {right_align(header, width)} ")
-            else:
-                header_strings.append(f" {center_align(header, width)} ")
+        header_strings = [
+            _cell(header.strip(), width, alignment, header=True)
+            for header, width, alignment in zip(
+                headers, new_column_widths, column_alignments
+            )
+        ]
         new_lines.append("|" + "|".join(header_strings) + "|")
 
         # Second line is the dividers.
-        dashes = []
-        for width, alignment in zip(new_column_widths, column_alignments):
-            divider = "-" * width
-            if alignment == Alignment.CENTER:
-                dashes.append(f":{divider}:")
-            elif alignment == Alignment.LEFT:
-                dashes.append(f":{divider}-")
-            elif alignment == Alignment.RIGHT:
-                dashes.append(f"-{divider}:")
-            else:
-                dashes.append(f"-{divider}-")
+        dashes = [
+            _divider(width, alignment)
+            for width, alignment in zip(new_column_widths, column_alignments)
+        ]
         new_lines.append(f"|{'|'.join(dashes)}|")
 
         # The rest are individual entries.
         for line in self.lines[2:]:
-            columns = []
-            for column, width, alignment in zip(
-                line.split("|")[1:-1], new_column_widths, column_alignments
-            ):
-                column = column.strip()
-                if alignment == Alignment.CENTER:
-                    columns.append(f" {center_align(column, width)} ")
-                elif alignment == Alignment.LEFT:
-                    columns.append(f" {left_align(column, width)} ")
-                elif alignment == Alignment.RIGHT:
-                    columns.append(f" {right_align(column, width)} ")
-                else:
-                    columns.append(f" {left_align(column, width)} ")
+            columns = [
+                _cell(column.strip(), width, alignment, header=False)
+                for column, width, alignment in zip(
+                    line.split("|")[1:-1], new_column_widths, column_alignments
+                )
+            ]
             new_lines.append(f"|{'|'.join(columns)}|")
 
         return "\n".join(new_lines)
@@ -34,6 +34,9 @@ class MarkdownThematicBreak(MarkdownSection):
             raise RuntimeError("Thematic breaks cannot span multiple lines")
         self.lines.append(line)
 
+    def is_canonical(self, width: Number = 88) -> bool:
+        return self.lines[0] == self.reformatted(width)
+
     def reformatted(self, width: Number = 88) -> str:
         if isinstance(width, float):
             if width == math.inf:
@@ -1,8 +1,24 @@
+import copy
 import logging
+from collections import deque
 from enum import Enum
-from typing import List, Tuple
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Tuple
 
+from ._utils import redirect_info_logs_to_debug
 from .detectors import (
+    scan_atx_heading,
+    scan_blank_line,
+    scan_block_quote,
+    scan_bullet_list,
+    scan_fenced_code_block,
+    scan_indented_code_block,
+    scan_link_reference_definition,
+    scan_link_reference_definition_to_end,
+    scan_ordered_list,
+    scan_paragraph,
+    scan_setext_heading,
+    scan_table,
+    scan_thematic_break,
     split_atx_heading,
     split_blank_line,
     split_block_quote,
@@ -16,7 +32,24 @@ from .detectors import (
     split_table,
     split_thematic_break,
 )
-from .typing import SplitFunc
+from .detectors._lines import (
+    BLANK,
+    CLOSING_FENCE,
+    EXPLICIT_BLOCK_QUOTE,
+    HARD_BREAK,
+    INDENTED_CODE_BLOCK_START,
+    PARAGRAPH_INTERRUPTION,
+    PARAGRAPH_START,
+    SETEXT_UNDERLINE,
+    TABLE_START,
+    THEMATIC_BREAK,
+    LexedLine,
+    LineTable,
+    lex_line,
+)
+from .detectors._list_entries import list_entries
+from .detectors.block_quote import LEADING_QUOTE_MARKER, block_quote_content
+from .typing import ScanFunc, SplitFunc
 
 logger = logging.getLogger(__name__)
 
@@ -37,6 +70,98 @@ class MarkdownSectionEnum(Enum):
     THEMATIC_BREAK = "Thematic Break"
 
 
+SCANNERS: List[Tuple[MarkdownSectionEnum, ScanFunc]] = [
+    (MarkdownSectionEnum.ATX_HEADING, scan_atx_heading),
+    (MarkdownSectionEnum.BLANK_LINE, scan_blank_line),
+    (MarkdownSectionEnum.BLOCK_QUOTE, scan_block_quote),
+    (MarkdownSectionEnum.BULLET_LIST, scan_bullet_list),
+    (MarkdownSectionEnum.FENCED_CODE_BLOCK, scan_fenced_code_block),
+    (MarkdownSectionEnum.INDENTED_CODE_BLOCK, scan_indented_code_block),
+    (MarkdownSectionEnum.LINK_REFERENCE_DEFINITION, scan_link_reference_definition),
+    (MarkdownSectionEnum.ORDERED_LIST, scan_ordered_list),
+    (MarkdownSectionEnum.PARAGRAPH, scan_paragraph),
+    (MarkdownSectionEnum.SETEXT_HEADING, scan_setext_heading),
+    (MarkdownSectionEnum.TABLE, scan_table),
+    (MarkdownSectionEnum.THEMATIC_BREAK, scan_thematic_break),
+]
+
+
+def _scanners_for(
+    *section_types: MarkdownSectionEnum,
+) -> List[Tuple[MarkdownSectionEnum, ScanFunc]]:
+    return [
+        (section_type, scanner)
+        for section_type, scanner in SCANNERS
+        if section_type in section_types
+    ]
+
+
+# The scanners that could possibly match a line keyed by the line's first
+# non-whitespace character. Blank lines are keyed by a single space, lines indented
+# enough to be code by four spaces, and lines starting with a letter by "a". Each entry
+# keeps `SCANNERS` order so the first match is the same as trying every scanner. Lines
+# starting with anything else are ambiguous and fall back to trying all of `SCANNERS`.
+_PARAGRAPH_TYPES = (MarkdownSectionEnum.PARAGRAPH, MarkdownSectionEnum.SETEXT_HEADING)
+SCANNER_DISPATCH: Dict[str, List[Tuple[MarkdownSectionEnum, ScanFunc]]] = {
+    " ": _scanners_for(MarkdownSectionEnum.BLANK_LINE),
+    "    ": _scanners_for(
+        MarkdownSectionEnum.FENCED_CODE_BLOCK, MarkdownSectionEnum.INDENTED_CODE_BLOCK
+    ),
+    "a": _scanners_for(*_PARAGRAPH_TYPES),
+    "#": _scanners_for(MarkdownSectionEnum.ATX_HEADING),
+    ">": _scanners_for(MarkdownSectionEnum.BLOCK_QUOTE),
+    "|": _scanners_for(MarkdownSectionEnum.TABLE),
+    "[": _scanners_for(
+        MarkdownSectionEnum.LINK_REFERENCE_DEFINITION, *_PARAGRAPH_TYPES
+    ),
+    "+": _scanners_for(MarkdownSectionEnum.BULLET_LIST, *_PARAGRAPH_TYPES),
+    "_": _scanners_for(MarkdownSectionEnum.THEMATIC_BREAK, *_PARAGRAPH_TYPES),
+}
+for _char in "*-":
+    SCANNER_DISPATCH[_char] = _scanners_for(
+        MarkdownSectionEnum.BULLET_LIST,
+        MarkdownSectionEnum.THEMATIC_BREAK,
+        *_PARAGRAPH_TYPES,
+    )
+for _char in "`~":
+    SCANNER_DISPATCH[_char] = _scanners_for(
+        MarkdownSectionEnum.FENCED_CODE_BLOCK, *_PARAGRAPH_TYPES
+    )
+for _char in "0123456789":
+    SCANNER_DISPATCH[_char] = _scanners_for(
+        MarkdownSectionEnum.ORDERED_LIST, *_PARAGRAPH_TYPES
+    )
+
+
+def _dispatch_key(table: LineTable, index: int) -> str:
+    flags = table.flags[index]
+    if flags & BLANK:
+        return " "
+    elif flags & INDENTED_CODE_BLOCK_START:
+        return "    "
+    first_char = table.first_chars[index]
+    if first_char.isalpha():
+        return "a"
+    return first_char
+
+
+def _skipped_section_types(
+    candidates: List[Tuple[MarkdownSectionEnum, ScanFunc]],
+    matched_type: MarkdownSectionEnum,
+) -> List[str]:
+    """The section types trying all of `SCANNERS` would have checked before a match"""
+    candidate_types = [section_type for section_type, _ in candidates]
+    skipped = []
+    for section_type, _ in SCANNERS:
+        if section_type == matched_type:
+            break
+        if section_type not in candidate_types:
+            skipped.append(section_type.value)
+    return skipped
+
+
+# Retained for callers of the original list based splitting functions. The parser
+# itself only uses `SCANNERS`.
 SPLITTERS: List[Tuple[MarkdownSectionEnum, SplitFunc]] = [
     (MarkdownSectionEnum.ATX_HEADING, split_atx_heading),
     (MarkdownSectionEnum.BLANK_LINE, split_blank_line),
@@ -53,31 +178,536 @@ SPLITTERS: List[Tuple[MarkdownSectionEnum, SplitFunc]] = [
 ]
 
 
-def parse_markdown(lines: List[str]) -> List[Tuple[MarkdownSectionEnum, List[str]]]:
-    sections: List[Tuple[MarkdownSectionEnum, List[str]]] = []
-    remaining_lines = lines
-    current_line = 1
-
-    while remaining_lines:
-        for section_type, splitter in SPLITTERS:
-            section_content, remaining_lines = splitter(remaining_lines)
-            if section_content:
-                content_length = len(section_content)
-                if content_length > 1:
-                    log_text = (
-                        f"Lines {current_line}-{current_line + content_length - 1}"
-                    )
+def parse_markdown_spans(
+    lines: List[str], line_offset: int = 0
+) -> List[Tuple[MarkdownSectionEnum, int, int]]:
+    """Split lines into sections without copying them
+
+    Only the scanners that could match a line's first character are tried (see
+    `SCANNER_DISPATCH`). With debug logging enabled, the scanners that were skipped
+    because of this are reported alongside each section.
+
+    Args:
+        lines: The lines of the document to parse.
+        line_offset (optional): The offset into the overall document of the first
+            element of lines. This is used for reporting errors in the original
+            document.
+
+    Returns:
+        A list of (section type, start, end) tuples. `lines[start:end]` is the content
+        of each section.
+    """
+    sections: List[Tuple[MarkdownSectionEnum, int, int]] = []
+    index = 0
+    line_count = len(lines)
+    table = LineTable(lines)
+    debug = logger.isEnabledFor(logging.DEBUG)
+
+    while index < line_count:
+        candidates = SCANNER_DISPATCH.get(_dispatch_key(table, index), SCANNERS)
+        for section_type, scanner in candidates:
+            end = scanner(table, index, line_offset)
+            if end > index:
+                current_line = line_offset + index + 1
+                if end - index > 1:
+                    log_text = f"Lines {current_line}-{line_offset + end}"
                 else:
                     log_text = f"Line {current_line}"
                 logger.debug(
                     "%s: %s", log_text, section_type.value,
                 )
-                sections.append((section_type, section_content))
-                current_line += len(section_content)
+                if debug:
+                    skipped = _skipped_section_types(candidates, section_type)
+                    if skipped:
+                        logger.debug("%s: Skipped %s", log_text, ", ".join(skipped))
+                sections.append((section_type, index, end))
+                index = end
                 break
         else:
             raise RuntimeError(
-                f"Could not determine section type on line {current_line}",
+                f"Could not determine section type on line {line_offset + index + 1}",
             )
 
     return sections
+
+
+def parse_markdown(lines: List[str]) -> List[Tuple[MarkdownSectionEnum, List[str]]]:
+    return [
+        (section_type, lines[start:end])
+        for section_type, start, end in parse_markdown_spans(lines)
+    ]
+
+
+class MarkdownSectionNode:
+    """A section of a document along with the sections nested inside of it
+
+    Attributes:
+        section_type: The type of the section.
+        line_index: The index into the overall document of the section's first line.
+        lines: The lines of the section as they appear in the section containing it.
+        contents: The sections inside of each of the section's containers. Block quotes
+            have one container (their quoted text) and lists have one per entry. Other
+            sections have none.
+    """
+
+    def __init__(
+        self, section_type: MarkdownSectionEnum, line_index: int, lines: List[str]
+    ):
+        self.section_type = section_type
+        self.line_index = line_index
+        self.lines = lines
+        self.contents: List[List["MarkdownSectionNode"]] = []
+
+    def __repr__(self) -> str:
+        return (
+            f"<{self.__class__.__name__}: "
+            f"section_type={self.section_type.value!r}; "
+            f"line_index={self.line_index}; "
+            f"contents={self.contents!r}>"
+        )
+
+
+def parse_markdown_tree(
+    lines: List[str], line_offset: int = 0
+) -> List[MarkdownSectionNode]:
+    """Parse lines into sections with the sections of block quotes and lists nested
+
+    Parsing a container's content requires knowing where the container ends, so
+    containers are parsed from the outside in. Instead of recursing into them, each
+    container's content lines are pushed onto a stack as the container is found and
+    parsed in turn until the stack is empty. The content of a container is built
+    directly from the container's own lines (see `block_quote_content` and
+    `list_entries`), each line keeping its position in the document, so nesting depth
+    is never limited by the interpreter's recursion limit.
+
+    Args:
+        lines: The lines of the document to parse.
+        line_offset (optional): The offset into the overall document of the first
+            element of lines. This is used for reporting errors in the original
+            document.
+
+    Returns:
+        The top level sections of the document.
+    """
+    document: List[MarkdownSectionNode] = []
+    _parse_containers([(lines, line_offset, document)])
+    return document
+
+
+# The lines of containers still to be parsed, where they start in the document, and the
+# list their sections belong in
+_ContainerStack = List[Tuple[List[str], int, List[MarkdownSectionNode]]]
+
+
+def _push_contents(node: MarkdownSectionNode, stack: _ContainerStack) -> None:
+    """Add the containers of node (if it has any) to the stack to be parsed"""
+    if node.section_type == MarkdownSectionEnum.BLOCK_QUOTE:
+        contents = [block_quote_content(node.lines)[0]]
+    elif node.section_type in (
+        MarkdownSectionEnum.BULLET_LIST,
+        MarkdownSectionEnum.ORDERED_LIST,
+    ):
+        contents = list_entries(node.lines)
+    else:
+        return
+
+    content_offset = node.line_index
+    for content in contents:
+        node.contents.append([])
+        stack.append((content, content_offset, node.contents[-1]))
+        content_offset += len(content)
+
+
+def parse_section(
+    section_type: MarkdownSectionEnum, line_index: int, lines: List[str]
+) -> MarkdownSectionNode:
+    """Build the node for a section along with the sections nested inside of it
+
+    Args:
+        section_type: The type of the section, e.g. from `parse_markdown_spans`.
+        line_index: The index into the overall document of the section's first line.
+        lines: The lines of the section.
+
+    Returns:
+        The section's node, as it would appear in `parse_markdown_tree`.
+    """
+    node = MarkdownSectionNode(section_type, line_index, lines)
+    stack: _ContainerStack = []
+    _push_contents(node, stack)
+    _parse_containers(stack)
+    return node
+
+
+def _parse_containers(stack: _ContainerStack) -> None:
+    while stack:
+        container_lines, container_offset, sections = stack.pop()
+        for section_type, start, end in parse_markdown_spans(
+            container_lines, container_offset
+        ):
+            node = MarkdownSectionNode(
+                section_type, container_offset + start, container_lines[start:end]
+            )
+            sections.append(node)
+            _push_contents(node, stack)
+
+
+SectionSpan = Tuple[MarkdownSectionEnum, int, int]
+
+# Lines with any of these flags could end an open section of the given type. Sections
+# are only rescanned when one of these shows up.
+_LIST_ENDING = BLANK | TABLE_START | THEMATIC_BREAK
+_CODE_CONTINUATION = BLANK | INDENTED_CODE_BLOCK_START
+_QUOTATION_CHARACTERS = "'\""
+
+
+class _OpenBlockQuote:
+    """A block quote that more lines may still be added to
+
+    Attributes:
+        start: The index of the block quote's first line.
+        content: A parser fed the block quote's lines with their markers removed.
+        lazy: Whether the run of explicitly quoted lines has ended and the block quote
+            ended in a paragraph, so we are now accepting paragraph continuation text.
+        pending: Lazy lines we can't accept until we know they don't start a setext
+            heading.
+        pending_hard_break: Whether the last pending line ends with a hard break.
+    """
+
+    def __init__(self, start: int, line_offset: int):
+        self.start = start
+        self.content = IncrementalParser(line_offset)
+        self.lazy = False
+        self.pending: List[str] = []
+        self.pending_hard_break = False
+
+    def add_content(self, line: str) -> None:
+        self.content.feed(LEADING_QUOTE_MARKER.sub("", line))
+
+
+class IncrementalParser:
+    """Parse lines into sections as they are fed in one at a time
+
+    This finds the same sections `parse_markdown_spans` would for all of the lines fed
+    so far. Sections are returned as soon as no later line could change them and only
+    the lines of sections that are still open are kept.
+
+    Block quotes feed their content, without their markers, into a parser of their own.
+    This gives a stack of parsers, one per level of open block quotes, that always
+    knows whether a block quote ends in a paragraph (and can therefore be lazily
+    continued) without reparsing what has been quoted so far.
+
+    Args:
+        line_offset (optional): The offset into the overall document of the first line
+            fed in. This is used for reporting errors in the original document.
+    """
+
+    def __init__(self, line_offset: int = 0):
+        self.line_offset = line_offset
+        # The index of the next line to be processed
+        self._index = 0
+        # Lines that have been fed in but not processed yet. Lines go back in here when
+        # the section they were in turns out to have ended before them.
+        self._queue: Deque[str] = deque()
+        # The lines of the open sections when we aren't in a block quote
+        self._region: List[str] = []
+        self._region_lexed: List[LexedLine] = []
+        self._region_start = 0
+        self._open_type: Optional[MarkdownSectionEnum] = None
+        self._link_reference_definition_pending = False
+        self._quote: Optional[_OpenBlockQuote] = None
+        self._last_type: Optional[MarkdownSectionEnum] = None
+        self._last_quote: Optional[_OpenBlockQuote] = None
+        self._closed: List[SectionSpan] = []
+
+    def feed(self, line: str) -> List[SectionSpan]:
+        """Add the next line
+
+        Args:
+            line: The line to add.
+
+        Returns:
+            A list of (section type, start, end) tuples for the sections that are now
+            known to be complete. Indexes count lines fed into this parser.
+        """
+        self._queue.append(line)
+        self._process_queue()
+        return self._take_closed()
+
+    def close(self) -> List[SectionSpan]:
+        """Complete parsing assuming no more lines will be fed in
+
+        Returns:
+            A list of (section type, start, end) tuples for the remaining sections.
+        """
+        quote = self._quote
+        if quote is not None:
+            for line in quote.pending:
+                quote.add_content(line)
+            quote.pending = []
+            self._close_quote(self._index)
+            self._process_queue()
+        if self._region:
+            spans = parse_markdown_spans(
+                self._region, self.line_offset + self._region_start
+            )
+            for section_type, start, end in spans:
+                self._close_section(section_type, end - start)
+            self._region = []
+            self._region_lexed = []
+        return self._take_closed()
+
+    def ends_with_paragraph(self) -> bool:
+        """Whether the lines so far end in a paragraph
+
+        If the lines end in a block quote, this is whether that block quote ends in a
+        paragraph.
+
+        Returns:
+            True if the lines end in a paragraph. False otherwise.
+        """
+        quote = self._quote
+        if quote is not None:
+            if quote.pending:
+                # Pending lines are continuation text if nothing else comes along
+                content = copy.deepcopy(quote.content)
+                for line in quote.pending:
+                    content.feed(LEADING_QUOTE_MARKER.sub("", line))
+                return content.ends_with_paragraph()
+            return quote.content.ends_with_paragraph()
+
+        if self._region:
+            with redirect_info_logs_to_debug():
+                section_type, start, end = parse_markdown_spans(self._region)[-1]
+            if section_type == MarkdownSectionEnum.BLOCK_QUOTE:
+                content = IncrementalParser()
+                for line in self._region[start:end]:
+                    content.feed(LEADING_QUOTE_MARKER.sub("", line))
+                return content.ends_with_paragraph()
+            return section_type == MarkdownSectionEnum.PARAGRAPH
+
+        if self._last_quote is not None:
+            return self._last_quote.content.ends_with_paragraph()
+        return self._last_type == MarkdownSectionEnum.PARAGRAPH
+
+    def _take_closed(self) -> List[SectionSpan]:
+        closed = self._closed
+        self._closed = []
+        return closed
+
+    def _process_queue(self) -> None:
+        while self._queue:
+            line = self._queue.popleft()
+            lexed = lex_line(line)
+            flags = lexed[0]
+            if self._quote is not None:
+                self._process_quote_line(line, flags)
+            elif not self._region and flags & EXPLICIT_BLOCK_QUOTE:
+                self._quote = _OpenBlockQuote(
+                    self._index, self.line_offset + self._index
+                )
+                self._quote.add_content(line)
+                self._index += 1
+            else:
+                self._region.append(line)
+                self._region_lexed.append(lexed)
+                self._index += 1
+                if len(self._region) == 1 or self._could_close(line, flags):
+                    self._settle()
+
+    def _requeue(self, lines: List[str]) -> None:
+        """Put lines that were already processed back to be processed again"""
+        self._index -= len(lines)
+        self._queue.extendleft(reversed(lines))
+
+    def _close_section(self, section_type: MarkdownSectionEnum, length: int) -> None:
+        start = self._region_start
+        self._closed.append((section_type, start, start + length))
+        self._region_start = start + length
+        self._last_type = section_type
+        self._last_quote = None
+
+    def _close_quote(self, end: int) -> None:
+        quote = self._quote
+        assert quote is not None
+        self._quote = None
+        self._close_section(MarkdownSectionEnum.BLOCK_QUOTE, end - quote.start)
+        self._last_quote = quote
+
+    def _could_close(self, line: str, flags: int) -> bool:
+        """Whether a newly added line could end the first open section"""
+        if self._link_reference_definition_pending:
+            # Titles can run on until a closing quote. Otherwise, the only lines looked
+            # at are the first few.
+            return len(self._region) <= 3 or any(
+                char in line for char in _QUOTATION_CHARACTERS
+            )
+
+        open_type = self._open_type
+        if open_type in (
+            MarkdownSectionEnum.PARAGRAPH,
+            MarkdownSectionEnum.SETEXT_HEADING,
+        ):
+            return bool(
+                flags & PARAGRAPH_INTERRUPTION or self._region_lexed[-2][0] & HARD_BREAK
+            )
+        elif open_type in (
+            MarkdownSectionEnum.BULLET_LIST,
+            MarkdownSectionEnum.ORDERED_LIST,
+        ):
+            return bool(flags & _LIST_ENDING)
+        elif open_type == MarkdownSectionEnum.TABLE:
+            return not flags & TABLE_START
+        elif open_type == MarkdownSectionEnum.FENCED_CODE_BLOCK:
+            return bool(flags & CLOSING_FENCE)
+        elif open_type == MarkdownSectionEnum.INDENTED_CODE_BLOCK:
+            return not flags & _CODE_CONTINUATION
+        return True
+
+    def _settle(self) -> None:
+        """Close the first open section if no later line could change it"""
+        table = LineTable(self._region, self._region_lexed)
+        section_type, end, is_final = self._first_section(table)
+        self._open_type = section_type
+        if not is_final:
+            return
+
+        self._link_reference_definition_pending = False
+        self._open_type = None
+        self._close_section(section_type, end)
+        rest = self._region[end:]
+        self._region = []
+        self._region_lexed = []
+        # The rest of the lines could start any number of sections
+        self._requeue(rest)
+
+    def _first_section(self, table: LineTable) -> Tuple[MarkdownSectionEnum, int, bool]:
+        """Find the first section in table and whether more lines could change it"""
+        line_offset = self.line_offset + self._region_start
+        self._link_reference_definition_pending = False
+        candidates = SCANNER_DISPATCH.get(_dispatch_key(table, 0), SCANNERS)
+        for section_type, scanner in candidates:
+            if section_type == MarkdownSectionEnum.LINK_REFERENCE_DEFINITION:
+                try:
+                    end, ran_out = scan_link_reference_definition_to_end(
+                        table, 0, line_offset
+                    )
+                except StopIteration:
+                    end, ran_out = 0, True
+                if ran_out:
+                    self._link_reference_definition_pending = True
+                    return section_type, end, False
+            else:
+                end = scanner(table, 0, line_offset)
+            if end > 0:
+                break
+        else:
+            raise RuntimeError(
+                f"Could not determine section type on line {line_offset + 1}",
+            )
+
+        line_count = len(table)
+        flags = table.flags
+        if section_type in (
+            MarkdownSectionEnum.PARAGRAPH,
+            MarkdownSectionEnum.BULLET_LIST,
+            MarkdownSectionEnum.ORDERED_LIST,
+            MarkdownSectionEnum.TABLE,
+        ):
+            is_final = end < line_count
+        elif section_type == MarkdownSectionEnum.FENCED_CODE_BLOCK:
+            is_final = end < line_count or (
+                end > 1
+                and bool(flags[end - 1] & CLOSING_FENCE)
+                and table.first_chars[end - 1] == table.first_chars[0]
+                and table.fence_lengths[end - 1] == table.fence_lengths[0]
+            )
+        elif section_type == MarkdownSectionEnum.INDENTED_CODE_BLOCK:
+            # Indented code ends just before its last indented line, so we need to
+            # have seen something other than code
+            is_final = any(
+                not flags[index] & _CODE_CONTINUATION for index in range(1, line_count)
+            )
+        else:
+            is_final = True
+        return section_type, end, is_final
+
+    def _process_quote_line(self, line: str, flags: int) -> None:
+        quote = self._quote
+        assert quote is not None
+
+        if not quote.lazy:
+            if flags & EXPLICIT_BLOCK_QUOTE:
+                quote.add_content(line)
+                self._index += 1
+                return
+            if not quote.content.ends_with_paragraph():
+                self._close_quote(self._index)
+                self._queue.appendleft(line)
+                return
+            quote.lazy = True
+
+        if quote.pending:
+            if not (flags & PARAGRAPH_INTERRUPTION or quote.pending_hard_break):
+                quote.pending.append(line)
+                quote.pending_hard_break = bool(flags & HARD_BREAK)
+                self._index += 1
+                return
+            # We now know where the paragraph the pending lines start ends
+            pending = quote.pending
+            quote.pending = []
+            quote.pending_hard_break = False
+            if flags & SETEXT_UNDERLINE:
+                # They're a setext heading, not continuation text
+                self._close_quote(self._index - len(pending))
+                self._queue.appendleft(line)
+                self._requeue(pending)
+                return
+            for pending_line in pending:
+                quote.add_content(pending_line)
+
+        if flags & PARAGRAPH_INTERRUPTION & ~EXPLICIT_BLOCK_QUOTE:
+            self._close_quote(self._index)
+            self._queue.appendleft(line)
+        elif flags & PARAGRAPH_START:
+            quote.pending = [line]
+            quote.pending_hard_break = bool(flags & HARD_BREAK)
+            self._index += 1
+        else:
+            quote.add_content(line)
+            self._index += 1
+
+
+def parse_markdown_stream(
+    lines: Iterable[str], line_offset: int = 0
+) -> Iterator[MarkdownSectionNode]:
+    """Parse lines into sections as they are read
+
+    Each top level section (along with the sections nested inside of it, see
+    `parse_markdown_tree`) is produced as soon as no later line could change it. Only
+    the lines of sections that are still open are kept in memory.
+
+    Args:
+        lines: The lines of the document to parse, e.g. an open text file. Lines may
+            end in line breaks and are split the same way `str.splitlines` would split
+            the whole document.
+        line_offset (optional): The offset into the overall document of the first
+            line. This is used for reporting errors in the original document.
+
+    Returns:
+        An iterator of the top level sections of the document.
+    """
+    parser = IncrementalParser(line_offset)
+    # The lines of the sections that are still open
+    open_lines: Deque[str] = deque()
+
+    def close_sections(spans: List[SectionSpan]) -> Iterator[MarkdownSectionNode]:
+        for section_type, start, end in spans:
+            section_lines = [open_lines.popleft() for _ in range(end - start)]
+            yield parse_section(section_type, line_offset + start, section_lines)
+
+    for chunk in lines:
+        # A bare empty string is an empty line, but `"".splitlines()` is empty
+        for line in chunk.splitlines() or [chunk]:
+            open_lines.append(line)
+            yield from close_sections(parser.feed(line))
+    yield from close_sections(parser.close())
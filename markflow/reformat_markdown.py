@@ -1,6 +1,11 @@
+import contextlib
+import itertools
 import logging
-from typing import Dict, Type
+import zlib
+from enum import Enum
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Type
 
+from ._utils import redirect_info_logs_to_debug
 from .exceptions import ReformatInconsistentException
 from .formatters import (
     MarkdownATXHeading,
@@ -11,19 +16,48 @@ from .formatters import (
     MarkdownIndentedCodeBlock,
     MarkdownLinkReferenceDefinition,
     MarkdownOrderedList,
+    MarkdownOutput,
     MarkdownParagraph,
     MarkdownSection,
     MarkdownSetextHeading,
     MarkdownTable,
     MarkdownThematicBreak,
 )
-from .parser import MarkdownSectionEnum, parse_markdown
+from .formatters.base import Container
+from .parser import (
+    MarkdownSectionEnum,
+    MarkdownSectionNode,
+    SectionSpan,
+    parse_markdown_spans,
+    parse_markdown_stream,
+    parse_markdown_tree,
+    parse_section,
+)
 from .typing import Number
 
-__all__ = ["reformat_markdown_text"]
+__all__ = ["VerificationPolicy", "reformat_markdown_stream", "reformat_markdown_text"]
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_SAMPLE_FRACTION = 0.1
+
+
+class VerificationPolicy(Enum):
+    """How to check that reformatted text wouldn't be reformatted any further
+
+    Attributes:
+        FULL: Reformat the whole reformatted text again and compare it.
+        STRUCTURAL: Parse the reformatted text and check it is made up of the sections
+            that were written to it.
+        SAMPLED: Check the structure and reformat a fraction of the sections again.
+        OFF: Don't check.
+    """
+
+    FULL = "full"
+    STRUCTURAL = "structural"
+    SAMPLED = "sampled"
+    OFF = "off"
+
 
 FORMATTERS: Dict[MarkdownSectionEnum, Type[MarkdownSection]] = {
     MarkdownSectionEnum.ATX_HEADING: MarkdownATXHeading,
@@ -41,39 +75,466 @@ FORMATTERS: Dict[MarkdownSectionEnum, Type[MarkdownSection]] = {
 }
 
 
-def _reformat_markdown_text(text: str, width: Number = 88, line_index: int = 0) -> str:
-    sections = parse_markdown(text.splitlines())
+class _Frame:
+    """Sections being written to the output at one level of nesting
 
-    formatters = []
-    last_section_type = MarkdownSectionEnum.INVALID
+    Attributes:
+        sections: The sections left to write.
+        width: The width to reformat the sections to.
+        containers: The containers of the section these sections are inside of, which
+            is resumed once they are written. `None` for the top level sections.
+        last_section_type: The type of the section written last.
+    """
+
+    def __init__(
+        self,
+        sections: List[MarkdownSectionNode],
+        width: Number,
+        containers: Optional[Iterator[Container]] = None,
+    ):
+        self.sections = iter(sections)
+        self.width = width
+        self.containers = containers
+        self.last_section_type = MarkdownSectionEnum.INVALID
+
+
+def _push_next_container(stack: List[_Frame], containers: Iterator[Container]) -> None:
+    container = next(containers, None)
+    if container is not None:
+        sections, width = container
+        stack.append(_Frame(sections, width, containers))
+
+
+def _write_sections(
+    output: MarkdownOutput,
+    stack: List[_Frame],
+    written: Optional[List[Tuple[MarkdownSectionEnum, int]]] = None,
+) -> None:
+    """Write sections into output until there are none left
 
-    for section_type, section_content in sections:
-        formatter = FORMATTERS[section_type](line_index, section_content)
-        content_length = len(section_content)
+    Sections inside of block quotes and lists are written by adding a frame to the stack
+    for each of their containers in turn rather than by recursing.
+
+    If `written` is passed, the type of each top level section (including any blank
+    lines we add) and the index of the first line of output it was written to are
+    appended to it.
+    """
+    while stack:
+        frame = stack[-1]
+        node = next(frame.sections, None)
+        if node is None:
+            stack.pop()
+            if frame.containers is not None:
+                _push_next_container(stack, frame.containers)
+            continue
+
+        line_index = node.line_index
+        formatter = FORMATTERS[node.section_type](line_index, node.lines, node.contents)
+        content_length = len(node.lines)
         if content_length > 1:
             log_text = f"Lines {line_index + 1}-{line_index + content_length}"
         else:
             log_text = f"Line {line_index + 1}"
-        logger.info("%s: %s", log_text, repr(formatter))
+        # Only the top level sections are reported to the user
+        logger.log(
+            logging.INFO if frame.containers is None else logging.DEBUG,
+            "%s: %s",
+            log_text,
+            repr(formatter),
+        )
         if (
-            section_type == MarkdownSectionEnum.SETEXT_HEADING
-            and last_section_type == MarkdownSectionEnum.BLOCK_QUOTE
+            node.section_type == MarkdownSectionEnum.SETEXT_HEADING
+            and frame.last_section_type == MarkdownSectionEnum.BLOCK_QUOTE
         ):
             logger.warning(
                 f"Adding a new line before setext heading on line {line_index + 1}"
             )
-            formatters.append(
-                FORMATTERS[MarkdownSectionEnum.BLANK_LINE](line_index, [""])
+            blank_line = FORMATTERS[MarkdownSectionEnum.BLANK_LINE](line_index, [""])
+            if written is not None and frame.containers is None:
+                written.append((MarkdownSectionEnum.BLANK_LINE, len(output.lines)))
+            output.write(blank_line.reformatted(frame.width))
+        frame.last_section_type = node.section_type
+        if written is not None and frame.containers is None:
+            written.append((node.section_type, len(output.lines)))
+
+        _push_next_container(stack, formatter.write(output, frame.width))
+
+
+def _reformat_section(section: MarkdownSection, width: Number) -> str:
+    """Reformat a section along with any sections inside of it"""
+    output = MarkdownOutput()
+    stack: List[_Frame] = []
+    _push_next_container(stack, section.write(output, width))
+    _write_sections(output, stack)
+    return "\n".join(output.lines)
+
+
+def _write_document(
+    sections: List[MarkdownSectionNode],
+    width: Number,
+    last_section_type: MarkdownSectionEnum = MarkdownSectionEnum.INVALID,
+) -> Tuple[List[str], List[SectionSpan]]:
+    """Reformat top level sections into lines along with the spans they were written to
+
+    `last_section_type` is the type of the section before these ones, if any.
+    """
+    output = MarkdownOutput()
+    written: List[Tuple[MarkdownSectionEnum, int]] = []
+    frame = _Frame(sections, width)
+    frame.last_section_type = last_section_type
+    _write_sections(output, [frame], written)
+    ends = [start for _, start in written[1:]] + [len(output.lines)]
+    spans = [
+        (section_type, start, end) for (section_type, start), end in zip(written, ends)
+    ]
+    return output.lines, spans
+
+
+def _reformat_markdown_lines(
+    text: str, width: Number = 88, line_index: int = 0
+) -> Tuple[List[str], List[SectionSpan]]:
+    """Reformat text into lines along with the top level sections written to them"""
+    return _write_document(parse_markdown_tree(text.splitlines(), line_index), width)
+
+
+def _reformat_markdown_text(text: str, width: Number = 88, line_index: int = 0) -> str:
+    lines = text.splitlines()
+    output = MarkdownOutput()
+    _write_sections(output, [_Frame(parse_markdown_tree(lines, line_index), width)])
+    return "\n".join(output.lines) + "\n"
+
+
+@contextlib.contextmanager
+def _muted_logging() -> Iterator[None]:
+    # Mute logging during second pass since it means nothing to the user.
+    level = logger.getEffectiveLevel()
+    if level > logging.DEBUG:
+        logger.setLevel(logging.ERROR)
+    try:
+        yield
+    finally:
+        logger.setLevel(level)
+
+
+def _is_sampled(text: str, sample_fraction: float) -> bool:
+    """Deterministically choose a `sample_fraction` of all possible texts"""
+    return zlib.crc32(text.encode("utf-8", "surrogatepass")) < sample_fraction * 2 ** 32
+
+
+def _verify_structure(
+    lines: List[str],
+    spans: List[SectionSpan],
+    width: Number,
+    sample_fraction: float,
+    following: Sequence[str] = (),
+) -> None:
+    """Check reformatted lines are parsed into the sections they were written as
+
+    `following` are the lines that come after them in the document, if any. They are
+    parsed along with them, since how a section ends can depend on what follows it, but
+    only the sections that start in `lines` are checked.
+
+    A `sample_fraction` of the sections are also reformatted again on their own to check
+    they don't change, unless they are already known to be formatted.
+    """
+    with redirect_info_logs_to_debug():
+        parsed_spans = parse_markdown_spans(lines + list(following))
+    if following:
+        parsed_spans = [span for span in parsed_spans if span[1] < len(lines)]
+    if parsed_spans != spans:
+        for section_index, (written_span, parsed_span) in enumerate(
+            zip(spans, parsed_spans)
+        ):
+            if written_span != parsed_span:
+                break
+        else:
+            section_index = min(len(spans), len(parsed_spans))
+        raise ReformatInconsistentException(
+            f"Reformatted text is parsed into different sections than it was written "
+            f"as starting with section {section_index + 1}. Please open a bug report "
+            f"or email jholland@duosecurity.com."
+        )
+
+    if not sample_fraction:
+        return
+    for section_type, start, end in spans:
+        section_text = "\n".join(lines[start:end])
+        if not _is_sampled(section_text, sample_fraction):
+            continue
+        section = FORMATTERS[section_type](start, lines[start:end])
+        if section.is_canonical(width):
+            continue
+        if _reformat_section(section, width) != section_text:
+            raise ReformatInconsistentException(
+                f"Reformat of the reformatted section on lines {start + 1}-{end} "
+                f"results in different text. Please open a bug report or email "
+                f"jholland@duosecurity.com."
             )
-        formatters.append(formatter)
-        line_index += len(section_content)
 
+
+def _section_sample_fraction(
+    verification: VerificationPolicy, sample_fraction: float
+) -> float:
+    """The fraction of sections to reformat again when verifying sections one by one
+
+    Without the whole document, `VerificationPolicy.FULL` reformats every reformatted
+    section again on its own.
+    """
+    if not 0 <= sample_fraction <= 1:
+        raise ValueError(
+            f"sample_fraction must be between 0 and 1, not {sample_fraction}"
+        )
+    if verification == VerificationPolicy.FULL:
+        return 1
+    elif verification == VerificationPolicy.STRUCTURAL:
+        return 0
+    return sample_fraction
+
+
+def _reformat_top_level_section(
+    section: MarkdownSectionNode,
+    width: Number,
+    last_section_type: MarkdownSectionEnum,
+    verification: VerificationPolicy,
+    sample_fraction: float,
+    following: Sequence[str] = (),
+) -> List[str]:
+    """Reformat and verify a top level section on its own
+
+    `last_section_type` is the type of the section before it, which decides whether a
+    blank line is added before it, and `sample_fraction` comes from
+    `_section_sample_fraction`. Some sections, like link reference definitions at the
+    end of a document, are parsed differently without the text after them, so if the
+    section fails verification on its own, it is verified again followed by the lines
+    in `following`.
+    """
+    section_lines, spans = _write_document([section], width, last_section_type)
+    if verification != VerificationPolicy.OFF:
+        with _muted_logging():
+            try:
+                _verify_structure(section_lines, spans, width, sample_fraction)
+            except ReformatInconsistentException:
+                if not following:
+                    raise
+                _verify_structure(
+                    section_lines, spans, width, sample_fraction, following
+                )
+    return section_lines
+
+
+def _trailing_whitespace_start(lines: List[str], spans: List[SectionSpan]) -> int:
+    """The index of the first of the sections at the end that are only whitespace"""
+    trailing_start = len(spans)
+    while trailing_start and all(
+        not line.strip()
+        for line in lines[spans[trailing_start - 1][1] : spans[trailing_start - 1][2]]
+    ):
+        trailing_start -= 1
+    return trailing_start
+
+
+def _first_difference(old_lines: List[str], new_lines: List[str]) -> Optional[int]:
+    for index, (old_line, new_line) in enumerate(
+        itertools.zip_longest(old_lines, new_lines)
+    ):
+        if old_line != new_line:
+            return index
+    return None
+
+
+def _changed_sections(
+    text: str,
+    width: Number = 88,
+    verification: VerificationPolicy = VerificationPolicy.FULL,
+    sample_fraction: float = DEFAULT_SAMPLE_FRACTION,
+) -> Iterator[Tuple[int, List[str], List[str]]]:
+    """Reformat text a top level section at a time, finding the sections that change
+
+    Each section is reformatted and compared with the lines it came from. A section
+    that is already formatted can't be reformatted any further, so only sections that
+    change are verified, on their own like `reformat_markdown_stream` does. Sections
+    aren't always verified the same way on their own as they are in the whole document,
+    though, so if one fails, the rest of the text is reformatted and verified with
+    `reformat_markdown_text` instead and compared as a whole.
+
+    Args:
+        text: The Markdown text to reformat.
+        width (optional): The maximum line length. See `reformat_markdown_text`.
+        verification (optional): See `reformat_markdown_text`.
+        sample_fraction (optional): See `reformat_markdown_stream`.
+
+    Returns:
+        An iterator of tuples of three values, in order, for each part of text that
+        `reformat_markdown_text` would change. The first value is the index of the line
+        the part starts on. The second is its lines, with their line endings. The third
+        is what they would be reformatted to.
+    """
+    section_sample_fraction = _section_sample_fraction(verification, sample_fraction)
+    lines = text.splitlines()
+    old_lines = text.splitlines(keepends=True)
+    spans = parse_markdown_spans(lines)
+    # Trailing whitespace is stripped from the end of the document, so the last
+    # section and any whitespace after it can only be compared once they are joined
+    last_section_start = max(_trailing_whitespace_start(lines, spans) - 1, 0)
+    end_start = spans[last_section_start][1] if spans else 0
+
+    new_line_count = 0
+    end_lines: List[str] = []
+    last_section_type = MarkdownSectionEnum.INVALID
+    for index, (section_type, start, end) in enumerate(spans):
+        section = parse_section(section_type, start, lines[start:end])
+        section_lines, section_spans = _write_document(
+            [section], width, last_section_type
+        )
         last_section_type = section_type
+        new_lines = [line + "\n" for line in section_lines]
+        if new_lines != old_lines[start:end]:
+            if verification != VerificationPolicy.OFF:
+                try:
+                    with _muted_logging():
+                        _verify_structure(
+                            section_lines, section_spans, width, section_sample_fraction
+                        )
+                except ReformatInconsistentException:
+                    new_text = reformat_markdown_text(
+                        text, width, verification, sample_fraction
+                    )
+                    # Every section before this one is reformatted the same way
+                    yield (
+                        start,
+                        old_lines[start:],
+                        new_text.splitlines(keepends=True)[new_line_count:],
+                    )
+                    return
+            if index < last_section_start:
+                yield start, old_lines[start:end], new_lines
+        if index >= last_section_start:
+            end_lines.extend(section_lines)
+        new_line_count += len(section_lines)
+
+    new_end = ("\n".join(end_lines).rstrip() + "\n").splitlines(keepends=True)
+    if new_end != old_lines[end_start:]:
+        yield end_start, old_lines[end_start:], new_end
+
+
+def _first_changed_line(
+    changed_sections: Iterable[Tuple[int, List[str], List[str]]]
+) -> Optional[int]:
+    """Find the first line that changes in what `_changed_sections` finds
 
-    return "\n".join(f.reformatted(width) for f in formatters) + "\n"
+    Only the first section is looked at, so when given the iterator it returns, text
+    that would be changed usually isn't reformatted in full.
 
+    Returns:
+        The index of the first line that changes, or None if nothing does.
+    """
+    for start, old_lines, new_lines in changed_sections:
+        return start + (_first_difference(old_lines, new_lines) or 0)
+    return None
+
+
+def _overlaps(start: int, end: int, line_ranges: List[Tuple[int, int]]) -> bool:
+    return any(
+        range_start < end and start < range_end
+        for range_start, range_end in line_ranges
+    )
 
-def reformat_markdown_text(text: str, width: Number = 88) -> str:
+
+def _reformat_markdown_sections(
+    text: str,
+    line_ranges: List[Tuple[int, int]],
+    width: Number = 88,
+    verification: VerificationPolicy = VerificationPolicy.FULL,
+    sample_fraction: float = DEFAULT_SAMPLE_FRACTION,
+) -> str:
+    """Reformat only the top level sections of text that overlap some lines
+
+    The other sections are left exactly as they are. Each reformatted section is
+    verified on its own, like `reformat_markdown_stream` does. Sections aren't always
+    verified the same way on their own as they are in the whole document, though, so
+    if one fails, the reformatted text is verified as a whole instead, like
+    `_changed_sections` does. Trailing whitespace is only stripped from the end of the
+    document if one of the sections at the end is reformatted.
+
+    Args:
+        text: The Markdown text to rerender.
+        line_ranges: The (start, end) indexes of the lines whose sections should be
+            reformatted, e.g. the lines that changed.
+        width (optional): The maximum line length. See `reformat_markdown_text`.
+        verification (optional): See `reformat_markdown_stream`.
+        sample_fraction (optional): See `reformat_markdown_stream`.
+
+    Returns:
+        The text with the overlapping sections reformatted.
+    """
+    section_sample_fraction = _section_sample_fraction(verification, sample_fraction)
+    lines = text.splitlines()
+    spans = parse_markdown_spans(lines)
+    last_section_start = max(_trailing_whitespace_start(lines, spans) - 1, 0)
+
+    new_lines: List[str] = []
+    # The sections of new_lines and the lines of the ones that were reformatted, in
+    # case they need to be verified together
+    new_spans: List[SectionSpan] = []
+    new_line_ranges: List[Tuple[int, int]] = []
+    verify_document = False
+    reformatted_end = False
+    last_section_type = MarkdownSectionEnum.INVALID
+    for index, (section_type, start, end) in enumerate(spans):
+        offset = len(new_lines)
+        if _overlaps(start, end, line_ranges):
+            section = parse_section(section_type, start, lines[start:end])
+            section_lines, section_spans = _write_document(
+                [section], width, last_section_type
+            )
+            if verification != VerificationPolicy.OFF and not verify_document:
+                try:
+                    with _muted_logging():
+                        _verify_structure(
+                            section_lines, section_spans, width, section_sample_fraction
+                        )
+                except ReformatInconsistentException:
+                    verify_document = True
+            new_lines.extend(section_lines)
+            new_spans.extend(
+                (span_type, offset + span_start, offset + span_end)
+                for span_type, span_start, span_end in section_spans
+            )
+            new_line_ranges.append((offset, len(new_lines)))
+            reformatted_end = reformatted_end or index >= last_section_start
+        else:
+            new_lines.extend(lines[start:end])
+            new_spans.append((section_type, offset, len(new_lines)))
+        last_section_type = section_type
+
+    new_text = "\n".join(new_lines)
+    if reformatted_end:
+        new_text = new_text.rstrip() + "\n"
+    else:
+        new_text += "\n" if text.endswith("\n") else ""
+
+    if verify_document:
+        with _muted_logging():
+            _verify_structure(new_lines, new_spans, width, 0)
+            if section_sample_fraction and (
+                _reformat_markdown_sections(
+                    new_text, new_line_ranges, width, VerificationPolicy.OFF
+                )
+                != new_text
+            ):
+                raise ReformatInconsistentException(
+                    "Reformat of the reformatted sections results in different text. "
+                    "Please open a bug report or email jholland@duosecurity.com."
+                )
+    return new_text
+
+
+def reformat_markdown_text(
+    text: str,
+    width: Number = 88,
+    verification: VerificationPolicy = VerificationPolicy.FULL,
+    sample_fraction: float = DEFAULT_SAMPLE_FRACTION,
+) -> str:
     """Reformat a block of markdown text
 
     See the README for how the Markdown text gets reformatted.
@@ -82,21 +543,107 @@ def reformat_markdown_text(text: str, width: Number = 88) -> str:
         text: The Markdown text toblo rerender
         width: The maximum line length. Note, for table a code blocks, this length is
             not enforced as the would change the documents appearance when rendered.
+        verification (optional): How to check that the reformatted text wouldn't be
+            reformatted any further. See `VerificationPolicy`.
+        sample_fraction (optional): The fraction of sections to reformat again with
+            `VerificationPolicy.SAMPLED`. Must be between 0 and 1.
 
     Returns:
         The reformatted Markdown text
     """
-    new_text = _reformat_markdown_text(text, width)
-    level = logger.getEffectiveLevel()
-    # Mute logging during second pass since it means nothing to the user.
-    if level > logging.DEBUG:
-        logger.setLevel(logging.ERROR)
-    new_new_text = _reformat_markdown_text(new_text, width)
-    logger.setLevel(level)
-    if new_new_text != new_text:
-        raise ReformatInconsistentException(
-            "Reformat of reformatted code results in different text. Please open a bug "
-            "report or email jholland@duosecurity.com."
+    if not 0 <= sample_fraction <= 1:
+        raise ValueError(
+            f"sample_fraction must be between 0 and 1, not {sample_fraction}"
         )
+
+    if verification == VerificationPolicy.FULL:
+        new_text = _reformat_markdown_text(text, width)
+        with _muted_logging():
+            new_new_text = _reformat_markdown_text(new_text, width)
+        if new_new_text != new_text:
+            raise ReformatInconsistentException(
+                "Reformat of reformatted code results in different text. Please open a "
+                "bug report or email jholland@duosecurity.com."
+            )
+    else:
+        lines, spans = _reformat_markdown_lines(text, width)
+        new_text = "\n".join(lines) + "\n"
+        if verification != VerificationPolicy.OFF:
+            if verification == VerificationPolicy.STRUCTURAL:
+                sample_fraction = 0
+            with _muted_logging():
+                _verify_structure(lines, spans, width, sample_fraction)
+
     new_text = new_text.rstrip() + "\n"
     return new_text
+
+
+def reformat_markdown_stream(
+    lines: Iterable[str],
+    width: Number = 88,
+    verification: VerificationPolicy = VerificationPolicy.FULL,
+    sample_fraction: float = DEFAULT_SAMPLE_FRACTION,
+) -> Iterator[str]:
+    """Reformat markdown text a section at a time as it is read
+
+    Each section is reformatted as soon as no later line could change it and the section
+    after it has been read, so only two sections need to be held in memory at once.
+
+    Since the whole document is never available at once, verification is done a
+    section at a time. `VerificationPolicy.FULL` reformats each reformatted section
+    again on its own, and the other policies check each section as they would the
+    whole document.
+
+    Args:
+        lines: The Markdown text to rerender, e.g. an open text file. Lines may end in
+            line breaks.
+        width: The maximum line length. See `reformat_markdown_text`.
+        verification (optional): How to check that the reformatted sections wouldn't
+            be reformatted any further. See `VerificationPolicy`.
+        sample_fraction (optional): The fraction of sections to reformat again with
+            `VerificationPolicy.SAMPLED`. Must be between 0 and 1.
+
+    Returns:
+        An iterator of reformatted text. Joined together, it is the same as what
+        `reformat_markdown_text` returns for the whole document.
+    """
+    sample_fraction = _section_sample_fraction(verification, sample_fraction)
+
+    last_section_type = MarkdownSectionEnum.INVALID
+    # The reformatted document has trailing whitespace stripped, so the last text that
+    # isn't just whitespace is held on to along with any whitespace that follows it
+    # until we know more text follows them.
+    last_text: Optional[str] = None
+    trailing_whitespace: List[str] = []
+    # Each section is reformatted once the one after it is read, so that it can be
+    # verified followed by it
+    sections = parse_markdown_stream(lines)
+    next_section = next(sections, None)
+    while next_section is not None:
+        section = next_section
+        next_section = next(sections, None)
+        section_lines = _reformat_top_level_section(
+            section,
+            width,
+            last_section_type,
+            verification,
+            sample_fraction,
+            next_section.lines if next_section is not None else (),
+        )
+        last_section_type = section.section_type
+
+        text = "\n".join(section_lines)
+        if not text.strip():
+            trailing_whitespace.append(text)
+            continue
+        if last_text is not None:
+            yield last_text + "\n"
+        for whitespace in trailing_whitespace:
+            yield whitespace + "\n"
+        trailing_whitespace = []
+        last_text = text
+
+    if last_text is None:
+        yield "\n"
+    else:
+        yield last_text.rstrip() + "\n"
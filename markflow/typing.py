@@ -1,4 +1,4 @@
-from typing import Callable, List, Tuple, Union
+from typing import TYPE_CHECKING, Callable, List, Tuple, Union
 
 try:
     from typing import Protocol
@@ -6,10 +6,18 @@ except ImportError:
     # Python <3.8
     from typing_extensions import Protocol  # type: ignore
 
+if TYPE_CHECKING:
+    from .detectors._lines import LineTable
+
 Number = Union[int, float]
 SectionEndedFunc = Callable[[str, int, List[str]], bool]
 
 
+class ScanFunc(Protocol):
+    def __call__(self, lines: "LineTable", start: int, line_offset: int = 0) -> int:
+        pass
+
+
 class SplitFunc(Protocol):
     def __call__(
         self, lines: List[str], line_offset: int = 0
@@ -1,4 +1,4 @@
-from typing import Any, Callable, Iterable, List, Optional, Union
+from typing import Any, Callable, ContextManager, Iterable, List, Optional, Union
 
 ExceptionClass = type
 
@@ -22,5 +22,8 @@ class MarkGenerator:
     ) -> Callable[..., Any]: ...
 
 def xfail(reason: str = ...) -> None: ...
+def raises(
+    expected_exception: ExceptionClass, *, match: Optional[str] = ...
+) -> ContextManager[Any]: ...
 
 mark: MarkGenerator
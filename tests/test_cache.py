@@ -0,0 +1,82 @@
+import math
+import os
+import pathlib
+
+from markflow._cache import CACHE_DIR_ENV_VAR, ContentCache, FileCache, user_cache_dir
+from markflow.reformat_markdown import VerificationPolicy
+
+FULL = VerificationPolicy.FULL
+
+
+class TestFileCache:
+    def test_round_trip(self, tmp_path: pathlib.Path) -> None:
+        path = tmp_path / "file.md"
+        path.write_text("Text\n")
+        cache_dir = tmp_path / "cache"
+        cache = FileCache(88, FULL, "1.0 (development)", cache_dir)
+        assert not cache.is_formatted(path)
+        cache.add(path)
+        assert cache.is_formatted(path)
+        cache.save()
+
+        assert FileCache(88, FULL, "1.0 (development)", cache_dir).is_formatted(path)
+        assert not FileCache(80, FULL, "1.0 (development)", cache_dir).is_formatted(
+            path
+        )
+        assert not FileCache(
+            88, VerificationPolicy.OFF, "1.0 (development)", cache_dir
+        ).is_formatted(path)
+        assert not FileCache(88, FULL, "1.1", cache_dir).is_formatted(path)
+
+    def test_changed_file(self, tmp_path: pathlib.Path) -> None:
+        path = tmp_path / "file.md"
+        path.write_text("Text\n")
+        cache = FileCache(math.inf, FULL, "1.0", tmp_path)
+        cache.add(path)
+        path.write_text("More text\n")
+        assert not cache.is_formatted(path)
+        path.unlink()
+        assert not cache.is_formatted(path)
+
+    def test_unreadable_cache(self, tmp_path: pathlib.Path) -> None:
+        cache = FileCache(88, FULL, "1.0", tmp_path)
+        cache.cache_file.parent.mkdir(parents=True)
+        cache.cache_file.write_text("not a pickle")
+        assert not FileCache(88, FULL, "1.0", tmp_path).is_formatted(cache.cache_file)
+
+
+def test_user_cache_dir(tmp_path: pathlib.Path) -> None:
+    old_cache_dir = os.environ.get(CACHE_DIR_ENV_VAR)
+    os.environ[CACHE_DIR_ENV_VAR] = str(tmp_path)
+    try:
+        assert user_cache_dir() == tmp_path
+    finally:
+        if old_cache_dir is None:
+            del os.environ[CACHE_DIR_ENV_VAR]
+        else:
+            os.environ[CACHE_DIR_ENV_VAR] = old_cache_dir
+
+
+class TestContentCache:
+    def test_round_trip(self, tmp_path: pathlib.Path) -> None:
+        cache = ContentCache(88, FULL, "1.0", tmp_path)
+        formatted_key = cache.key(b"Text\n")
+        reformatted_key = cache.key(b"#  Heading\n")
+        assert cache.get(formatted_key) is None
+        cache.set(formatted_key, None)
+        cache.set(reformatted_key, "# Heading\n")
+
+        cache = ContentCache(88, FULL, "1.0", tmp_path)
+        assert cache.get(formatted_key) == (False, None)
+        assert cache.get(reformatted_key) == (True, "# Heading\n")
+
+    def test_key(self) -> None:
+        cache = ContentCache(88, FULL, "1.0", pathlib.Path())
+        assert cache.key(b"Text\n") == cache.key(b"Text\n")
+        assert cache.key(b"Text\n") != cache.key(b"Text\r\n")
+        for other_cache in [
+            ContentCache(math.inf, FULL, "1.0", pathlib.Path()),
+            ContentCache(88, VerificationPolicy.OFF, "1.0", pathlib.Path()),
+            ContentCache(88, FULL, "1.1", pathlib.Path()),
+        ]:
+            assert cache.key(b"Text\n") != other_cache.key(b"Text\n")
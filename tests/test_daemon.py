@@ -0,0 +1,193 @@
+import concurrent.futures
+import contextlib
+import http.client
+import json
+import pathlib
+import socket
+import socketserver
+import threading
+from typing import Any, Dict, Iterator, Optional, Tuple, cast
+
+import pytest
+
+from markflow._daemon import _RequestHandler, make_server
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path: str):
+        super().__init__("localhost")
+        self._path = path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self._path)
+
+
+def _request(
+    connection: http.client.HTTPConnection,
+    method: str,
+    path: str,
+    body: Optional[str] = None,
+    headers: Optional[Dict[str, str]] = None,
+) -> Tuple[int, str]:
+    connection.request(method, path, body=body, headers=headers or {})
+    response = connection.getresponse()
+    return response.status, response.read().decode("utf-8")
+
+
+@contextlib.contextmanager
+def _serving(server: socketserver.BaseServer) -> Iterator[None]:
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,))
+    thread.start()
+    try:
+        yield
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+def _connect(server: socketserver.BaseServer) -> http.client.HTTPConnection:
+    host, port = cast(Tuple[str, int], server.server_address)
+    return http.client.HTTPConnection(host, port)
+
+
+@contextlib.contextmanager
+def _connection() -> Iterator[http.client.HTTPConnection]:
+    # Threads keep the tests fast. The server doesn't care what it reformats with.
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    server = make_server(("127.0.0.1", 0), 1, 1, executor=executor)
+    with _serving(server):
+        connection = _connect(server)
+        yield connection
+        connection.close()
+
+
+class TestDaemon:
+    def test_reformat(self) -> None:
+        with _connection() as connection:
+            assert _request(connection, "POST", "/", "#  Heading\n") == (
+                200,
+                "# Heading\n",
+            )
+            assert _request(connection, "POST", "/", "# Heading\n") == (204, "")
+
+    def test_options(self) -> None:
+        text = "A paragraph that is a little too long\n"
+        with _connection() as connection:
+            headers = {"X-Line-Length": "20", "X-Verify": "structural"}
+            assert _request(connection, "POST", "/", text, headers) == (
+                200,
+                "A paragraph that is\na little too long\n",
+            )
+            headers = {"X-Line-Length": "0"}
+            assert _request(connection, "POST", "/", text, headers) == (204, "")
+
+    def test_invalid_options(self) -> None:
+        with _connection() as connection:
+            for header, value in [
+                ("X-Line-Length", "long"),
+                ("X-Verify", "sometimes"),
+                ("X-Sample-Fraction", "2"),
+            ]:
+                headers = {header: value}
+                status, _ = _request(connection, "POST", "/", "Text\n", headers)
+                assert status == 400
+
+    def test_health(self) -> None:
+        with _connection() as connection:
+            status, body = _request(connection, "GET", "/health")
+            assert status == 200
+            assert json.loads(body) == {
+                "status": "ok",
+                "workers": 1,
+                "in_flight": 0,
+                "max_concurrent_requests": 1,
+            }
+            assert _request(connection, "GET", "/")[0] == 404
+
+    def test_busy(self) -> None:
+        started = threading.Event()
+        release = threading.Event()
+
+        def reformat(*args: Any) -> str:
+            started.set()
+            release.wait()
+            return "Text\n"
+
+        class BlockingExecutor(concurrent.futures.ThreadPoolExecutor):
+            def submit(self, fn, *args, **kwargs):  # type: ignore
+                return super().submit(reformat, *args)
+
+        executor = BlockingExecutor(max_workers=2)
+        server = make_server(("127.0.0.1", 0), 1, 1, 0.5, executor)
+        with _serving(server):
+            try:
+                first = _connect(server)
+                waiting = threading.Thread(
+                    target=_request, args=(first, "POST", "/", "A")
+                )
+                waiting.start()
+                started.wait()
+                second = _connect(server)
+                assert _request(second, "POST", "/", "Text")[0] == 503
+                release.set()
+                waiting.join()
+                release.clear()
+                # The first request was let go, so this one waits until it times out
+                assert _request(second, "POST", "/", "Text")[0] == 504
+                # but is counted until its document is done being reformatted
+                assert _request(second, "POST", "/", "Text")[0] == 503
+            finally:
+                release.set()
+            executor.shutdown()
+            status, body = _request(second, "GET", "/health")
+            assert json.loads(body)["in_flight"] == 0
+
+    def test_unix_socket(self, tmp_path: pathlib.Path) -> None:
+        path = str(tmp_path / "markflowd.sock")
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        server = make_server(path, 1, executor=executor)
+        with _serving(server):
+            connection = _UnixConnection(path)
+            assert _request(connection, "POST", "/", "#  Heading\n") == (
+                200,
+                "# Heading\n",
+            )
+            connection.close()
+
+    def test_unix_socket_path_taken(self, tmp_path: pathlib.Path) -> None:
+        path = tmp_path / "markflowd.sock"
+        path.write_text("Not a socket")
+        with pytest.raises(FileExistsError):
+            make_server(str(path), 1)
+        assert path.read_text() == "Not a socket"
+
+    def test_too_large(self) -> None:
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        server = make_server(("127.0.0.1", 0), 1, executor=executor, max_body_size=8)
+        with _serving(server):
+            connection = _connect(server)
+            assert _request(connection, "POST", "/", "# Heading\n")[0] == 413
+            connection.close()
+            connection = _connect(server)
+            assert _request(connection, "POST", "/", "Text\n")[0] == 204
+            connection.close()
+
+    def test_slow_client(self) -> None:
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        server = make_server(("127.0.0.1", 0), 1, executor=executor)
+        old_timeout = _RequestHandler.timeout
+        _RequestHandler.timeout = 0.1
+        try:
+            with _serving(server):
+                client = socket.create_connection(
+                    cast(Tuple[str, int], server.server_address)
+                )
+                client.sendall(b"POST / HTTP/1.1\r\nContent-Length: 10\r\n\r\nText")
+                client.settimeout(5)
+                # The server gives up on the rest of the body and hangs up
+                assert client.recv(1024) == b""
+                client.close()
+        finally:
+            _RequestHandler.timeout = old_timeout
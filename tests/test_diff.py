@@ -0,0 +1,57 @@
+from typing import List
+
+import pytest
+
+from markflow._diff import unified_diff
+from markflow.reformat_markdown import _changed_sections
+
+
+def _diff(text: str, context: int = 3) -> str:
+    return unified_diff(
+        "README.md", text.splitlines(keepends=True), _changed_sections(text), context
+    )
+
+
+class TestUnifiedDiff:
+    def test_unchanged(self) -> None:
+        assert _diff("# Heading\n\nText\n") == ""
+
+    def test_sections(self) -> None:
+        text = "#  Heading\n\nOne\n\nTwo\n\nThree\n\nFour\n\n*  item\n"
+        assert _diff(text, 1) == (
+            "--- README.md\t(original)\n"
+            "+++ README.md\t(reformatted)\n"
+            "@@ -1,2 +1,2 @@\n"
+            "-#  Heading\n"
+            "+# Heading\n"
+            " \n"
+            "@@ -10,2 +10,2 @@\n"
+            " \n"
+            "-*  item\n"
+            "+* item\n"
+        )
+
+    def test_context_spans_sections(self) -> None:
+        # Context reaches into the sections around the ones that change
+        text = "# Heading\n\nText\nmore  text\n\nEnd\n"
+        assert _diff(text).splitlines()[2:] == [
+            "@@ -1,6 +1,5 @@",
+            " # Heading",
+            " ",
+            "-Text",
+            "-more  text",
+            "+Text more text",
+            " ",
+            " End",
+        ]
+
+    @pytest.mark.parametrize(
+        "text,hunk",
+        [
+            ("Text", ["@@ -1 +1 @@", "-Text", "\\ No newline at end of file", "+Text"]),
+            ("Text\n\n\n", ["@@ -1,3 +1 @@", " Text", "-", "-"]),
+            ("", ["@@ -0,0 +1 @@", "+"]),
+        ],
+    )
+    def test_end_of_file(self, text: str, hunk: List[str]) -> None:
+        assert _diff(text).splitlines()[2:] == hunk
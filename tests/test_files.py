@@ -5,7 +5,7 @@ from typing import DefaultDict, List, Optional
 
 import pytest
 
-from markflow import reformat_markdown_text
+from markflow import VerificationPolicy, reformat_markdown_text
 
 from .util import render
 
@@ -77,14 +77,13 @@ def get_file_pairs(directory: pathlib.Path) -> List[FilePair]:
     return sorted(list(file_pairs.values()), key=lambda f: f.input)
 
 
+FILE_PAIRS = get_file_pairs(
+    pathlib.Path(os.path.dirname(os.path.realpath(__file__))).resolve() / "files"
+)
+
+
 class TestFiles:
-    @pytest.mark.parametrize(
-        "file_pair",
-        get_file_pairs(
-            pathlib.Path(os.path.dirname(os.path.realpath(__file__))).resolve()
-            / "files"
-        ),
-    )
+    @pytest.mark.parametrize("file_pair", FILE_PAIRS)
     def test_files(self, file_pair: FilePair) -> None:
         if any(num in file_pair.input.name for num in MARKFLOW_BUG_FILES):
             pytest.xfail("Marking test xfail due to markflow bug.")
@@ -108,3 +107,22 @@ class TestFiles:
             logger.info("Skipping render check as our parsing differs from the spec.")
         else:
             assert render(output_text) == render(input_text)
+
+    @pytest.mark.parametrize("file_pair", FILE_PAIRS)
+    @pytest.mark.parametrize(
+        "verification",
+        [
+            VerificationPolicy.STRUCTURAL,
+            VerificationPolicy.SAMPLED,
+            VerificationPolicy.OFF,
+        ],
+    )
+    def test_verification_policies(
+        self, file_pair: FilePair, verification: VerificationPolicy
+    ) -> None:
+        input_text = file_pair.input.read_text()
+        output_text = file_pair.output.read_text()
+        reformatted = reformat_markdown_text(
+            input_text, verification=verification, sample_fraction=1
+        )
+        assert reformatted == output_text
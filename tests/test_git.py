@@ -0,0 +1,157 @@
+import contextlib
+import os
+import pathlib
+import re
+import subprocess
+from typing import Iterator
+
+import pytest
+
+from markflow._git import GitError, _parse_hunks, changed_markdown_files
+from markflow.reformat_markdown import (
+    _reformat_markdown_sections,
+    reformat_markdown_text,
+)
+
+
+@contextlib.contextmanager
+def _repository(path: pathlib.Path) -> Iterator[None]:
+    cwd = os.getcwd()
+    os.chdir(path)
+    try:
+        _run("init", "-q")
+        _run("config", "user.name", "MarkFlow")
+        _run("config", "user.email", "markflow@example.com")
+        yield
+    finally:
+        os.chdir(cwd)
+
+
+def _run(*args: str) -> None:
+    subprocess.run(["git", *args], check=True, stdout=subprocess.DEVNULL)
+
+
+def _commit(*paths: str) -> None:
+    _run("add", *paths)
+    _run("commit", "-q", "-m", "Commit")
+
+
+class TestParseHunks:
+    def test_hunks(self) -> None:
+        diff = (
+            b"diff --git a/README.md b/README.md\n"
+            b"index 1234567..89abcde 100644\n"
+            b"--- a/README.md\n"
+            b"+++ b/README.md\n"
+            b"@@ -2 +2 @@\n"
+            b"-Old\n"
+            b"+New\n"
+            b"@@ -10,2 +9,0 @@\n"
+            b"-Removed\n"
+            b"-Lines\n"
+            b"@@ -20,0 +19,3 @@\n"
+            b"+Three\n"
+            b"+Added\n"
+            b"+Lines\n"
+            b'diff --git "a/caf\\303\\251.md" "b/caf\\303\\251.md"\n'
+            b'--- "a/caf\\303\\251.md"\n'
+            b'+++ "b/caf\\303\\251.md"\n'
+            b"@@ -0,0 +1 @@\n"
+            b"+Text\n"
+        )
+        assert _parse_hunks(diff) == {
+            "README.md": [(1, 2), (8, 10), (18, 21)],
+            "café.md": [(0, 1)],
+        }
+
+
+class TestChangedMarkdownFiles:
+    def test_since(self, tmp_path: pathlib.Path) -> None:
+        with _repository(tmp_path):
+            for name in ["a.md", "b.md", "c.txt"]:
+                pathlib.Path(name).write_text("Text\n")
+            _commit(".")
+            pathlib.Path("a.md").write_text("Text\n\nMore text\n")
+            pathlib.Path("c.txt").write_text("More text\n")
+            pathlib.Path("d.md").write_text("New text\n")
+            assert changed_markdown_files([]) == {
+                pathlib.Path("a.md"): None,
+                pathlib.Path("d.md"): None,
+            }
+            assert changed_markdown_files([], line_ranges=True) == {
+                pathlib.Path("a.md"): [(1, 3)],
+                pathlib.Path("d.md"): None,
+            }
+
+    def test_path_with_space(self, tmp_path: pathlib.Path) -> None:
+        with _repository(tmp_path):
+            pathlib.Path("my doc.md").write_text("Text\n")
+            _commit(".")
+            pathlib.Path("my doc.md").write_text("Text\n\nMore  text\n")
+            assert changed_markdown_files([], line_ranges=True) == {
+                pathlib.Path("my doc.md"): [(1, 3)]
+            }
+
+    def test_staged(self, tmp_path: pathlib.Path) -> None:
+        with _repository(tmp_path):
+            pathlib.Path("a.md").write_text("Text\n")
+            _commit("a.md")
+            pathlib.Path("a.md").write_text("More text\n")
+            pathlib.Path("b.md").write_text("Text\n")
+            assert changed_markdown_files([], staged=True) == {}
+            _run("add", "a.md")
+            assert changed_markdown_files([], staged=True) == {
+                pathlib.Path("a.md"): None
+            }
+
+    def test_paths_and_excludes(self, tmp_path: pathlib.Path) -> None:
+        with _repository(tmp_path):
+            (tmp_path / "docs").mkdir()
+            for name in ["a.md", "docs/a.md", "docs/b.md"]:
+                pathlib.Path(name).write_text("Text\n")
+            _commit(".")
+            assert changed_markdown_files([], since="HEAD") == {}
+            for name in ["a.md", "docs/a.md", "docs/b.md"]:
+                pathlib.Path(name).write_text("More text\n")
+            assert list(
+                changed_markdown_files(
+                    [pathlib.Path("docs")], extend_exclude=re.compile("/b")
+                )
+            ) == [pathlib.Path("docs/a.md")]
+
+    def test_unknown_ref(self, tmp_path: pathlib.Path) -> None:
+        with _repository(tmp_path):
+            with pytest.raises(GitError, match="git diff failed"):
+                changed_markdown_files([], since="nonexistent")
+
+
+class TestReformatMarkdownSections:
+    def test_changed_sections(self) -> None:
+        text = "#  Heading\n\nText\nmore  text\n\n*  item\n"
+        assert _reformat_markdown_sections(text, [(3, 4)]) == (
+            "#  Heading\n\nText more text\n\n*  item\n"
+        )
+        assert _reformat_markdown_sections(text, [(0, 1), (5, 6)]) == (
+            "# Heading\n\nText\nmore  text\n\n* item\n"
+        )
+        assert _reformat_markdown_sections(text, []) == text
+
+    def test_link_reference_definition(self) -> None:
+        # The definition is only parsed as one when followed by the next, so it can
+        # only be verified as part of the whole document
+        text = (
+            "See [a] and [b].\n\n"
+            "[a]:   https://example.com/a\n"
+            "[b]: https://example.com/b\n"
+        )
+        assert _reformat_markdown_sections(text, [(2, 3)]) == (
+            "See [a] and [b].\n\n"
+            "[a]: https://example.com/a\n"
+            "[b]: https://example.com/b\n"
+        )
+
+    def test_all_sections(self) -> None:
+        text = "#  Heading\nText\n*  item\n\n\n"
+        assert _reformat_markdown_sections(text, [(0, 6)]) == reformat_markdown_text(
+            text
+        )
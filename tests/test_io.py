@@ -0,0 +1,86 @@
+import codecs
+import mmap
+import os
+import pathlib
+import stat
+
+import pytest
+
+from markflow._io import MMAP_THRESHOLD, EncodedText, read_bytes, write_file
+
+
+class TestEncodedText:
+    def test_utf8(self) -> None:
+        text = EncodedText("Café\n".encode())
+        assert (text.text, text.encoding, text.bom, text.newline) == (
+            "Café\n",
+            "utf-8",
+            b"",
+            "\n",
+        )
+        assert text.encode("Tea\n") == b"Tea\n"
+
+    @pytest.mark.parametrize("newline", ["\r\n", "\r"])
+    def test_newlines(self, newline: str) -> None:
+        text = EncodedText(f"# Heading{newline}{newline}Text\n".encode())
+        assert text.text == "# Heading\n\nText\n"
+        assert text.newline == newline
+        # Every line ends the same way once it is encoded again
+        assert text.differs(text.text)
+        assert not EncodedText(f"Text{newline}".encode()).differs("Text\n")
+        encoded = f"# Heading{newline}{newline}Text{newline}".encode()
+        assert text.encode(text.text) == encoded
+
+    @pytest.mark.parametrize(
+        "bom,encoding",
+        [
+            (codecs.BOM_UTF8, "utf-8"),
+            (codecs.BOM_UTF16_LE, "utf-16-le"),
+            (codecs.BOM_UTF16_BE, "utf-16-be"),
+            (codecs.BOM_UTF32_LE, "utf-32-le"),
+        ],
+    )
+    def test_byte_order_marks(self, bom: bytes, encoding: str) -> None:
+        data = bom + "#  Heading\r\n".encode(encoding)
+        text = EncodedText(data)
+        assert text.text == "#  Heading\n"
+        assert text.encode() == data
+        assert text.encode("# Heading\n") == bom + "# Heading\r\n".encode(encoding)
+
+
+class TestReadBytes:
+    def test_mmap(self, tmp_path: pathlib.Path) -> None:
+        path = tmp_path / "file.md"
+        path.write_bytes(b"Text\r\n")
+        with read_bytes(path) as data:
+            assert isinstance(data, bytes)
+        path.write_bytes(b"Text\r\n" * (MMAP_THRESHOLD // 6 + 1))
+        with read_bytes(path) as data:
+            assert isinstance(data, mmap.mmap)
+            assert EncodedText(data).text == "Text\n" * (MMAP_THRESHOLD // 6 + 1)
+
+
+class TestWriteFile:
+    def test_unchanged(self, tmp_path: pathlib.Path) -> None:
+        path = tmp_path / "file.md"
+        path.write_bytes(b"Text\n")
+        os.utime(str(path), (0, 0))
+        assert not write_file(path, b"Text\n")
+        assert path.stat().st_mtime == 0
+
+    def test_changed(self, tmp_path: pathlib.Path) -> None:
+        path = tmp_path / "file.md"
+        path.write_bytes(b"Text\n")
+        path.chmod(0o640)
+        link = tmp_path / "link.md"
+        link.symlink_to(path)
+        assert write_file(link, b"Other\n")
+        assert path.read_bytes() == b"Other\n"
+        assert stat.S_IMODE(path.stat().st_mode) == 0o640
+        assert link.is_symlink()
+        assert sorted(tmp_path.iterdir()) == [path, link]
+
+    def test_new_file(self, tmp_path: pathlib.Path) -> None:
+        path = tmp_path / "file.md"
+        assert write_file(path, b"Text\n")
+        assert path.read_bytes() == b"Text\n"
@@ -0,0 +1,66 @@
+import pathlib
+
+import pytest
+
+from markflow import VerificationPolicy
+from markflow._cache import ContentCache
+from markflow._jobs import reformat_file, reformat_files
+
+
+class TestReformatFiles:
+    @pytest.mark.parametrize("jobs", [1, 3])
+    def test_order(self, tmp_path: pathlib.Path, jobs: int) -> None:
+        contents = ["#  Small\n", "Text\n", "*  " + "Large " * 100 + "\n"]
+        paths = []
+        for i, text in enumerate(contents):
+            path = tmp_path / f"{i}.md"
+            path.write_text(text)
+            paths.append(path)
+        results = reformat_files(paths, 88, VerificationPolicy.FULL, 0.1, jobs)
+        assert [result.changed for result in results] == [True, False, True]
+
+    @pytest.mark.parametrize("jobs", [1, 2])
+    def test_first_error_is_raised(self, tmp_path: pathlib.Path, jobs: int) -> None:
+        paths = [tmp_path / "missing.md", tmp_path / "also_missing.md"]
+        (tmp_path / "ok.md").write_text("Text\n")
+        paths.insert(0, tmp_path / "ok.md")
+        results = reformat_files(paths, 88, VerificationPolicy.FULL, 0.1, jobs)
+        assert next(results)[:3] == (False, b"Text\n", None)
+        with pytest.raises(FileNotFoundError, match="missing.md"):
+            next(results)
+
+
+class TestReformatFile:
+    def test_check(self, tmp_path: pathlib.Path) -> None:
+        path = tmp_path / "file.md"
+        path.write_text("# Heading\n\nText\n\n*  item\n")
+        result = reformat_file(path, 88, VerificationPolicy.FULL, 0.1, check=True)
+        assert result[:3] == (True, None, 4)
+        path.write_text("# Heading\r\n\r\nText\n")
+        result = reformat_file(path, 88, VerificationPolicy.FULL, 0.1, check=True)
+        assert result[:3] == (True, None, 2)
+        assert result.duration >= 0
+
+    def test_diff(self, tmp_path: pathlib.Path) -> None:
+        path = tmp_path / "file.md"
+        path.write_text("# Heading\n\n*  item\n")
+        result = reformat_file(path, 88, VerificationPolicy.FULL, 0.1, diff=True)
+        assert result[:3] == (True, None, 2)
+        assert result.diff is not None
+        assert result.diff.splitlines()[-2:] == ["-*  item", "+* item"]
+
+    def test_content_cache(self, tmp_path: pathlib.Path) -> None:
+        cache = ContentCache(88, VerificationPolicy.FULL, "1.0", tmp_path / "cache")
+        path = tmp_path / "file.md"
+        path.write_text("#  Heading\r\n")
+        result = reformat_file(path, 88, VerificationPolicy.FULL, 0.1, cache)
+        assert result[:3] == (True, b"# Heading\r\n", 0)
+        assert cache.get(cache.key(path.read_bytes())) == (True, "# Heading\n")
+
+        # Cached results are used as they are
+        cache.set(cache.key(path.read_bytes()), "Cached\n")
+        result = reformat_file(path, 88, VerificationPolicy.FULL, 0.1, cache)
+        assert result[:3] == (True, b"Cached\r\n", 0)
+        cache.set(cache.key(path.read_bytes()), None)
+        result = reformat_file(path, 88, VerificationPolicy.FULL, 0.1, cache)
+        assert result[:3] == (False, b"#  Heading\r\n", None)
@@ -0,0 +1,219 @@
+import io
+import json
+from typing import Any, Dict, List
+
+from markflow._lsp import UTF16, UTF32, Document, LanguageServer, serve
+from markflow.parser import parse_markdown_spans
+from markflow.reformat_markdown import reformat_markdown_text
+
+URI = "file:///README.md"
+
+
+def _range(
+    start_line: int, start_character: int, end_line: int, end_character: int
+) -> Dict[str, Dict[str, int]]:
+    return {
+        "start": {"line": start_line, "character": start_character},
+        "end": {"line": end_line, "character": end_character},
+    }
+
+
+def _open(text: str, encodings: List[str] = [UTF16]) -> LanguageServer:
+    server = LanguageServer()
+    server.handle(
+        {
+            "jsonrpc": "2.0",
+            "id": 0,
+            "method": "initialize",
+            "params": {"capabilities": {"general": {"positionEncodings": encodings}}},
+        }
+    )
+    server.handle(
+        {
+            "jsonrpc": "2.0",
+            "method": "textDocument/didOpen",
+            "params": {
+                "textDocument": {
+                    "uri": URI,
+                    "languageId": "markdown",
+                    "version": 1,
+                    "text": text,
+                }
+            },
+        }
+    )
+    return server
+
+
+def _request(server: LanguageServer, method: str, **params: Any) -> Any:
+    params["textDocument"] = {"uri": URI}
+    response = server.handle(
+        {"jsonrpc": "2.0", "id": 1, "method": method, "params": params}
+    )
+    assert response is not None
+    return response.get("result", response.get("error"))
+
+
+def _apply(text: str, edits: List[Dict[str, Any]]) -> str:
+    document = Document(text)
+    for edit in reversed(edits):
+        document.change(edit["newText"], edit["range"])
+    return document.text
+
+
+class TestDocument:
+    def test_change(self) -> None:
+        document = Document("# Heading\n\nA paragraph\n")
+        document.change("More\n", _range(3, 0, 3, 0))
+        document.change("paragraph\n- list", _range(2, 2, 2, 11))
+        assert document.text == "# Heading\n\nA paragraph\n- list\nMore\n"
+        assert document.spans == parse_markdown_spans(document.text.splitlines())
+
+    def test_change_before_section(self) -> None:
+        # Closing the title turns what were paragraphs into a link reference
+        # definition
+        text = '[a]: /url "Title\n\nText\n\nMore text\n'
+        document = Document(text)
+        document.change('"', _range(4, 9, 4, 9))
+        assert document.spans == parse_markdown_spans(document.text.splitlines())
+
+    def test_change_whole_document(self) -> None:
+        document = Document("Text\n")
+        document.change("# Heading\n")
+        assert document.text == "# Heading\n"
+        assert document.spans == parse_markdown_spans(["# Heading"])
+
+    def test_change_utf16(self) -> None:
+        # The emoji takes up two UTF-16 code units
+        document = Document("\U0001F600 text\n")
+        document.change("", _range(0, 2, 0, 3), UTF16)
+        assert document.text == "\U0001F600text\n"
+        document.change("", _range(0, 0, 0, 1), UTF32)
+        assert document.text == "text\n"
+
+    def test_reformat(self) -> None:
+        text = "#  Heading\nText\n*  item\n\n\n"
+        document = Document(text)
+        reformatted = "".join(
+            line + "\n" for _, _, lines in document.reformat() for line in lines
+        )
+        assert reformatted == reformat_markdown_text(text)
+
+
+class TestLanguageServer:
+    def test_initialize(self) -> None:
+        server = _open("", [UTF16, UTF32])
+        assert server.position_encoding == UTF32
+
+    def test_formatting(self) -> None:
+        text = "#  Heading\n\nText\n\n*  item\n"
+        server = _open(text)
+        edits = _request(server, "textDocument/formatting", options={})
+        assert edits == [
+            {"range": _range(0, 0, 1, 0), "newText": "# Heading\n"},
+            {"range": _range(4, 0, 5, 0), "newText": "* item\n"},
+        ]
+        assert _apply(text, edits) == reformat_markdown_text(text)
+
+    def test_range_formatting(self) -> None:
+        text = "#  Heading\n\nText\n\n*  item\n"
+        server = _open(text)
+        edits = _request(
+            server, "textDocument/rangeFormatting", range=_range(3, 0, 4, 2), options={}
+        )
+        assert edits == [{"range": _range(4, 0, 5, 0), "newText": "* item\n"}]
+
+    def test_formatting_after_change(self) -> None:
+        server = _open("# Heading\n\nText\n")
+        assert _request(server, "textDocument/formatting", options={}) == []
+        server.handle(
+            {
+                "jsonrpc": "2.0",
+                "method": "textDocument/didChange",
+                "params": {
+                    "textDocument": {"uri": URI, "version": 2},
+                    "contentChanges": [{"range": _range(2, 4, 2, 4), "text": "  "}],
+                },
+            }
+        )
+        assert _request(server, "textDocument/formatting", options={}) == [
+            {"range": _range(2, 0, 3, 0), "newText": "Text\n"}
+        ]
+
+    def test_errors(self) -> None:
+        server = _open("")
+        assert _request(server, "textDocument/hover")["code"] == -32601
+        server.documents.clear()
+        assert _request(server, "textDocument/formatting")["code"] == -32602
+
+    def test_formatting_link_reference_definitions(self) -> None:
+        # The first definition is only parsed as one when followed by the second
+        text = (
+            "See [a] and [b].\n\n"
+            "[a]: https://example.com/a\n"
+            "[b]: https://example.com/b\n"
+        )
+        server = _open(text)
+        assert _request(server, "textDocument/formatting", options={}) == []
+
+    def test_formatting_failure(self) -> None:
+        server = _open("# Heading\n\n```\n")
+        error = _request(server, "textDocument/formatting", options={})
+        assert error["code"] == -32803
+
+    def test_failed_change(self) -> None:
+        server = _open("[r]:\n")
+        server.handle(
+            {
+                "jsonrpc": "2.0",
+                "method": "textDocument/didChange",
+                "params": {
+                    "textDocument": {"uri": URI, "version": 2},
+                    "contentChanges": [
+                        {"range": _range(1, 0, 1, 0), "text": "Text\n"},
+                        {"range": _range(2, 0, 2, 0), "text": "|--"},
+                    ],
+                },
+            }
+        )
+        # None of the changes are made if one of them fails
+        assert server.documents[URI].text == "[r]:\n"
+
+
+def _message(message: Dict[str, Any]) -> bytes:
+    body = json.dumps(message).encode("utf-8")
+    return f"Content-Length: {len(body)}\r\n\r\n".encode("ascii") + body
+
+
+class TestServe:
+    def test_session(self) -> None:
+        stdin = io.BytesIO(
+            _message({"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {}})
+            + _message({"jsonrpc": "2.0", "method": "initialized", "params": {}})
+            + _message({"jsonrpc": "2.0", "id": 2, "method": "shutdown"})
+            + _message({"jsonrpc": "2.0", "method": "exit"})
+        )
+        stdout = io.BytesIO()
+        assert serve(stdin, stdout) == 0
+        responses = stdout.getvalue().split(b"Content-Length: ")[1:]
+        assert len(responses) == 2
+        assert json.loads(responses[1].split(b"\r\n\r\n", 1)[1]) == {
+            "jsonrpc": "2.0",
+            "id": 2,
+            "result": None,
+        }
+
+    def test_invalid_message(self) -> None:
+        stdin = io.BytesIO(
+            b"Content-Length: 1\r\n\r\n{"
+            + _message({"jsonrpc": "2.0", "id": 1, "method": "shutdown"})
+            + _message({"jsonrpc": "2.0", "method": "exit"})
+        )
+        stdout = io.BytesIO()
+        assert serve(stdin, stdout) == 1
+        # The shutdown request is refused since the server was never initialized
+        assert b'"code": -32002' in stdout.getvalue()
+
+    def test_exit_without_shutdown(self) -> None:
+        stdin = io.BytesIO(_message({"jsonrpc": "2.0", "method": "exit"}))
+        assert serve(stdin, io.BytesIO()) == 1
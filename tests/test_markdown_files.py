@@ -0,0 +1,98 @@
+import pathlib
+import re
+from typing import List
+
+from markflow._files import MarkdownFiles
+
+
+def _make_tree(root: pathlib.Path, paths: List[str]) -> None:
+    for path in paths:
+        (root / path).parent.mkdir(parents=True, exist_ok=True)
+        (root / path).write_text("Text\n")
+
+
+def _relative(root: pathlib.Path, files: MarkdownFiles) -> List[str]:
+    return [path.relative_to(root).as_posix() for path in files]
+
+
+class TestMarkdownFiles:
+    def test_walk(self, tmp_path: pathlib.Path) -> None:
+        _make_tree(
+            tmp_path,
+            [
+                "b.md",
+                "a.md",
+                "notes.txt",
+                "docs/c.md",
+                "docs/build/d.md",
+                "node_modules/package/e.md",
+                ".hidden/f.md",
+            ],
+        )
+        assert _relative(tmp_path, MarkdownFiles([tmp_path])) == [
+            "a.md",
+            "b.md",
+            "docs/c.md",
+        ]
+
+    def test_exclude(self, tmp_path: pathlib.Path) -> None:
+        _make_tree(tmp_path, ["a.md", "docs/b.md", "build/c.md", "other/docs.md"])
+        files = MarkdownFiles([tmp_path], extend_exclude=re.compile(r"/docs/"))
+        assert _relative(tmp_path, files) == ["a.md", "other/docs.md"]
+        files = MarkdownFiles([tmp_path], exclude=re.compile(r"^/a\.md$"))
+        assert _relative(tmp_path, files) == [
+            "build/c.md",
+            "docs/b.md",
+            "other/docs.md",
+        ]
+
+    def test_gitignore(self, tmp_path: pathlib.Path) -> None:
+        _make_tree(
+            tmp_path,
+            [
+                "a.md",
+                "generated/b.md",
+                "sub/c.md",
+                "sub/generated.md",
+                "sub/deep/d.md",
+                "sub/deep/keep.md",
+                "sub/deep/generated/e.md",
+            ],
+        )
+        (tmp_path / ".gitignore").write_text("# Comment\ngenerated/\n/a.md\n")
+        (tmp_path / "sub" / ".gitignore").write_text("deep/*.md\n!deep/keep.md\n")
+        assert _relative(tmp_path, MarkdownFiles([tmp_path])) == [
+            "sub/c.md",
+            "sub/generated.md",
+            "sub/deep/keep.md",
+        ]
+        files = MarkdownFiles([tmp_path], use_gitignore=False)
+        assert len(list(files)) == 7
+
+    def test_gitignore_above_directory(self, tmp_path: pathlib.Path) -> None:
+        _make_tree(tmp_path, ["docs/a.md", "docs/gen/b.md", "docs/sub/gen.md"])
+        (tmp_path / ".git").mkdir()
+        (tmp_path / ".gitignore").write_text("gen/\n/docs/sub/\n")
+        assert _relative(tmp_path, MarkdownFiles([tmp_path / "docs"])) == ["docs/a.md"]
+        # Above the repository, they aren't read
+        (tmp_path / ".git").rmdir()
+        (tmp_path / "docs" / ".git").mkdir()
+        assert _relative(tmp_path, MarkdownFiles([tmp_path / "docs"])) == [
+            "docs/a.md",
+            "docs/gen/b.md",
+            "docs/sub/gen.md",
+        ]
+
+    def test_glob_patterns(self, tmp_path: pathlib.Path) -> None:
+        _make_tree(
+            tmp_path, ["a1.md", "a22.md", "b.md", "x/y/abc.md", "x/abc.md", "x/w.md"]
+        )
+        (tmp_path / ".gitignore").write_text("a?.md\n[!a]*.md\nx/**/abc.md\n")
+        assert _relative(tmp_path, MarkdownFiles([tmp_path])) == ["a22.md"]
+
+    def test_files_are_always_included(self, tmp_path: pathlib.Path) -> None:
+        _make_tree(tmp_path, ["build/a.md"])
+        (tmp_path / ".gitignore").write_text("*.md\n")
+        path = tmp_path / "build" / "a.md"
+        assert list(MarkdownFiles([path])) == [path]
+        assert not MarkdownFiles([])
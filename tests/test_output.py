@@ -0,0 +1,57 @@
+import textwrap
+
+from markflow.formatters import MarkdownBlockQuote, MarkdownBulletList, MarkdownOutput
+from markflow.parser import parse_markdown_tree
+
+
+class TestMarkdownOutput:
+    def test_nested_prefixes(self) -> None:
+        output = MarkdownOutput()
+        output.write("Before")
+        output.push_list_entry("* ", 2)
+        output.write("Entry\nContinued")
+        output.push_block_quote("> ")
+        output.write("Quoted\n")
+        output.pop()
+        output.pop()
+        output.push_list_entry("* ", 2)
+        output.pop()
+        assert output.lines == [
+            "Before",
+            "* Entry",
+            "  Continued",
+            "  > Quoted",
+            "  >",
+            "* ",
+        ]
+
+    def test_list_entry_drops_trailing_blank_lines(self) -> None:
+        output = MarkdownOutput()
+        output.push_list_entry("1. ", 3)
+        output.write("\nEntry\n\n")
+        output.pop()
+        assert output.lines == ["1. ", "   Entry"]
+
+    def test_write_lines(self) -> None:
+        output = MarkdownOutput()
+        output.push_block_quote("> ")
+        output.write_lines(["Quoted", ""])
+        output.pop()
+        assert output.lines == ["> Quoted", ">"]
+
+
+class TestWrite:
+    def test_uses_parsed_contents(self) -> None:
+        lines = textwrap.dedent(
+            """\
+            * Entry
+              > Quoted
+            * Second"""
+        ).splitlines()
+        (node,) = parse_markdown_tree(lines)
+        list_ = MarkdownBulletList(node.line_index, node.lines, node.contents)
+        assert list_.reformatted() == "\n".join(lines)
+
+    def test_parses_contents(self) -> None:
+        block_quote = MarkdownBlockQuote(0, ["> * Entry", "> continued"])
+        assert block_quote.reformatted() == "> * Entry continued"
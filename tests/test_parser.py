@@ -0,0 +1,289 @@
+import io
+import logging
+import textwrap
+from typing import Iterator, List
+
+from markflow.detectors import (
+    scan_paragraph,
+    scan_paragraph_or_setext_heading,
+    scan_setext_heading,
+    split_paragraph,
+)
+from markflow.detectors._lines import (
+    BLANK,
+    BULLET_LIST_START,
+    CLOSING_FENCE,
+    FENCED_CODE_BLOCK_START,
+    INDENTED_CODE_BLOCK_START,
+    PARAGRAPH_START,
+    SETEXT_UNDERLINE,
+    THEMATIC_BREAK,
+    LineTable,
+)
+from markflow.parser import (
+    IncrementalParser,
+    MarkdownSectionEnum,
+    MarkdownSectionNode,
+    parse_markdown,
+    parse_markdown_spans,
+    parse_markdown_stream,
+    parse_markdown_tree,
+)
+
+
+class TestParseMarkdownSpans:
+    def test_spans(self) -> None:
+        lines = textwrap.dedent(
+            """\
+            # Heading
+
+            Some paragraph
+            text
+            > A quote"""
+        ).splitlines()
+        expected = [
+            (MarkdownSectionEnum.ATX_HEADING, 0, 1),
+            (MarkdownSectionEnum.BLANK_LINE, 1, 2),
+            (MarkdownSectionEnum.PARAGRAPH, 2, 4),
+            (MarkdownSectionEnum.BLOCK_QUOTE, 4, 5),
+        ]
+        assert parse_markdown_spans(lines) == expected
+        assert parse_markdown(lines) == [
+            (section_type, lines[start:end]) for section_type, start, end in expected
+        ]
+
+    def test_scan_matches_split(self) -> None:
+        lines = ["# Heading", "Some paragraph", "text", "", "More text"]
+        table = LineTable(lines)
+        assert scan_paragraph(table, 0) == 0
+        assert scan_paragraph(table, 1) == 3
+        assert split_paragraph(lines[1:]) == (lines[1:3], lines[3:])
+
+    def test_paragraph_and_setext_share_scan(self) -> None:
+        table = LineTable(["Title", "text", "=====", "Paragraph"])
+        assert scan_paragraph(table, 0) == 0
+        assert table.paragraph_scans == {0: (3, True)}
+        assert scan_setext_heading(table, 0) == 3
+        assert scan_paragraph_or_setext_heading(table, 3) == (4, False)
+
+    def test_debug_reports_skipped_scanners(self) -> None:
+        messages: List[str] = []
+
+        class ListHandler(logging.Handler):
+            def emit(self, record: logging.LogRecord) -> None:
+                messages.append(record.getMessage())
+
+        parser_logger = logging.getLogger("markflow.parser")
+        handler = ListHandler()
+        old_level = parser_logger.level
+        parser_logger.addHandler(handler)
+        parser_logger.setLevel(logging.DEBUG)
+        try:
+            parse_markdown_spans(["Some paragraph"])
+        finally:
+            parser_logger.removeHandler(handler)
+            parser_logger.setLevel(old_level)
+        assert (
+            "Line 1: Skipped ATX Heading, Blank Line, Block Quote, Bullet List, "
+            "Fenced Code Block, Indented Code Block, Link Reference Definition, "
+            "Ordered List"
+        ) in messages
+
+    def test_ambiguous_start_tries_every_scanner(self) -> None:
+        lines = ["=== not a heading", "---"]
+        assert parse_markdown_spans(lines) == [
+            (MarkdownSectionEnum.SETEXT_HEADING, 0, 2)
+        ]
+
+    def test_trailing_hard_break(self) -> None:
+        lines = ["Some paragraph", "text with a hard break  "]
+        assert parse_markdown_spans(lines) == [(MarkdownSectionEnum.PARAGRAPH, 0, 2)]
+
+
+class TestLineTable:
+    def test_flags(self) -> None:
+        table = LineTable(["  ", "text", "- - -", "---", "````", "  ```` ", "    code"])
+        assert table.flags[0] == BLANK
+        assert table.flags[1] == PARAGRAPH_START
+        assert table.flags[2] == BULLET_LIST_START | THEMATIC_BREAK
+        assert table.flags[3] == THEMATIC_BREAK | SETEXT_UNDERLINE
+        assert table.flags[4] == FENCED_CODE_BLOCK_START | CLOSING_FENCE
+        assert table.flags[5] == FENCED_CODE_BLOCK_START | CLOSING_FENCE
+        assert table.flags[6] == INDENTED_CODE_BLOCK_START
+        assert list(table.fence_lengths) == [0, 0, 0, 0, 4, 4, 0]
+        assert list(table.indents) == [2, 0, 0, 0, 0, 2, 4]
+        assert table.first_chars == " t--``c"
+
+    def test_paragraph_ends(self) -> None:
+        table = LineTable(["text", "break  ", "text", "text", "# Heading", "text"])
+        assert list(table.paragraph_ends) == [2, 2, 4, 4, 4, 6, 6]
+
+
+class TestIncrementalParser:
+    def test_matches_parse_markdown_spans(self) -> None:
+        lines = textwrap.dedent(
+            """\
+            > Quote
+            > > Nested
+            lazy continuation
+            > ```
+            > code
+            Title
+            =====
+                code
+                more code
+
+            [label]: /url
+            'title'
+            * List
+            ```
+            unclosed"""
+        ).splitlines()
+        parser = IncrementalParser()
+        spans = []
+        for line in lines:
+            spans += parser.feed(line)
+        spans += parser.close()
+        assert spans == parse_markdown_spans(lines)
+
+    def test_sections_close_early(self) -> None:
+        parser = IncrementalParser()
+        assert parser.feed("# Heading") == [(MarkdownSectionEnum.ATX_HEADING, 0, 1)]
+        assert parser.feed("Some") == []
+        assert parser.feed("paragraph") == []
+        assert parser.feed("") == [
+            (MarkdownSectionEnum.PARAGRAPH, 1, 3),
+            (MarkdownSectionEnum.BLANK_LINE, 3, 4),
+        ]
+
+    def test_ends_with_paragraph(self) -> None:
+        parser = IncrementalParser()
+        parser.feed("> ```")
+        assert not parser.ends_with_paragraph()
+        parser.feed("> ```")
+        parser.feed("> text")
+        assert parser.ends_with_paragraph()
+        parser.feed("---")
+        assert not parser.ends_with_paragraph()
+
+
+def _tree_summary(nodes: List[MarkdownSectionNode]) -> List[object]:
+    return [
+        (
+            node.section_type,
+            node.line_index,
+            [_tree_summary(content) for content in node.contents],
+        )
+        for node in nodes
+    ]
+
+
+class TestParseMarkdownTree:
+    def test_matches_parse_markdown_spans(self) -> None:
+        lines = textwrap.dedent(
+            """\
+            # Heading
+
+            > quoted
+            lazily
+
+            * entry
+            1. entry"""
+        ).splitlines()
+        tree = parse_markdown_tree(lines, 3)
+        spans = []
+        for node in tree:
+            start = node.line_index - 3
+            spans.append((node.section_type, start, start + len(node.lines)))
+        assert spans == parse_markdown_spans(lines)
+        assert [node.lines for node in tree] == [
+            lines[start:end] for _, start, end in parse_markdown_spans(lines)
+        ]
+
+    def test_nesting(self) -> None:
+        lines = textwrap.dedent(
+            """\
+            * entry
+              > quoted
+              > * nested
+            * second
+              ======"""
+        ).splitlines()
+        assert _tree_summary(parse_markdown_tree(lines)) == [
+            (
+                MarkdownSectionEnum.BULLET_LIST,
+                0,
+                [
+                    [
+                        (MarkdownSectionEnum.PARAGRAPH, 0, []),
+                        (
+                            MarkdownSectionEnum.BLOCK_QUOTE,
+                            1,
+                            [
+                                [
+                                    (MarkdownSectionEnum.PARAGRAPH, 1, []),
+                                    (
+                                        MarkdownSectionEnum.BULLET_LIST,
+                                        2,
+                                        [[(MarkdownSectionEnum.PARAGRAPH, 2, [])]],
+                                    ),
+                                ]
+                            ],
+                        ),
+                    ],
+                    [(MarkdownSectionEnum.SETEXT_HEADING, 3, [])],
+                ],
+            )
+        ]
+
+    def test_deep_nesting(self) -> None:
+        depth = 300
+        lines = ["  " * level + "* entry" for level in range(depth)]
+        nodes = parse_markdown_tree(lines)
+        for level in range(depth):
+            assert len(nodes) == 1
+            assert nodes[0].section_type == MarkdownSectionEnum.BULLET_LIST
+            assert nodes[0].line_index == level
+            nodes = nodes[0].contents[0]
+            if level < depth - 1:
+                nodes = nodes[1:]
+        assert nodes[0].section_type == MarkdownSectionEnum.PARAGRAPH
+
+    def test_tab_before_quote_marker(self) -> None:
+        assert _tree_summary(parse_markdown_tree(["\t> quoted"])) == [
+            (
+                MarkdownSectionEnum.BLOCK_QUOTE,
+                0,
+                [[(MarkdownSectionEnum.PARAGRAPH, 0, [])]],
+            )
+        ]
+
+
+class TestParseMarkdownStream:
+    def test_matches_parse_markdown_tree(self) -> None:
+        text = "# Heading\n\n> quoted\nlazily\n\n* entry\n  > nested\n1. entry\n"
+        assert _tree_summary(list(parse_markdown_stream(io.StringIO(text), 2))) == (
+            _tree_summary(parse_markdown_tree(text.splitlines(), 2))
+        )
+
+    def test_sections_are_produced_early(self) -> None:
+        read: List[str] = []
+
+        def lines() -> Iterator[str]:
+            for line in ["# Heading", "Text", "", "More text"]:
+                read.append(line)
+                yield line
+
+        stream = parse_markdown_stream(lines())
+        assert next(stream).lines == ["# Heading"]
+        assert read == ["# Heading"]
+        assert next(stream).lines == ["Text"]
+        assert read == ["# Heading", "Text", ""]
+
+    def test_line_splitting(self) -> None:
+        nodes = list(parse_markdown_stream(["Text\r\n", "", "More\ntext"]))
+        assert [(node.section_type, node.lines) for node in nodes] == [
+            (MarkdownSectionEnum.PARAGRAPH, ["Text"]),
+            (MarkdownSectionEnum.BLANK_LINE, [""]),
+            (MarkdownSectionEnum.PARAGRAPH, ["More", "text"]),
+        ]
@@ -0,0 +1,118 @@
+import io
+from typing import Optional
+
+import pytest
+
+from markflow import (
+    VerificationPolicy,
+    reformat_markdown_stream,
+    reformat_markdown_text,
+)
+from markflow.exceptions import ReformatInconsistentException
+from markflow.parser import MarkdownSectionEnum
+from markflow.reformat_markdown import (
+    _changed_sections,
+    _first_changed_line,
+    _reformat_markdown_lines,
+    _verify_structure,
+)
+
+
+class TestVerification:
+    def test_written_spans(self) -> None:
+        lines, spans = _reformat_markdown_lines("> Quote\nHeading\n===\n\n*  Entry\n")
+        assert lines == ["> Quote", "", "Heading", "=======", "", "* Entry"]
+        # The blank line before the setext heading is added while reformatting
+        assert spans == [
+            (MarkdownSectionEnum.BLOCK_QUOTE, 0, 1),
+            (MarkdownSectionEnum.BLANK_LINE, 1, 2),
+            (MarkdownSectionEnum.SETEXT_HEADING, 2, 4),
+            (MarkdownSectionEnum.BLANK_LINE, 4, 5),
+            (MarkdownSectionEnum.BULLET_LIST, 5, 6),
+        ]
+
+    def test_structure_mismatch(self) -> None:
+        lines = ["# Heading", "Text"]
+        _verify_structure(
+            lines,
+            [
+                (MarkdownSectionEnum.ATX_HEADING, 0, 1),
+                (MarkdownSectionEnum.PARAGRAPH, 1, 2),
+            ],
+            88,
+            0,
+        )
+        with pytest.raises(ReformatInconsistentException):
+            _verify_structure(lines, [(MarkdownSectionEnum.PARAGRAPH, 0, 2)], 88, 0)
+
+    def test_sampled_sections_are_reformatted(self) -> None:
+        lines = ["#  Heading"]
+        spans = [(MarkdownSectionEnum.ATX_HEADING, 0, 1)]
+        _verify_structure(lines, spans, 88, 0)
+        with pytest.raises(ReformatInconsistentException):
+            _verify_structure(lines, spans, 88, 1)
+
+    def test_invalid_sample_fraction(self) -> None:
+        with pytest.raises(ValueError):
+            reformat_markdown_text(
+                "Text", verification=VerificationPolicy.SAMPLED, sample_fraction=2
+            )
+
+
+class TestReformatMarkdownStream:
+    TEXT = "# Heading\nText\n\n> Quote\nHeading\n===\n\n*  Entry\n\n\n"
+
+    @pytest.mark.parametrize("verification", list(VerificationPolicy))
+    def test_matches_reformat_markdown_text(
+        self, verification: VerificationPolicy
+    ) -> None:
+        expected = reformat_markdown_text(self.TEXT, 20)
+        stream = reformat_markdown_stream(
+            io.StringIO(self.TEXT), 20, verification=verification
+        )
+        assert "".join(stream) == expected
+        lines = self.TEXT.splitlines()
+        assert "".join(reformat_markdown_stream(lines, 20)) == expected
+
+    @pytest.mark.parametrize("verification", list(VerificationPolicy))
+    def test_link_reference_definitions(self, verification: VerificationPolicy) -> None:
+        # The first definition is only parsed as one when followed by the second
+        text = (
+            "See [a] and [b].\n\n"
+            "[a]: https://example.com/a\n"
+            "[b]: https://example.com/b\n"
+        )
+        stream = reformat_markdown_stream(io.StringIO(text), verification=verification)
+        assert "".join(stream) == reformat_markdown_text(text) == text
+
+    def test_following_lines_are_verified_with(self) -> None:
+        lines = ["[a]: https://example.com/a"]
+        spans = [(MarkdownSectionEnum.LINK_REFERENCE_DEFINITION, 0, 1)]
+        with pytest.raises(ReformatInconsistentException):
+            _verify_structure(lines, spans, 88, 0)
+        _verify_structure(lines, spans, 88, 0, ["[b]: https://example.com/b"])
+
+    def test_empty(self) -> None:
+        assert "".join(reformat_markdown_stream([])) == reformat_markdown_text("")
+        assert "".join(reformat_markdown_stream(["", " "])) == "\n"
+
+
+class TestFirstChangedLine:
+    @pytest.mark.parametrize(
+        "text,line",
+        [
+            ("# Heading\n\nText\n", None),
+            ("# Heading\n\nText\nmore  text\n\n*  Entry\n", 2),
+            ("Text\n\n#  Heading\n", 2),
+            # Only the end of the document changes
+            ("# Heading\n\nText\n\n\n", 3),
+            ("# Heading\n\nText", 2),
+            ("", 0),
+        ],
+    )
+    def test_first_changed_line(self, text: str, line: Optional[int]) -> None:
+        assert _first_changed_line(_changed_sections(text)) == line
+
+    def test_falls_back_to_whole_document(self) -> None:
+        # The reformatted list entry isn't parsed the same way on its own
+        assert _first_changed_line(_changed_sections("1.\n[a]: /url")) == 0
@@ -0,0 +1,152 @@
+import io
+import json
+
+from markflow._reporting import (
+    JSONReporter,
+    NDJSONReporter,
+    PlainReporter,
+    RichReporter,
+)
+
+
+class TestPlainReporter:
+    def test_check(self) -> None:
+        stream = io.StringIO()
+        reporter = PlainReporter(check=True, quiet=False, stream=stream)
+        reporter.reformatted("a.md")
+        reporter.unchanged("b.md")
+        reporter.unchanged("c.md")
+        reporter.finish()
+        assert stream.getvalue() == (
+            "would reformat a.md\n"
+            "All done!\n"
+            "1 file would be reformatted. 2 files would be left unchanged.\n"
+        )
+        assert reporter.return_code == 1
+
+    def test_reformat(self) -> None:
+        stream = io.StringIO()
+        reporter = PlainReporter(check=False, quiet=False, stream=stream)
+        reporter.reformatted("a.md")
+        reporter.reformatted("b.md")
+        reporter.unwritable("c.md")
+        reporter.finish()
+        assert stream.getvalue() == (
+            "reformatted a.md\n"
+            "reformatted b.md\n"
+            "All done!\n"
+            "2 files were reformatted. 1 file couldn't be written.\n"
+        )
+        assert reporter.return_code == -1
+
+    def test_batching(self) -> None:
+        stream = io.StringIO()
+        reporter = PlainReporter(check=False, quiet=False, stream=stream)
+        reporter.BATCH_SECONDS = float("inf")
+        for i in range(reporter.BATCH_SIZE - 1):
+            reporter.reformatted(f"{i}.md")
+        assert stream.getvalue() == ""
+        reporter.reformatted("last.md")
+        assert stream.getvalue().count("\n") == reporter.BATCH_SIZE
+
+    def test_nothing_to_do(self) -> None:
+        stream = io.StringIO()
+        reporter = PlainReporter(check=False, quiet=False, stream=stream)
+        reporter.nothing_to_do("No path provided.")
+        reporter.flush()
+        assert stream.getvalue() == "No path provided. Nothing to do.\n"
+
+    def test_quiet(self) -> None:
+        stream = io.StringIO()
+        reporter = PlainReporter(check=True, quiet=True, stream=stream)
+        reporter.reformatted("a.md")
+        reporter.message([("Message", True)])
+        reporter.finish()
+        assert stream.getvalue() == ""
+        assert reporter.return_code == 1
+
+
+class TestRichReporter:
+    def test_emphasis(self) -> None:
+        stream = io.StringIO()
+        reporter = RichReporter(check=False, quiet=False, stream=stream)
+        reporter.reformatted("a.md")
+        reporter.finish()
+        assert stream.getvalue().splitlines() == [
+            "reformatted a.md",
+            "All done!",
+            "1 file was reformatted.",
+        ]
+
+
+class TestJSONReporter:
+    def test_document(self) -> None:
+        stream = io.StringIO()
+        reporter = JSONReporter(check=True, quiet=True, stream=stream)
+        reporter.reformatted("a.md", 0.5, 3)
+        reporter.unchanged("b.md")
+        assert stream.getvalue() == ""
+        reporter.finish()
+        assert json.loads(stream.getvalue()) == {
+            "check": True,
+            "files": [
+                {"path": "a.md", "status": "reformatted", "duration": 0.5, "line": 3},
+                {"path": "b.md", "status": "unchanged"},
+            ],
+            "reformatted": 1,
+            "unchanged": 1,
+            "unwritable": 0,
+        }
+
+    def test_stdin(self) -> None:
+        stream = io.StringIO()
+        reporter = JSONReporter(check=True, quiet=False, stream=stream)
+        reporter.stdin(False)
+        assert json.loads(stream.getvalue())["files"] == [
+            {"path": "-", "status": "unchanged"}
+        ]
+        assert reporter.return_code == 0
+
+    def test_nothing_to_do(self) -> None:
+        stream = io.StringIO()
+        reporter = JSONReporter(check=False, quiet=False, stream=stream)
+        reporter.nothing_to_do("No changed Markdown files.")
+        assert json.loads(stream.getvalue()) == {
+            "check": False,
+            "files": [],
+            "reformatted": 0,
+            "unchanged": 0,
+            "unwritable": 0,
+        }
+
+
+class TestNDJSONReporter:
+    def test_lines(self) -> None:
+        stream = io.StringIO()
+        reporter = NDJSONReporter(check=False, quiet=False, stream=stream)
+        reporter.reformatted("a.md", 0.5, 1)
+        assert json.loads(stream.getvalue()) == {
+            "path": "a.md",
+            "status": "reformatted",
+            "duration": 0.5,
+            "line": 1,
+        }
+        reporter.unwritable("b.md")
+        reporter.finish()
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        assert lines[1:] == [
+            {"path": "b.md", "status": "unwritable"},
+            {"check": False, "reformatted": 1, "unchanged": 0, "unwritable": 1},
+        ]
+        assert reporter.return_code == -1
+
+    def test_nothing_to_do(self) -> None:
+        stream = io.StringIO()
+        reporter = NDJSONReporter(check=True, quiet=False, stream=stream)
+        reporter.nothing_to_do("No changed Markdown files.")
+        assert json.loads(stream.getvalue()) == {
+            "check": True,
+            "reformatted": 0,
+            "unchanged": 0,
+            "unwritable": 0,
+        }
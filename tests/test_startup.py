@@ -0,0 +1,48 @@
+import subprocess
+import sys
+from typing import List
+
+# Editor hooks run MarkFlow on every save, so the time it takes to import everything
+# `echo x | markflow` needs is paid over and over again. How long imports take depends
+# too much on the machine (and whatever else it's doing) to test, so these are the
+# modules it has no need for that would slow it down.
+UNNEEDED_MODULES = [
+    "rich",
+    "importlib.metadata",
+    "markflow._cache",
+    "markflow._git",
+    "markflow._jobs",
+    "markflow._lsp",
+]
+
+
+def _imported_modules(stdin: str) -> List[str]:
+    """Run MarkFlow on stdin and return the modules it imported"""
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "markflow"],
+        input=stdin,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    modules = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        modules.append(line.split("|")[2].strip())
+    return modules
+
+
+class TestStartup:
+    def test_reformatting_stdin(self) -> None:
+        modules = _imported_modules("#  Heading\n")
+        assert "markflow" in modules
+        assert not [
+            module
+            for module in modules
+            if any(
+                module == unneeded or module.startswith(unneeded + ".")
+                for unneeded in UNNEEDED_MODULES
+            )
+        ]
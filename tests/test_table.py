@@ -45,8 +45,10 @@ class TestTable:
         )
         table = create_section(MarkdownTable, input_)
         assert table.reformatted() == expected
+        assert not table.is_canonical()
         table = create_section(MarkdownTable, expected)
         assert table.reformatted() == expected
+        assert table.is_canonical()
 
     def test_aligned_table(self) -> None:
         input_ = textwrap.dedent(
@@ -65,5 +67,18 @@ class TestTable:
         )
         table = create_section(MarkdownTable, input_)
         assert table.reformatted() == expected
+        assert not table.is_canonical()
         table = create_section(MarkdownTable, expected)
         assert table.reformatted() == expected
+        assert table.is_canonical()
+
+    def test_padded_table_is_not_canonical(self) -> None:
+        text = textwrap.dedent(
+            """\
+            |  a  |
+            |-----|
+            | b   |"""
+        )
+        table = create_section(MarkdownTable, text)
+        assert not table.is_canonical()
+        assert table.reformatted() == "| a |\n|---|\n| b |"
@@ -1,13 +1,10 @@
 import textwrap
+from typing import List
+
+import pytest
 
 from markflow._utils._utils import get_indent, truncate_str
-from markflow._utils.textwrap import (
-    code_split,
-    link_split,
-    newline_split,
-    space_split,
-    wrap,
-)
+from markflow._utils.textwrap import is_wrapped, join, tokenize, wrap
 
 
 class TestTruncateStr:
@@ -49,102 +46,110 @@ class TestTextWrap:
         )
         assert wrap(input_, 50) == expected
 
-    def test_code_split(self) -> None:
-        input_ = "a` a `` b` a `b`c"
-        expected_split_text = ["a", "` a `` b`", "a", "`b`", "c"]
-        expected_leading_spaces = [False, False, True, True, False]
-        expected_evaluates = [True, False, True, False, True]
-        split_text, leading_spaces, evaluates = code_split(input_, False)
-        assert len(split_text) == len(leading_spaces) == len(evaluates)
-        assert split_text == expected_split_text
-        assert leading_spaces == expected_leading_spaces
-        assert evaluates == expected_evaluates
-
-    def test_code_split_begin_and_end(self) -> None:
-        input_ = "` a `` b` a `b`"
-        expected_split_text = ["` a `` b`", "a", "`b`"]
-        expected_leading_spaces = [False, True, True]
-        expected_evaluates = [False, True, False]
-        split_text, leading_spaces, evaluates = code_split(input_, False)
-        assert len(split_text) == len(leading_spaces) == len(evaluates)
-        assert split_text == expected_split_text
-        assert leading_spaces == expected_leading_spaces
-        assert evaluates == expected_evaluates
-
-    def test_code_split_sentence(self) -> None:
-        input_ = "a` a `` b`. a `b`.c"
-        expected_split_text = ["a", "` a `` b`.", "a", "`b`.", "c"]
-        expected_leading_spaces = [False, False, True, True, False]
-        expected_evaluates = [True, False, True, False, True]
-        split_text, leading_spaces, evaluates = code_split(input_, False)
-        assert len(split_text) == len(leading_spaces) == len(evaluates)
-        assert split_text == expected_split_text
-        assert leading_spaces == expected_leading_spaces
-        assert evaluates == expected_evaluates
-
-    def test_code_split_solo_tilda(self) -> None:
-        input_ = "` a `` b` a `b` `a"
-        expected_split_text = ["` a `` b`", "a", "`b`", "`a"]
-        expected_leading_spaces = [False, True, True, True]
-        expected_evaluates = [False, True, False, True]
-        split_text, leading_spaces, evaluates = code_split(input_, False)
-        assert len(split_text) == len(leading_spaces) == len(evaluates)
-        assert split_text == expected_split_text
-        assert leading_spaces == expected_leading_spaces
-        assert evaluates == expected_evaluates
-
-    def test_link_split(self) -> None:
-        input_ = "a[URL][url] b [URL](http://example.com)c"
-        expected_split_text = [
-            "a[URL][",
-            "url]",
-            "b",
-            "[URL](",
-            "http://example.com)c",
+    def test_code(self) -> None:
+        assert tokenize("a` a `` b` a `b`c") == [
+            ("a", False),
+            ("` a `` b`", False),
+            ("a", True),
+            ("`b`", True),
+            ("c", False),
+        ]
+
+    def test_code_begin_and_end(self) -> None:
+        assert tokenize("` a `` b` a `b`") == [
+            ("` a `` b`", False),
+            ("a", True),
+            ("`b`", True),
+        ]
+
+    def test_code_sentence(self) -> None:
+        assert tokenize("a` a `` b`. a `b`.c") == [
+            ("a", False),
+            ("` a `` b`.", False),
+            ("a", True),
+            ("`b`.", True),
+            ("c", False),
+        ]
+
+    def test_unclosed_code(self) -> None:
+        assert tokenize("a ` b") == [("a", False), ("`", True), ("b", True)]
+
+    def test_links(self) -> None:
+        assert tokenize("a[URL][url] b [URL](http://example.com)c") == [
+            ("a[URL][", False),
+            ("url]", False),
+            ("b", True),
+            ("[URL](", True),
+            ("http://example.com)c", False),
+        ]
+
+    def test_links_sentence(self) -> None:
+        assert tokenize("a[URL][url]. b [URL](http://example.com).c") == [
+            ("a[URL][", False),
+            ("url].", False),
+            ("b", True),
+            ("[URL](", True),
+            ("http://example.com).c", False),
         ]
-        expected_leading_spaces = [False, False, True, True, False]
-        expected_evaluates = [True, False, True, True, False]
-        split_text, leading_spaces, evaluates = link_split(input_, False)
-        assert len(split_text) == len(leading_spaces) == len(evaluates)
-        assert split_text == expected_split_text
-        assert leading_spaces == expected_leading_spaces
-        assert evaluates == expected_evaluates
-
-    def test_link_split_sentence(self) -> None:
-        input_ = "a[URL][url]. b [URL](http://example.com).c"
-        expected_split_text = [
-            "a[URL][",
-            "url].",
-            "b",
-            "[URL](",
-            "http://example.com).c",
+
+    def test_html_newlines(self) -> None:
+        assert tokenize("a <br /> b <br>c<br/>d") == [
+            ("a", False),
+            ("<br />", True),
+            ("b", True),
+            ("<br>", True),
+            ("c", False),
+            ("<br/>", False),
+            ("d", False),
+        ]
+
+    def test_words(self) -> None:
+        assert tokenize(" ".join(["a"] * 10)) == [("a", False)] + [("a", True)] * 9
+
+    def test_leading_period(self) -> None:
+        # Without any code or link before them, periods stay where they are
+        assert tokenize(".a `b` . c") == [
+            (".a", False),
+            ("`b`", True),
+            (".", True),
+            ("c", True),
         ]
-        expected_leading_spaces = [False, False, True, True, False]
-        expected_evaluates = [True, False, True, True, False]
-        split_text, leading_spaces, evaluates = link_split(input_, False)
-        assert len(split_text) == len(leading_spaces) == len(evaluates)
-        assert split_text == expected_split_text
-        assert leading_spaces == expected_leading_spaces
-        assert evaluates == expected_evaluates
-
-    def test_newline_split(self) -> None:
-        input_ = "a <br /> b <br>c<br/>d"
-        expected_split_text = ["a", "<br />", "b", "<br>", "c", "<br/>", "d"]
-        expected_leading_spaces = [False, True, True, True, False, False, False]
-        expected_evaluates = [True, False, True, False, True, False, True]
-        split_text, leading_spaces, evaluates = newline_split(input_, False)
-        assert len(split_text) == len(leading_spaces) == len(evaluates)
-        assert split_text == expected_split_text
-        assert leading_spaces == expected_leading_spaces
-        assert evaluates == expected_evaluates
-
-    def test_space_split(self) -> None:
-        input_ = " ".join(["a"] * 10)
-        expected_split_text = ["a"] * 10
-        expected_leading_spaces = [False] + [True] * 9
-        expected_evaluates = [True] * 10
-        split_text, leading_spaces, evaluates = space_split(input_, False)
-        assert len(split_text) == len(leading_spaces) == len(evaluates)
-        assert split_text == expected_split_text
-        assert leading_spaces == expected_leading_spaces
-        assert evaluates == expected_evaluates
+        assert wrap(".a b", 88) == ".a b"
+
+
+class TestJoin:
+    def test_fills_lines(self) -> None:
+        tokens = tokenize("a bb ccc[x](y) overflowing d")
+        assert join(tokens, 6) == "a bb\nccc[x](\ny)\noverflowing\nd"
+
+    @pytest.mark.parametrize("width", [0, float("inf")])
+    def test_unbounded(self, width: float) -> None:
+        tokens = tokenize(" ".join(["word"] * 100) + " <br> `end`")
+        assert join(tokens, width) == " ".join(["word"] * 100) + " <br>\n`end`"
+
+    def test_html_newlines(self) -> None:
+        assert join(tokenize("a<br/> b <br>"), 88) == "a<br/>\nb <br>"
+
+
+class TestIsWrapped:
+    @pytest.mark.parametrize(
+        "lines,width,expected",
+        [
+            (["a b c", "d"], 5, True),
+            (["a b", "c d"], 5, False),
+            (["overflowing", "a"], 5, True),
+            (["over flowing"], 5, False),
+            (["a  b"], 5, False),
+            (["a `b`", "c"], 5, True),
+            (["a `b c`"], 10, False),
+            (["a `b`,"], 10, False),
+            (["a <br> b"], 10, False),
+            ([".a", "`b`", ".c"], 5, True),
+            (["a b"], 0, True),
+            (["a", "b"], float("inf"), False),
+        ],
+    )
+    def test_is_wrapped(self, lines: List[str], width: float, expected: bool) -> None:
+        assert is_wrapped(lines, width) == expected
+        if expected:
+            assert wrap(" ".join(lines), width) == "\n".join(lines)